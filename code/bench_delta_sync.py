@@ -0,0 +1,58 @@
+"""
+Compares delta sync with a full merge between two replicas that differ by a
+fixed number of statements, across graph sizes.
+
+Usage: python bench_delta_sync.py [--sizes 1000 10000 100000] [--changed 100]
+"""
+import argparse
+import time
+from graph_layer_core import GraphLayer, EntityType
+
+def build_replicas(size: int, changed: int) -> tuple[GraphLayer, GraphLayer, GraphLayer]:
+    """Builds a source graph of `size` statements and two replicas missing the last `changed`."""
+    source = GraphLayer(node_id="source")
+    prop = source.create_entity(EntityType.PROPERTY)
+    entities = [source.create_entity() for _ in range(max(size // 10, 1))]
+    for i in range(size - changed):
+        source.add_statement(entities[i % len(entities)].id, prop.id, entities[(i * 7) % len(entities)].id)
+
+    replicas = []
+    for _ in range(2):
+        replica = GraphLayer(node_id="replica")
+        replica.sync_from(source)
+        replicas.append(replica)
+
+    for i in range(changed):
+        source.add_statement(entities[i % len(entities)].id, prop.id, f"changed {i}")
+    return source, replicas[0], replicas[1]
+
+def time_call(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+def run(sizes: list[int], changed: int) -> list[dict]:
+    rows = []
+    for size in sizes:
+        source, merged, synced = build_replicas(size, changed)
+        merge_ms = time_call(lambda: merged.merge(source))
+        delta_ms = time_call(lambda: synced.sync_from(source))
+        assert len(merged.statements) == len(source.statements)
+        assert synced.version_vector() == source.version_vector()
+        rows.append({"statements": size, "changed": changed, "merge_ms": merge_ms, "delta_ms": delta_ms})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--changed", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'statements':>12} {'changed':>8} {'merge ms':>10} {'delta ms':>10} {'speedup':>8}")
+    for row in run(args.sizes, args.changed):
+        speedup = row["merge_ms"] / row["delta_ms"] if row["delta_ms"] else float("inf")
+        print(f"{row['statements']:>12} {row['changed']:>8} {row['merge_ms']:>10.2f} "
+              f"{row['delta_ms']:>10.2f} {speedup:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
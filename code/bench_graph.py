@@ -0,0 +1,267 @@
+"""
+Benchmarks the graph and query hot paths on synthetic graphs and writes the
+results as JSON, so runs from different commits can be compared.
+
+Shapes: power-law degree, wide fan-out from a few hubs, and deep chains.
+Each is measured for bulk loading, add_statement throughput, merge and
+delta sync between diverging replicas, one-hop, multi-hop and filtered
+queries, a one-hop query from every entity run serially and on a
+ParallelExecutor, get_latest_label, and memory per statement (entities and
+indexes included; bulk_load also includes generating the rows). Graphs are generated
+from a fixed seed, so a given command line always measures the same data.
+
+Usage: python bench_graph.py [--sizes 10000 100000] [--shapes power_law wide_fanout deep_chain]
+                             [--workers 4] [--output results.json] [--compare baseline.json]
+                             [--tolerance 0.2]
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import accumulate
+from random import Random
+from typing import List, Dict, Optional, Callable
+from graph_layer_core import GraphLayer, EntityId, EntityType, StatementBatch
+from graph_filters import has
+from graph_parallel import ParallelExecutor
+
+SHAPES = ("power_law", "wide_fanout", "deep_chain")
+DEFAULT_SIZES = [10_000, 100_000]
+PREDICATE_COUNT = 8
+FANOUT = 1_000
+CHAIN_LENGTH = 1_000
+QUERY_STARTS = 100
+
+@dataclass
+class SyntheticGraph:
+    """A generated graph and the entities its benchmarks start from."""
+    graph: GraphLayer
+    predicates: List[EntityId]
+    starts: List[EntityId]  # Entities with outgoing statements, in generation order
+    entities: List[EntityId]
+
+def _zipf_weights(count: int) -> List[float]:
+    return list(accumulate(1.0 / rank for rank in range(1, count + 1)))
+
+def _load(graph: GraphLayer, subjects: List[EntityId], predicates: List[EntityId],
+          objects: List[EntityId]) -> None:
+    graph.bulk_add_statements(StatementBatch(subjects, predicates, objects))
+
+def power_law(size: int, seed: int = 0, compact: bool = False) -> SyntheticGraph:
+    """Subjects and objects drawn from a Zipf distribution over size/10 entities."""
+    rng = Random(seed)
+    graph = GraphLayer(node_id="bench", compact=compact)
+    predicates = [e.id for e in graph.bulk_create_entities(PREDICATE_COUNT, EntityType.PROPERTY)]
+    entities = [e.id for e in graph.bulk_create_entities(max(size // 10, 1))]
+    weights = _zipf_weights(len(entities))
+    subjects = rng.choices(entities, cum_weights=weights, k=size)
+    objects = rng.choices(entities, cum_weights=weights, k=size)
+    _load(graph, subjects, [predicates[rng.randrange(PREDICATE_COUNT)] for _ in range(size)], objects)
+    return SyntheticGraph(graph, predicates, list(dict.fromkeys(subjects)), entities)
+
+def wide_fanout(size: int, seed: int = 0, compact: bool = False) -> SyntheticGraph:
+    """Hubs that each point at FANOUT distinct leaves."""
+    rng = Random(seed)
+    graph = GraphLayer(node_id="bench", compact=compact)
+    predicates = [e.id for e in graph.bulk_create_entities(PREDICATE_COUNT, EntityType.PROPERTY)]
+    hubs = [e.id for e in graph.bulk_create_entities(max(size // FANOUT, 1))]
+    leaves = [e.id for e in graph.bulk_create_entities(size)]
+    rng.shuffle(leaves)
+    subjects = [hubs[i // FANOUT % len(hubs)] for i in range(size)]
+    _load(graph, subjects, [predicates[i % PREDICATE_COUNT] for i in range(size)], leaves)
+    return SyntheticGraph(graph, predicates, hubs, hubs + leaves)
+
+def deep_chain(size: int, seed: int = 0, compact: bool = False) -> SyntheticGraph:
+    """Chains of CHAIN_LENGTH statements on a single predicate."""
+    graph = GraphLayer(node_id="bench", compact=compact)
+    predicates = [e.id for e in graph.bulk_create_entities(PREDICATE_COUNT, EntityType.PROPERTY)]
+    chains = max(size // CHAIN_LENGTH, 1)
+    length = size // chains
+    entities = [e.id for e in graph.bulk_create_entities(chains * (length + 1))]
+    subjects, objects = [], []
+    for chain in range(chains):
+        base = chain * (length + 1)
+        subjects.extend(entities[base:base + length])
+        objects.extend(entities[base + 1:base + length + 1])
+    _load(graph, subjects, [predicates[0]] * len(subjects), objects)
+    return SyntheticGraph(graph, predicates, entities[::length + 1], entities)
+
+GENERATORS: Dict[str, Callable[..., SyntheticGraph]] = {
+    "power_law": power_law, "wide_fanout": wide_fanout, "deep_chain": deep_chain
+}
+
+def _median_ms(func: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `repeat` calls, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def _record(rows: List[dict], shape: str, size: int, metric: str, value: float, unit: str,
+            higher_is_better: bool = False) -> None:
+    rows.append({"shape": shape, "statements": size, "metric": metric, "value": value,
+                 "unit": unit, "higher_is_better": higher_is_better})
+
+def bench_shape(shape: str, size: int, seed: int, repeat: int, operations: int,
+                compact: bool, memory: bool, workers: Optional[int] = None) -> List[dict]:
+    """Runs every benchmark on one generated graph."""
+    rows: List[dict] = []
+    generate = GENERATORS[shape]
+
+    gc.collect()
+    start = time.perf_counter()
+    synthetic = generate(size, seed, compact)
+    load_s = time.perf_counter() - start
+    graph, predicates = synthetic.graph, synthetic.predicates
+    _record(rows, shape, size, "bulk_load", size / load_s, "statements/s", True)
+
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        traced = generate(size, seed, compact)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _record(rows, shape, size, "memory_per_statement", current / len(traced.graph.statements), "bytes")
+        del traced
+
+    rng = Random(seed + 1)
+    entities = synthetic.entities
+    pairs = [(rng.choice(entities), rng.choice(entities)) for _ in range(operations)]
+    predicate = predicates[0]
+    start = time.perf_counter()
+    for subject, object_ in pairs:
+        graph.add_statement(subject, predicate, object_)
+    _record(rows, shape, size, "add_statement", operations / (time.perf_counter() - start), "ops/s", True)
+
+    starts = synthetic.starts[:QUERY_STARTS]
+    one_hop = lambda: graph.query().starting_from(starts).follow(predicate).execute()
+    multi_hop = lambda: graph.query().starting_from(starts[:10]).follow(predicate, 1, 3).execute()
+    filtered = lambda: graph.query().starting_from(starts).follow(predicate)\
+        .filter(has(predicate)).execute()
+    _record(rows, shape, size, "one_hop_query", _median_ms(one_hop, repeat), "ms")
+    _record(rows, shape, size, "multi_hop_query", _median_ms(multi_hop, repeat), "ms")
+    _record(rows, shape, size, "filtered_query", _median_ms(filtered, repeat), "ms")
+
+    # The whole entity set as the frontier, partitioned across the pool whatever the size
+    wide_hop = lambda executor=None: graph.query().starting_from(entities).follow(predicate)\
+        .execute(executor=executor)
+    _record(rows, shape, size, "wide_hop_serial", _median_ms(wide_hop, repeat), "ms")
+    with ParallelExecutor(graph, workers, min_partition=1) as executor:
+        wide_hop(executor)  # Writes the base snapshot and starts the workers
+        _record(rows, shape, size, "wide_hop_parallel", _median_ms(lambda: wide_hop(executor), repeat), "ms")
+
+    labelled = entities[:operations]
+    for round_ in range(3):
+        for entity_id in labelled:
+            graph.add_label(entity_id, f"label {round_}")
+    lookups = lambda: [graph.get_latest_label(entity_id) for entity_id in labelled]
+    _record(rows, shape, size, "get_latest_label", len(labelled) / _median_ms(lookups, repeat) * 1000,
+            "lookups/s", True)
+
+    # Two replicas that diverge by `operations` statements each
+    replica = GraphLayer(node_id="replica", compact=compact)
+    replica.sync_from(graph)
+    synced = GraphLayer(node_id="synced", compact=compact)
+    synced.sync_from(graph)
+    for subject, object_ in pairs:
+        graph.add_statement(subject, predicates[1], object_)
+        replica.add_statement(object_, predicates[1], subject)
+    _record(rows, shape, size, "delta_sync", _median_ms(lambda: synced.sync_from(replica), 1), "ms")
+    _record(rows, shape, size, "merge", _median_ms(lambda: graph.merge(replica), 1), "ms")
+    return rows
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes: List[int], shapes: List[str], seed: int = 0, repeat: int = 5,
+        operations: int = 10_000, compact: bool = False, memory: bool = True,
+        workers: Optional[int] = None) -> dict:
+    """Runs the suite and returns the JSON-ready report."""
+    results = []
+    for size in sizes:
+        for shape in shapes:
+            results.extend(bench_shape(shape, size, seed, repeat, min(operations, size),
+                                       compact, memory, workers))
+    return {
+        "meta": {
+            "commit": _commit(),
+            "recorded_at": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "operations": operations,
+            "compact": compact,
+            "workers": workers,
+        },
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """
+    Describes every metric that got worse than the baseline by more than
+    `tolerance` (a fraction), accounting for whether higher is better.
+    """
+    previous = {(r["shape"], r["statements"], r["metric"]): r for r in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = previous.get((row["shape"], row["statements"], row["metric"]))
+        if old is None or not old["value"]:
+            continue
+        change = (row["value"] - old["value"]) / old["value"]
+        worse = -change if row["higher_is_better"] else change
+        if worse > tolerance:
+            regressions.append(
+                f"{row['shape']} {row['statements']} {row['metric']}: "
+                f"{old['value']:.4g} -> {row['value']:.4g} {row['unit']} ({worse:+.0%} worse)"
+            )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=10_000,
+                        help="statements added, labels looked up and replica divergence per run")
+    parser.add_argument("--compact", action="store_true", help="use the compact columnar backend")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced memory build")
+    parser.add_argument("--workers", type=int, help="parallel executor processes (default: CPU count)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.shapes, args.seed, args.repeat, args.operations,
+                 args.compact, not args.no_memory, args.workers)
+    print(f"{'shape':>12} {'statements':>11} {'metric':>22} {'value':>14}  unit")
+    for row in report["results"]:
+        print(f"{row['shape']:>12} {row['statements']:>11} {row['metric']:>22} "
+              f"{row['value']:>14.2f}  {row['unit']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            regressions = compare(json.load(baseline), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
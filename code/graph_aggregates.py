@@ -0,0 +1,241 @@
+"""
+Aggregations over query matches: count, count-distinct and min/max/avg of
+statement certainties and timestamps, optionally grouped by the object of a
+property or by statement predicate or object.
+
+Aggregates are folded into one accumulator per group while the matched
+entities' statements are read from the SPO index, so memory grows with the
+number of groups (plus the distinct values of count-distinct aggregates),
+not with the number of matches, and no result objects are built. On the
+compact backend the subject's rows are read straight from the certainty,
+timestamp and code columns; codes are decoded only for the final groups.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Set, Any, Optional, Iterable, Union
+from graph_layer_core import GraphLayer, EntityId
+from graph_storage import to_microseconds, from_microseconds
+
+FUNCTIONS = ("count", "count_distinct", "min", "max", "avg")
+STATEMENT_FIELDS = ("certainty", "timestamp", "object", "predicate", "subject")
+NUMERIC_FIELDS = ("certainty", "timestamp")
+# group_by values that group the statements of matched entities instead of the entities
+STATEMENT_GROUPS = ("predicate", "object")
+
+@dataclass(frozen=True)
+class Aggregate:
+    """
+    One aggregate: `function` over a statement `field`, restricted to
+    statements on `predicate` if given. A count without a field counts rows.
+    """
+    function: str
+    field: Optional[str] = None
+    predicate: Optional[EntityId] = None
+
+    def __post_init__(self):
+        if self.function not in FUNCTIONS:
+            raise ValueError(f"Unknown aggregate {self.function!r}; expected one of {FUNCTIONS}")
+        if self.field is None:
+            if self.function != "count":
+                raise ValueError(f"{self.function} needs a field")
+        elif self.field not in STATEMENT_FIELDS:
+            raise ValueError(f"Unknown field {self.field!r}; expected one of {STATEMENT_FIELDS}")
+        if self.function in ("min", "max", "avg") and self.field not in NUMERIC_FIELDS:
+            raise ValueError(f"{self.function} needs one of {NUMERIC_FIELDS}")
+
+    def __str__(self) -> str:
+        arguments = [a for a in (self.field, str(self.predicate) if self.predicate else None) if a]
+        return f"{self.function}({', '.join(arguments)})"
+
+def count(predicate: Optional[EntityId] = None) -> Aggregate:
+    """Counts rows; with a predicate, only rows having a statement on it."""
+    return Aggregate("count", predicate=predicate)
+
+def count_distinct(field: str = "object", predicate: Optional[EntityId] = None) -> Aggregate:
+    """Counts the distinct values of a statement field."""
+    return Aggregate("count_distinct", field, predicate)
+
+def minimum(field: str, predicate: Optional[EntityId] = None) -> Aggregate:
+    """Smallest certainty or timestamp."""
+    return Aggregate("min", field, predicate)
+
+def maximum(field: str, predicate: Optional[EntityId] = None) -> Aggregate:
+    """Largest certainty or timestamp."""
+    return Aggregate("max", field, predicate)
+
+def average(field: str, predicate: Optional[EntityId] = None) -> Aggregate:
+    """Mean certainty or timestamp."""
+    return Aggregate("avg", field, predicate)
+
+@dataclass
+class AggregateResult:
+    """
+    Aggregate values per group. Ungrouped queries have the single group None.
+    total_matches is the number of entities the query matched.
+    """
+    groups: Dict[Any, Dict[str, Any]]
+    total_matches: int
+    execution_time_ms: float = 0.0
+
+    def __getitem__(self, name: str) -> Any:
+        """The value of an aggregate in an ungrouped result."""
+        return self.groups.get(None, {}).get(name)
+
+class _Accumulator:
+    __slots__ = ("count", "total", "low", "high", "distinct")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.low = None
+        self.high = None
+        self.distinct: Optional[Set[Any]] = None
+
+    def add(self, value: Any) -> None:
+        self.count += 1
+        self.total += value
+        if self.low is None or value < self.low:
+            self.low = value
+        if self.high is None or value > self.high:
+            self.high = value
+
+    def add_distinct(self, value: Any) -> None:
+        if self.distinct is None:
+            self.distinct = set()
+        self.distinct.add(value)
+
+class _Reader:
+    """
+    Reads statement rows of a subject and their raw field values. Raw
+    timestamps are microseconds; on the compact backend, raw objects and
+    predicates are codes until decoded.
+    """
+    def __init__(self, graph: GraphLayer, view: Any = None):
+        self.graph = graph
+        self.view = view
+        self.codes = getattr(graph.index, "spo_codes", None) if view is None else None
+        if self.codes is not None:
+            store = graph.statements
+            self.store = store
+            self.columns = {"certainty": store.certainties, "timestamp": store.timestamps,
+                            "object": store.objects, "predicate": store.predicates,
+                            "subject": store.subjects}
+
+    def rows(self, subject: EntityId, predicate: Optional[EntityId] = None) -> Iterable[Any]:
+        if self.codes is not None:
+            entity_codes = self.store.entity_codes
+            code = entity_codes.lookup(subject)
+            by_predicate = self.codes.get(code, {}) if code is not None else {}
+            if predicate is None:
+                return (row for rows in by_predicate.values() for row in rows)
+            predicate_code = entity_codes.lookup(predicate)
+            return by_predicate.get(predicate_code, ()) if predicate_code is not None else ()
+        if self.view is not None:
+            return self.view.statements(self.graph, subject, predicate)
+        by_predicate = self.graph.index.spo.get(subject, {})
+        if predicate is None:
+            return (s for statements in by_predicate.values() for s in statements)
+        return by_predicate.get(predicate, ())
+
+    def raw(self, row: Any, field: str) -> Any:
+        if self.codes is not None:
+            return self.columns[field][row]
+        if field == "timestamp":
+            return to_microseconds(row.timestamp)
+        return getattr(row, field)
+
+    def decode(self, field: str, value: Any) -> Any:
+        if field == "timestamp":
+            return from_microseconds(round(value))
+        if self.codes is None or field == "certainty":
+            return value
+        if field == "object":
+            return self.store.decode_object(value)
+        return self.store.entity_codes.decode(value)
+
+    def has(self, row: Any, predicate: EntityId) -> bool:
+        if self.codes is not None:
+            return self.store.entity_codes.decode(self.store.predicates[row]) == predicate
+        return row.predicate == predicate
+
+def aggregate(graph: GraphLayer, entities: Iterable[EntityId], aggregates: Dict[str, Aggregate],
+              group_by: Union[EntityId, str, None] = None, view: Any = None,
+              statements: bool = False) -> Dict[Any, Dict[str, Any]]:
+    """
+    Folds the aggregates over the matched entities and returns their values
+    per group. Rows are the entities, grouped by the objects of their
+    `group_by` property statements (an entity counts in each of its groups).
+    Field aggregates over entity rows range over each entity's statements.
+    With statements set, or group_by "predicate" or "object", rows are the
+    statements about the entities instead, grouped by that field if given;
+    with a `group_by` property, each statement falls in its subject's groups.
+    """
+    reader = _Reader(graph, view)
+    names = list(aggregates)
+    specs = [aggregates[name] for name in names]
+    groups: Dict[Any, List[_Accumulator]] = {}
+
+    def accumulators(key: Any) -> List[_Accumulator]:
+        found = groups.get(key)
+        if found is None:
+            found = groups[key] = [_Accumulator() for _ in specs]
+        return found
+
+    def fold(accumulator: _Accumulator, spec: Aggregate, rows: Iterable[Any]) -> None:
+        if spec.field is None:
+            accumulator.count += 1
+        elif spec.function == "count_distinct":
+            for row in rows:
+                accumulator.add_distinct(reader.raw(row, spec.field))
+        else:
+            for row in rows:
+                accumulator.add(reader.raw(row, spec.field))
+
+    by_field = group_by in STATEMENT_GROUPS
+    statement_rows = statements or by_field
+    if group_by is None:
+        accumulators(None)
+    for entity_id in entities:
+        if group_by is None:
+            keys = (None,)
+        elif not by_field:
+            keys = dict.fromkeys(reader.raw(row, "object") for row in reader.rows(entity_id, group_by))
+        if statement_rows:
+            for row in reader.rows(entity_id):
+                for key in ((reader.raw(row, group_by),) if by_field else keys):
+                    for accumulator, spec in zip(accumulators(key), specs):
+                        if spec.predicate is None or reader.has(row, spec.predicate):
+                            fold(accumulator, spec, (row,))
+            continue
+        for key in keys:
+            for accumulator, spec in zip(accumulators(key), specs):
+                if spec.predicate is None and spec.field is None:
+                    accumulator.count += 1
+                    continue
+                rows = reader.rows(entity_id, spec.predicate)
+                if spec.field is None:
+                    if any(True for _ in rows):
+                        accumulator.count += 1
+                else:
+                    fold(accumulator, spec, rows)
+
+    key_field = group_by if by_field else "object"
+    results: Dict[Any, Dict[str, Any]] = {}
+    for key, accumulated in groups.items():
+        values = {}
+        for name, spec, accumulator in zip(names, specs, accumulated):
+            values[name] = _finish(reader, spec, accumulator)
+        results[reader.decode(key_field, key) if key is not None else None] = values
+    return results
+
+def _finish(reader: _Reader, spec: Aggregate, accumulator: _Accumulator) -> Any:
+    if spec.function == "count":
+        return accumulator.count
+    if spec.function == "count_distinct":
+        return len(accumulator.distinct) if accumulator.distinct is not None else 0
+    if accumulator.count == 0:
+        return None
+    if spec.function == "min":
+        return reader.decode(spec.field, accumulator.low)
+    if spec.function == "max":
+        return reader.decode(spec.field, accumulator.high)
+    return reader.decode(spec.field, accumulator.total / accumulator.count)
@@ -0,0 +1,199 @@
+import asyncio
+import copy
+import os
+import shutil
+import tempfile
+from typing import Dict, Set, Optional
+from graph_layer_core import GraphLayer, Delta
+from graph_query_system import GraphQuery, QueryResult
+from graph_persistence import write_snapshot, load_snapshot
+
+# Operations applied between yields to the event loop during async sync
+DEFAULT_SYNC_BATCH = 1_000
+# Operations a snapshot version may carry on top of its base before a new base is written
+DEFAULT_REBASE_AFTER = 100_000
+
+def split_delta(delta: Delta, batch_size: int) -> list[Delta]:
+    """
+    Splits a delta into smaller deltas of at most batch_size operations.
+    Each node's operations stay in log order, so every piece extends one
+    node's log prefix. Pieces hold a single node's operations, so applying
+    them in turn can expose operations from one node before those from
+    another node that they causally depend on.
+    """
+    pieces = []
+    for node, (first, operations) in delta.operations.items():
+        for start in range(0, len(operations), batch_size):
+            piece = Delta()
+            piece.operations[node] = (first + start, operations[start:start + batch_size])
+            pieces.append(piece)
+    return pieces
+
+def _covers(version: Dict[str, int], other: Dict[str, int]) -> bool:
+    """True if version has seen every operation other has."""
+    return all(version.get(node, 0) >= seen for node, seen in other.items())
+
+class AsyncGraph:
+    """
+    Asyncio facade over a GraphLayer for serving many concurrent clients.
+
+    The live graph is only touched from the event loop thread, so there are
+    no locks to contend on. Queries run with GraphQuery.execute_async run on
+    the loop thread to completion between awaits: they never see a write
+    half applied, but every other task waits while they run. Long-running
+    sync work (apply_delta, sync_from, merge) is applied in batches of one
+    node's operations with a yield between batches, so queries keep running
+    while it proceeds. Each batch extends one node's log prefix; a query
+    between batches may see a node's operations without operations from
+    other nodes that they depend on.
+
+    Heavy reads should run with execute(on_snapshot=True), in a worker thread
+    against an immutable version of the graph. A version is the memory-mapped
+    base snapshot (see graph_persistence) with the operations logged since
+    the base applied on top, so forking one costs the length of that log
+    tail, not the size of the graph, and runs in a worker thread. Readers
+    keep the version they started with while writers move on, in the manner
+    of MVCC. Once a version's tail exceeds rebase_after operations, a new
+    base is written from that immutable version in a worker thread; the
+    live graph itself is only serialized once, when the facade is created.
+    """
+    def __init__(self, graph: GraphLayer, sync_batch: int = DEFAULT_SYNC_BATCH,
+                 rebase_after: int = DEFAULT_REBASE_AFTER):
+        self.graph = graph
+        self.sync_batch = sync_batch
+        self.rebase_after = rebase_after
+        self._directory = tempfile.mkdtemp(prefix="yggra-async-")
+        self._base_count = 0
+        self._base_path = self._new_base_path()
+        self._base_version = graph.version_vector()
+        write_snapshot(graph, self._base_path)
+        # Forks that have captured a base path but not mapped it yet, and bases waiting on them
+        self._forking: Dict[str, int] = {}
+        self._retired: Set[str] = set()
+        self._rebase: Optional[asyncio.Future] = None
+        self._snapshot: Optional[GraphLayer] = None
+        self._snapshot_version: Optional[Dict[str, int]] = None
+
+    def query(self) -> GraphQuery:
+        """Creates a query builder on the live graph; run it with execute_async()."""
+        return self.graph.query()
+
+    def _new_base_path(self) -> str:
+        self._base_count += 1
+        return os.path.join(self._directory, f"base-{self._base_count}.ygs")
+
+    @staticmethod
+    def _fork(path: str, tail: Delta) -> GraphLayer:
+        """Builds a version: the mapped base snapshot with the log tail applied."""
+        version = load_snapshot(path)
+        version.apply_delta(tail)
+        return version
+
+    def _begin_fork(self) -> tuple[str, Delta]:
+        """Captures the current base and the operations logged since it, on the loop thread."""
+        path = self._base_path
+        self._forking[path] = self._forking.get(path, 0) + 1
+        return path, self.graph.delta_since(self._base_version)
+
+    def _end_fork(self, path: str) -> None:
+        self._forking[path] -= 1
+        if not self._forking[path]:
+            del self._forking[path]
+            if path in self._retired:
+                self._retired.discard(path)
+                os.remove(path)  # Versions mapping it keep their view
+
+    def _publish(self, version: GraphLayer, version_vector: Dict[str, int], tail_length: int) -> None:
+        """Makes a forked version current, unless a newer one got there first, and rebases if due."""
+        if self._snapshot_version is None or _covers(version_vector, self._snapshot_version):
+            self._snapshot, self._snapshot_version = version, version_vector
+        if tail_length <= self.rebase_after or self._rebase is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Rebased on the next fork made from asyncio code
+        path = self._new_base_path()
+        self._rebase = loop.run_in_executor(None, write_snapshot, version, path)
+        self._rebase.add_done_callback(lambda future: self._install_base(future, path, version_vector))
+
+    def _install_base(self, future: asyncio.Future, path: str, version_vector: Dict[str, int]) -> None:
+        self._rebase = None
+        if not os.path.isdir(self._directory):
+            return  # Closed while the base was being written
+        if future.cancelled() or future.exception() is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        retired, self._base_path, self._base_version = self._base_path, path, version_vector
+        if retired in self._forking:
+            self._retired.add(retired)
+        else:
+            os.remove(retired)
+
+    def snapshot(self) -> GraphLayer:
+        """
+        Returns an immutable version of the current graph, reusing the last
+        one while the version vector has not moved. A new version is forked
+        on the calling thread; execute(on_snapshot=True) forks in a worker.
+        """
+        version_vector = self.graph.version_vector()
+        if version_vector != self._snapshot_version:
+            path, tail = self._begin_fork()
+            try:
+                version = self._fork(path, tail)
+            finally:
+                self._end_fork(path)
+            self._publish(version, version_vector, len(tail))
+        return self._snapshot
+
+    async def execute(self, query: GraphQuery, on_snapshot: bool = False) -> QueryResult:
+        """
+        Runs a query. With on_snapshot set it runs in a worker thread against
+        an immutable version of the current graph, forked there too, leaving
+        the event loop free for other clients. Otherwise it runs on the loop
+        thread (see GraphQuery.execute_async).
+        """
+        if not on_snapshot:
+            return await query.execute_async()
+        loop = asyncio.get_running_loop()
+        version_vector = self.graph.version_vector()
+        version = self._snapshot if version_vector == self._snapshot_version else None
+        if version is None:
+            path, tail = self._begin_fork()
+            try:
+                version = await loop.run_in_executor(None, self._fork, path, tail)
+            finally:
+                self._end_fork(path)
+            self._publish(version, version_vector, len(tail))
+        snapshot_query = copy.copy(query)
+        snapshot_query.graph = version
+        return await loop.run_in_executor(None, snapshot_query.execute)
+
+    async def apply_delta(self, delta: Delta) -> int:
+        """Applies a delta in batches, yielding to other tasks between them."""
+        applied = 0
+        for piece in split_delta(delta, self.sync_batch):
+            applied += self.graph.apply_delta(piece)
+            await asyncio.sleep(0)
+        return applied
+
+    async def sync_from(self, other_graph: GraphLayer) -> int:
+        """Pulls the operations this replica is missing from another one."""
+        applied = await self.apply_delta(other_graph.delta_since(self.graph.version_vector()))
+        self.graph.observe_peer(other_graph.node_id, other_graph.version_vector())
+        return applied
+
+    async def merge(self, other_graph: GraphLayer) -> int:
+        """
+        Merges another replica without blocking readers. Replicas built
+        through the GraphLayer API are fully described by their operation
+        logs, so this is a batched delta sync.
+        """
+        return await self.sync_from(other_graph)
+
+    def close(self) -> None:
+        """Releases the current version and removes the base snapshots."""
+        self._snapshot = None
+        self._rebase = None
+        shutil.rmtree(self._directory, ignore_errors=True)
@@ -0,0 +1,403 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Set, Any, Optional, Iterable, Callable
+import re
+from graph_layer_core import GraphLayer, EntityId
+from graph_query_system import CREATED_AT
+from graph_temporal import TemporalView
+from graph_text_index import TEXT_FIELDS
+
+# Fraction of rows an expression is assumed to keep when no index can tell
+DEFAULT_SELECTIVITY = 0.5
+
+class FilterExpression:
+    """
+    Base of the declarative filter expressions accepted by GraphQuery.filter.
+    Unlike opaque callables, expressions can estimate their selectivity and
+    filter a whole set of candidate entity IDs at once, answering from the
+    triple indexes (or the compact backend's columns) when that is cheaper
+    than testing each candidate. Combine them with &, | and ~.
+    With a temporal view, statements, labels and text are read as the view
+    shows them, entity by entity, since the indexes only hold the latest state.
+    """
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        """Tests a single entity."""
+        raise NotImplementedError
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        """Returns the IDs in `ids` that match."""
+        return {entity_id for entity_id in ids if self.matches(graph, entity_id, view)}
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        """Estimated fraction of entities that match."""
+        return DEFAULT_SELECTIVITY
+
+    def predicates(self) -> Set[EntityId]:
+        """Predicates whose statements can change the outcome."""
+        return set()
+
+    def any_predicate(self) -> bool:
+        """Whether statements on any predicate can change the outcome."""
+        return False
+
+    def __and__(self, other: 'FilterExpression') -> 'FilterExpression':
+        return And((self, other))
+
+    def __or__(self, other: 'FilterExpression') -> 'FilterExpression':
+        return Or((self, other))
+
+    def __invert__(self) -> 'FilterExpression':
+        return Not(self)
+
+def _entity_count(graph: GraphLayer) -> int:
+    return max(len(graph.entities), 1)
+
+def _subjects_with(graph: GraphLayer, predicate: EntityId, value: Any = None,
+                   keep: Optional[Callable[[float], bool]] = None) -> Set[EntityId]:
+    """
+    Subjects of the statements on `predicate` (with object `value`, if given)
+    whose certainty passes `keep`. On the compact backend this reads the
+    subject and certainty columns directly, without building statements.
+    """
+    codes = getattr(graph.index, "pos_codes", None)
+    if codes is not None:
+        store = graph.statements
+        predicate_code = store.entity_codes.lookup(predicate)
+        by_object = codes.get(predicate_code, {}) if predicate_code is not None else {}
+        if value is not None:
+            object_code = store.lookup_object(value)
+            runs = [by_object[object_code]] if object_code in by_object else []
+        else:
+            runs = by_object.values()
+        subjects, certainties, decode = store.subjects, store.certainties, store.entity_codes.values
+        return {decode[subjects[row]] for rows in runs for row in rows
+                if keep is None or keep(certainties[row])}
+
+    by_object = graph.index.pos.get(predicate, {})
+    if value is not None:
+        runs = [by_object.get(value, ())]
+    else:
+        runs = by_object.values()
+    return {s.subject for statements in runs for s in statements
+            if keep is None or keep(s.certainty)}
+
+def _statements(graph: GraphLayer, entity_id: EntityId, predicate: EntityId,
+                view: Optional[TemporalView]) -> Iterable[Any]:
+    """The entity's statements on `predicate`, as the view shows them if one is given."""
+    if view is not None:
+        return view.statements(graph, entity_id, predicate)
+    return graph.index.spo.get(entity_id, {}).get(predicate, ())
+
+@dataclass(frozen=True)
+class Has(FilterExpression):
+    """The entity is the subject of a statement on `predicate`, with object `value` if given."""
+    predicate: EntityId
+    value: Any = None
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        statements = _statements(graph, entity_id, self.predicate, view)
+        if self.value is None:
+            return any(True for _ in statements)
+        return any(s.object == self.value for s in statements)
+
+    def _indexed_size(self, graph: GraphLayer) -> float:
+        if self.value is None:
+            return graph.predicate_stats(self.predicate).distinct_subjects
+        return self._statement_count(graph)
+
+    def _statement_count(self, graph: GraphLayer) -> int:
+        """Statements read to collect the matching subjects from the index."""
+        if self.value is None:
+            return graph.predicate_stats(self.predicate).statement_count
+        return len(graph.index.pos.get(self.predicate, {}).get(self.value, ()))
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        if view is None and self._statement_count(graph) <= len(ids):
+            return ids & _subjects_with(graph, self.predicate, self.value)
+        return super().evaluate(graph, ids, view)
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        return min(self._indexed_size(graph) / _entity_count(graph), 1.0)
+
+    def predicates(self) -> Set[EntityId]:
+        return {self.predicate}
+
+    def __str__(self) -> str:
+        return f"has({self.predicate})" if self.value is None else f"has({self.predicate}, {self.value})"
+
+@dataclass(frozen=True)
+class CertaintyRange(FilterExpression):
+    """
+    The entity is the subject of a statement on `predicate` whose certainty
+    lies within the bounds. Built with certainty(predicate) >= x and friends.
+    """
+    predicate: EntityId
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    exclusive: tuple[bool, bool] = (False, False)
+
+    def _in_range(self, certainty: float) -> bool:
+        if self.minimum is not None:
+            if certainty < self.minimum or (self.exclusive[0] and certainty == self.minimum):
+                return False
+        if self.maximum is not None:
+            if certainty > self.maximum or (self.exclusive[1] and certainty == self.maximum):
+                return False
+        return True
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        return any(self._in_range(s.certainty) for s in _statements(graph, entity_id, self.predicate, view))
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        if view is None and graph.predicate_stats(self.predicate).statement_count <= len(ids):
+            return ids & _subjects_with(graph, self.predicate, keep=self._in_range)
+        return super().evaluate(graph, ids, view)
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        return Has(self.predicate).selectivity(graph) * DEFAULT_SELECTIVITY
+
+    def predicates(self) -> Set[EntityId]:
+        return {self.predicate}
+
+    def __str__(self) -> str:
+        bounds = []
+        if self.minimum is not None:
+            bounds.append(f"{'>' if self.exclusive[0] else '>='} {self.minimum}")
+        if self.maximum is not None:
+            bounds.append(f"{'<' if self.exclusive[1] else '<='} {self.maximum}")
+        return f"certainty({self.predicate}) " + " and ".join(bounds)
+
+@dataclass(frozen=True)
+class CertaintyOf:
+    """Comparison target for certainty(predicate) >= x style expressions."""
+    predicate: EntityId
+
+    def __ge__(self, value: float) -> CertaintyRange:
+        return CertaintyRange(self.predicate, minimum=value)
+
+    def __gt__(self, value: float) -> CertaintyRange:
+        return CertaintyRange(self.predicate, minimum=value, exclusive=(True, False))
+
+    def __le__(self, value: float) -> CertaintyRange:
+        return CertaintyRange(self.predicate, maximum=value)
+
+    def __lt__(self, value: float) -> CertaintyRange:
+        return CertaintyRange(self.predicate, maximum=value, exclusive=(False, True))
+
+@dataclass(frozen=True)
+class LabelMatches(FilterExpression):
+    """The entity's latest label in `language` matches a regular expression (re.search)."""
+    pattern: str
+    language: str = "en"
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        if view is not None:
+            label = view.label(graph, entity_id, self.language)
+        else:
+            label = graph.get_latest_label(entity_id, self.language)
+        return label is not None and re.search(self.pattern, label) is not None
+
+    def __str__(self) -> str:
+        return f"label_matches({self.pattern!r})"
+
+@dataclass(frozen=True)
+class CreatedBetween(FilterExpression):
+    """
+    The entity was created in [start, end). Answered from the creation-time
+    sorted index when one has been built for the graph.
+    """
+    start: datetime
+    end: datetime
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        # Creation times never change, so every view sees the same ones
+        entity = graph.entities.get(entity_id)
+        return entity is not None and self.start <= entity.created_at < self.end
+
+    def _indexed(self, graph: GraphLayer) -> Optional[List[EntityId]]:
+        index = graph.sorted_index(CREATED_AT, build=False)
+        if index is None:
+            return None
+        return index.between(self.start, self.end)
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        created = self._indexed(graph)
+        if created is not None and len(created) <= len(ids):
+            return ids & set(created)
+        return super().evaluate(graph, ids, view)
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        created = self._indexed(graph)
+        if created is None:
+            return DEFAULT_SELECTIVITY
+        return len(created) / _entity_count(graph)
+
+    def __str__(self) -> str:
+        return f"created_between({self.start.isoformat()}, {self.end.isoformat()})"
+
+@dataclass(frozen=True)
+class TextMatches(FilterExpression):
+    """
+    The entity's text contains every token of `text` in one field: its latest
+    label or description in `language` (any language for None), or the
+    literal objects of its statements. With prefix set, the last token
+    matches any token it starts. Answered from the graph's text index.
+    """
+    text: str
+    fields: tuple = TEXT_FIELDS
+    language: Optional[str] = "en"
+    prefix: bool = False
+    case_sensitive: bool = False
+
+    def lookup(self, graph: GraphLayer) -> Set[EntityId]:
+        """Every matching entity in the graph."""
+        return graph.text_index().search(self.text, self.fields, self.language,
+                                         self.prefix, self.case_sensitive)
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        return graph.text_index().matches(entity_id, self.text, self.fields, self.language,
+                                          self.prefix, self.case_sensitive, view)
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        if view is not None:
+            return super().evaluate(graph, ids, view)
+        return ids & self.lookup(graph)
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        estimate = graph.text_index().estimate(self.text, self.fields, self.language, self.prefix)
+        return min(estimate / _entity_count(graph), 1.0)
+
+    def any_predicate(self) -> bool:
+        return "literals" in self.fields
+
+    def __str__(self) -> str:
+        options = "".join(f", {name}" for name in ("prefix", "case_sensitive") if getattr(self, name))
+        return f"text_matches({self.text!r}{options})"
+
+def by_selectivity(graph: GraphLayer, expressions: Iterable[FilterExpression]) -> List[FilterExpression]:
+    """Orders expressions so the most selective are evaluated first."""
+    return sorted(expressions, key=lambda expression: expression.selectivity(graph))
+
+@dataclass(frozen=True)
+class And(FilterExpression):
+    """Every operand matches; operands are evaluated most selective first."""
+    operands: tuple
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        return all(operand.matches(graph, entity_id, view) for operand in self.operands)
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        for operand in by_selectivity(graph, self.operands):
+            if not ids:
+                break
+            ids = operand.evaluate(graph, ids, view)
+        return ids
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        result = 1.0
+        for operand in self.operands:
+            result *= operand.selectivity(graph)
+        return result
+
+    def predicates(self) -> Set[EntityId]:
+        return set().union(*(operand.predicates() for operand in self.operands))
+
+    def any_predicate(self) -> bool:
+        return any(operand.any_predicate() for operand in self.operands)
+
+    def __and__(self, other: FilterExpression) -> FilterExpression:
+        return And(self.operands + (other,))
+
+    def __str__(self) -> str:
+        return "(" + " and ".join(str(operand) for operand in self.operands) + ")"
+
+@dataclass(frozen=True)
+class Or(FilterExpression):
+    """At least one operand matches."""
+    operands: tuple
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        return any(operand.matches(graph, entity_id, view) for operand in self.operands)
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        matched: Set[EntityId] = set()
+        for operand in self.operands:
+            matched |= operand.evaluate(graph, ids - matched, view)
+        return matched
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        missed = 1.0
+        for operand in self.operands:
+            missed *= 1.0 - operand.selectivity(graph)
+        return 1.0 - missed
+
+    def predicates(self) -> Set[EntityId]:
+        return set().union(*(operand.predicates() for operand in self.operands))
+
+    def any_predicate(self) -> bool:
+        return any(operand.any_predicate() for operand in self.operands)
+
+    def __or__(self, other: FilterExpression) -> FilterExpression:
+        return Or(self.operands + (other,))
+
+    def __str__(self) -> str:
+        return "(" + " or ".join(str(operand) for operand in self.operands) + ")"
+
+@dataclass(frozen=True)
+class Not(FilterExpression):
+    """The operand does not match."""
+    operand: FilterExpression
+
+    def matches(self, graph: GraphLayer, entity_id: EntityId, view: Optional[TemporalView] = None) -> bool:
+        return not self.operand.matches(graph, entity_id, view)
+
+    def evaluate(self, graph: GraphLayer, ids: Set[EntityId],
+                 view: Optional[TemporalView] = None) -> Set[EntityId]:
+        return ids - self.operand.evaluate(graph, ids, view)
+
+    def selectivity(self, graph: GraphLayer) -> float:
+        return 1.0 - self.operand.selectivity(graph)
+
+    def predicates(self) -> Set[EntityId]:
+        return self.operand.predicates()
+
+    def any_predicate(self) -> bool:
+        return self.operand.any_predicate()
+
+    def __str__(self) -> str:
+        return f"not {self.operand}"
+
+def has(predicate: EntityId, value: Any = None) -> Has:
+    """Entities with a statement on `predicate`, optionally with object `value`."""
+    return Has(predicate, value)
+
+def certainty(predicate: EntityId) -> CertaintyOf:
+    """Compare with >=, >, <= or < to filter on the certainty of `predicate` statements."""
+    return CertaintyOf(predicate)
+
+def label_matches(pattern: str, language: str = "en") -> LabelMatches:
+    """Entities whose latest label matches a regular expression."""
+    return LabelMatches(pattern, language)
+
+def created_between(start: datetime, end: datetime) -> CreatedBetween:
+    """Entities created at or after `start` and before `end`."""
+    return CreatedBetween(start, end)
+
+def text_matches(text: str, fields: Iterable[str] = TEXT_FIELDS, language: Optional[str] = "en",
+                 prefix: bool = False, case_sensitive: bool = False) -> TextMatches:
+    """Entities whose labels, descriptions or literal objects contain the words of `text`."""
+    return TextMatches(text, tuple(fields), language, prefix, case_sensitive)
+
+def passes(graph: GraphLayer, entity_id: EntityId, filters: Iterable[Any],
+           view: Optional[TemporalView] = None) -> bool:
+    """Tests one existing entity against a mix of expressions and callables."""
+    entity = graph.entities[entity_id]
+    return all(f.matches(graph, entity_id, view) if isinstance(f, FilterExpression) else f(entity)
+               for f in filters)
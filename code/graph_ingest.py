@@ -0,0 +1,142 @@
+"""
+Streaming loaders that bulk-import N-Triples and JSON Lines files into a
+GraphLayer in constant memory, apart from the key -> EntityId map.
+"""
+from typing import Dict, List, Optional, Iterable, Iterator, NamedTuple, Union, TextIO
+import json
+import re
+from graph_layer_core import GraphLayer, EntityId, EntityType, StatementBatch
+
+DEFAULT_BATCH_SIZE = 10_000
+
+class RawTriple(NamedTuple):
+    """A parsed triple whose subject, predicate and entity objects are still external keys."""
+    subject: str
+    predicate: str
+    object: str
+    object_is_entity: bool
+    certainty: float = 1.0
+
+_NTRIPLE = re.compile(
+    r'^\s*(<[^>]*>|_:\S+)\s+<([^>]*)>\s+'
+    r'(<[^>]*>|_:\S+|"((?:[^"\\]|\\.)*)"(?:@[A-Za-z0-9-]+|\^\^<[^>]*>)?)\s*\.\s*$'
+)
+_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+_SIMPLE_ESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+def _unescape(literal: str) -> str:
+    def replace(match):
+        code = match.group(1) or match.group(2)
+        if code:
+            return chr(int(code, 16))
+        return _SIMPLE_ESCAPES.get(match.group(3), match.group(3))
+    return _ESCAPE.sub(replace, literal)
+
+def _node_key(term: str) -> str:
+    return term[1:-1] if term.startswith("<") else term
+
+def read_ntriples(lines: Iterable[str]) -> Iterator[RawTriple]:
+    """
+    Parses N-Triples lines. IRIs and blank nodes become entity keys; literals
+    keep their lexical form, dropping language tags and datatypes.
+    """
+    for number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        match = _NTRIPLE.match(stripped)
+        if not match:
+            raise ValueError(f"Invalid N-Triples on line {number}: {stripped[:80]}")
+        subject, predicate, object_, literal = match.groups()
+        if literal is not None:
+            yield RawTriple(_node_key(subject), predicate, _unescape(literal), False)
+        else:
+            yield RawTriple(_node_key(subject), predicate, _node_key(object_), True)
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[RawTriple]:
+    """
+    Parses JSON Lines triples of the form
+    {"subject": key, "predicate": key, "object": literal} or
+    {"subject": key, "predicate": key, "object_id": key}, with an optional
+    "certainty".
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        try:
+            if "object_id" in record:
+                object_, is_entity = record["object_id"], True
+            else:
+                object_, is_entity = record["object"], False
+            yield RawTriple(record["subject"], record["predicate"], object_, is_entity,
+                            record.get("certainty", 1.0))
+        except KeyError as missing:
+            raise ValueError(f"JSON line {number} is missing {missing}") from None
+
+class StreamingLoader:
+    """
+    Loads RawTriples into a graph in fixed-size batches.
+    Keys seen for the first time become new entities (properties when used as
+    predicates) through bulk_create_entities; id_map holds the key -> EntityId
+    mapping and can be shared across loads so keys resolve consistently.
+    """
+    def __init__(self, graph: GraphLayer, batch_size: int = DEFAULT_BATCH_SIZE,
+                 id_map: Optional[Dict[str, EntityId]] = None):
+        self.graph = graph
+        self.batch_size = batch_size
+        self.id_map: Dict[str, EntityId] = id_map if id_map is not None else {}
+
+    def load(self, triples: Iterable[RawTriple]) -> int:
+        """Loads every triple and returns the number of statements added."""
+        added = 0
+        batch: List[RawTriple] = []
+        for triple in triples:
+            batch.append(triple)
+            if len(batch) >= self.batch_size:
+                added += self._flush(batch)
+                batch = []
+        if batch:
+            added += self._flush(batch)
+        return added
+
+    def _resolve(self, keys: Iterable[str], entity_type: EntityType) -> None:
+        missing = list(dict.fromkeys(k for k in keys if k not in self.id_map))
+        for key, entity in zip(missing, self.graph.bulk_create_entities(len(missing), entity_type)):
+            self.id_map[key] = entity.id
+
+    def _flush(self, batch: List[RawTriple]) -> int:
+        self._resolve((t.predicate for t in batch), EntityType.PROPERTY)
+        self._resolve((key for t in batch for key in
+                       ((t.subject, t.object) if t.object_is_entity else (t.subject,))),
+                      EntityType.STANDARD)
+        id_map = self.id_map
+        return self.graph.bulk_add_statements(StatementBatch(
+            subjects=[id_map[t.subject] for t in batch],
+            predicates=[id_map[t.predicate] for t in batch],
+            objects=[id_map[t.object] if t.object_is_entity else t.object for t in batch],
+            certainties=[t.certainty for t in batch]
+        ))
+
+def _open_lines(source: Union[str, TextIO]) -> Iterable[str]:
+    return open(source, encoding="utf-8") if isinstance(source, str) else source
+
+def load_ntriples(graph: GraphLayer, source: Union[str, TextIO], batch_size: int = DEFAULT_BATCH_SIZE,
+                  id_map: Optional[Dict[str, EntityId]] = None) -> int:
+    """Streams an N-Triples file (path or open text file) into a graph."""
+    lines = _open_lines(source)
+    try:
+        return StreamingLoader(graph, batch_size, id_map).load(read_ntriples(lines))
+    finally:
+        if isinstance(source, str):
+            lines.close()
+
+def load_jsonl(graph: GraphLayer, source: Union[str, TextIO], batch_size: int = DEFAULT_BATCH_SIZE,
+               id_map: Optional[Dict[str, EntityId]] = None) -> int:
+    """Streams a JSON Lines triple file (path or open text file) into a graph."""
+    lines = _open_lines(source)
+    try:
+        return StreamingLoader(graph, batch_size, id_map).load(read_jsonl(lines))
+    finally:
+        if isinstance(source, str):
+            lines.close()
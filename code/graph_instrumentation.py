@@ -0,0 +1,115 @@
+"""
+Profiling hooks for the graph layer and query engine: a span-based tracer
+interface with a no-op default, a callback tracer, and a slow-query log.
+Nothing here runs unless a tracer or slow-query log is installed on the graph.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Deque
+import time
+
+DEFAULT_SLOW_QUERY_ENTRIES = 100
+
+@dataclass
+class StageStats:
+    """Time and output rows of one plan step in one query execution."""
+    operator: str
+    detail: str
+    rows: int
+    elapsed_ms: float
+
+class Span:
+    """
+    A timed unit of work, in the style of an OpenTelemetry span. Used as a
+    context manager; the base class records nothing.
+    """
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attaches a key/value pair to the span."""
+
+    def __enter__(self) -> 'Span':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+NO_OP_SPAN = Span()
+
+class Tracer:
+    """
+    Creates spans for instrumented operations: "graph.query.execute",
+    "graph.add_statement" and "graph.merge". The base class is a no-op;
+    subclass it, or adapt an OpenTelemetry tracer, and install it with
+    GraphLayer.set_tracer.
+    """
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Span:
+        return NO_OP_SPAN
+
+class _CallbackSpan(Span):
+    __slots__ = ("tracer", "name", "attributes", "_start")
+
+    def __init__(self, tracer: 'CallbackTracer', name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> 'Span':
+        if self.tracer.on_start is not None:
+            self.tracer.on_start(self.name, self.attributes)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed_ms = (time.perf_counter_ns() - self._start) / 1_000_000
+        if self.tracer.on_end is not None:
+            self.tracer.on_end(self.name, self.attributes, elapsed_ms)
+
+class CallbackTracer(Tracer):
+    """
+    Tracer that calls on_start(name, attributes) when a span opens and
+    on_end(name, attributes, elapsed_ms) when it closes.
+    """
+    def __init__(self, on_start: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 on_end: Optional[Callable[[str, Dict[str, Any], float], None]] = None):
+        self.on_start = on_start
+        self.on_end = on_end
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Span:
+        return _CallbackSpan(self, name, dict(attributes or {}))
+
+@dataclass
+class SlowQuery:
+    """A query execution that took longer than the slow-query threshold."""
+    plan: str  # EXPLAIN output with actual row counts
+    execution_time_ms: float
+    total_matches: int
+    stages: List[StageStats]
+    recorded_at: datetime = field(default_factory=datetime.now)
+
+class SlowQueryLog:
+    """
+    Keeps the most recent queries slower than threshold_ms, with their plan
+    and per-stage timings, and optionally passes each one to a callback.
+    Cached results are never recorded.
+    """
+    def __init__(self, threshold_ms: float, max_entries: int = DEFAULT_SLOW_QUERY_ENTRIES,
+                 callback: Optional[Callable[[SlowQuery], None]] = None):
+        self.threshold_ms = threshold_ms
+        self.entries: Deque[SlowQuery] = deque(maxlen=max_entries)
+        self.callback = callback
+
+    def observe(self, plan: Any, execution_time_ms: float, total_matches: int,
+                stages: List[StageStats]) -> None:
+        """Records an execution if it crossed the threshold."""
+        if execution_time_ms < self.threshold_ms:
+            return
+        entry = SlowQuery(str(plan), execution_time_ms, total_matches, stages)
+        self.entries.append(entry)
+        if self.callback is not None:
+            self.callback(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
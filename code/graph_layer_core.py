@@ -1,7 +1,8 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Set, Union, Optional
+from typing import Dict, Set, List, Any, Union, Optional, Iterator, Iterable, Callable, NamedTuple
 from enum import Enum
+import os
 import uuid
 
 class EntityType(Enum):
@@ -36,6 +37,32 @@ class Entity:
     labels: Dict[str, Set[tuple[str, datetime, str]]] = field(default_factory=dict)
     # CRDT for descriptions in different languages
     descriptions: Dict[str, Set[tuple[str, datetime, str]]] = field(default_factory=dict)
+    # Cached last-writer-wins values per (kind, language), filled in on first use
+    _winners: Dict[tuple[str, str], tuple[str, datetime, str]] = field(
+        default_factory=dict, compare=False, repr=False)
+
+    def latest(self, kind: str = "labels", language: str = "en") -> Optional[tuple[str, datetime, str]]:
+        """
+        Returns the winning (text, timestamp, node_id) label or description in
+        a language: latest timestamp first, ties broken by node_id and text.
+        """
+        winner = self._winners.get((kind, language))
+        if winner is None:
+            values = getattr(self, kind).get(language)
+            if not values:
+                return None
+            winner = self._winners[(kind, language)] = max(values, key=lww_key)
+        return winner
+
+    def _observe(self, kind: str, language: str, value: tuple[str, datetime, str]) -> None:
+        """Updates the cached winner after a value was added to a label or description set."""
+        winner = self._winners.get((kind, language))
+        if winner is not None and lww_key(value) > lww_key(winner):
+            self._winners[(kind, language)] = value
+
+def lww_key(value: tuple[str, datetime, str]) -> tuple[datetime, str, str]:
+    """Deterministic last-writer-wins order of a (text, timestamp, node_id) value."""
+    return (value[1], value[2], value[0])
 
 @dataclass(frozen=True)
 class Statement:
@@ -54,17 +81,227 @@ class Statement:
     def __post_init__(self):
         if self.predicate.id_type != EntityType.PROPERTY:
             raise ValueError("Predicate must be a property type entity")
+    
+    @classmethod
+    def _prevalidated(cls, id: str, subject: EntityId, predicate: EntityId,
+                      object: Union[EntityId, str], timestamp: datetime,
+                      node_id: str, certainty: float) -> 'Statement':
+        """
+        Builds a statement without re-running validation, for bulk paths that
+        have already checked each distinct predicate once.
+        """
+        statement = _object_new(cls)
+        for name, value in (("id", id), ("subject", subject), ("predicate", predicate),
+                            ("object", object), ("timestamp", timestamp),
+                            ("node_id", node_id), ("certainty", certainty)):
+            _object_setattr(statement, name, value)
+        return statement
+
+_object_new = object.__new__
+_object_setattr = object.__setattr__
+
+def new_statement_ids(count: int) -> List[str]:
+    """Generates random (version 4) UUID strings from a single entropy read."""
+    entropy = bytearray(os.urandom(16 * count))
+    ids = []
+    for offset in range(0, 16 * count, 16):
+        ids.append(str(uuid.UUID(bytes=bytes(entropy[offset:offset + 16]), version=4)))
+    return ids
+
+@dataclass
+class StatementBatch:
+    """
+    A columnar batch of statements for bulk ingestion.
+    All columns are parallel lists; certainties defaults to 1.0 for every row.
+    """
+    subjects: List[EntityId]
+    predicates: List[EntityId]
+    objects: List[Union[EntityId, str]]
+    certainties: Optional[List[float]] = None
+
+    def rows(self) -> Iterator[tuple]:
+        if self.certainties is None:
+            return zip(self.subjects, self.predicates, self.objects)
+        return zip(self.subjects, self.predicates, self.objects, self.certainties)
+
+    def __len__(self) -> int:
+        return len(self.subjects)
+
+# Rows handled per chunk by bulk ingestion, bounding its working memory
+BULK_CHUNK_SIZE = 10_000
+
+@dataclass
+class PredicateStats:
+    """
+    Cardinality statistics for a single predicate, used by the query planner
+    to estimate hop sizes and choose a traversal direction.
+    """
+    statement_count: int = 0
+    distinct_subjects: int = 0
+    distinct_objects: int = 0
+
+    @property
+    def forward_fanout(self) -> float:
+        """Average number of statements per subject."""
+        return self.statement_count / self.distinct_subjects if self.distinct_subjects else 0.0
+
+    @property
+    def reverse_fanout(self) -> float:
+        """Average number of statements per object."""
+        return self.statement_count / self.distinct_objects if self.distinct_objects else 0.0
+
+class TripleIndex:
+    """
+    Subject/predicate/object indexes over the statement set.
+    Each index maps two levels of keys to the set of matching statements, so a
+    lookup costs about as much as the statements it returns:
+    - spo: subject -> predicate -> statements
+    - pos: predicate -> object -> statements
+    - osp: object -> subject -> statements
+    """
+    def __init__(self):
+        self.spo: Dict[EntityId, Dict[EntityId, Set[Statement]]] = {}
+        self.pos: Dict[EntityId, Dict[Union[EntityId, str], Set[Statement]]] = {}
+        self.osp: Dict[Union[EntityId, str], Dict[EntityId, Set[Statement]]] = {}
+        self.predicate_stats: Dict[EntityId, PredicateStats] = {}
+
+    def add(self, statement: Statement) -> None:
+        """Indexes a single statement. The caller guarantees it is new."""
+        stats = self.predicate_stats.get(statement.predicate)
+        if stats is None:
+            stats = self.predicate_stats[statement.predicate] = PredicateStats()
+        stats.statement_count += 1
+        
+        by_predicate = self.spo.setdefault(statement.subject, {})
+        if statement.predicate not in by_predicate:
+            by_predicate[statement.predicate] = set()
+            stats.distinct_subjects += 1
+        by_predicate[statement.predicate].add(statement)
+        
+        by_object = self.pos.setdefault(statement.predicate, {})
+        if statement.object not in by_object:
+            by_object[statement.object] = set()
+            stats.distinct_objects += 1
+        by_object[statement.object].add(statement)
+        
+        self.osp.setdefault(statement.object, {}).setdefault(statement.subject, set()).add(statement)
+
+    def match(self, subject: Optional[EntityId] = None, predicate: Optional[EntityId] = None,
+              object_: Union[EntityId, str, None] = None) -> Iterator[Statement]:
+        """
+        Yields statements matching a (subject, predicate, object) pattern.
+        None acts as a wildcard; the most selective index for the bound
+        positions is used.
+        """
+        if subject is not None:
+            by_predicate = self.spo.get(subject, {})
+            if predicate is not None:
+                candidates = by_predicate.get(predicate, ())
+                if object_ is None:
+                    yield from candidates
+                else:
+                    yield from (s for s in candidates if s.object == object_)
+            elif object_ is not None:
+                yield from self.osp.get(object_, {}).get(subject, ())
+            else:
+                for statements in by_predicate.values():
+                    yield from statements
+        elif predicate is not None:
+            by_object = self.pos.get(predicate, {})
+            if object_ is not None:
+                yield from by_object.get(object_, ())
+            else:
+                for statements in by_object.values():
+                    yield from statements
+        elif object_ is not None:
+            for statements in self.osp.get(object_, {}).values():
+                yield from statements
+        else:
+            for by_predicate in self.spo.values():
+                for statements in by_predicate.values():
+                    yield from statements
+
+class EntityCreated(NamedTuple):
+    """Operation log record for the creation of an entity."""
+    entity_id: EntityId
+    created_at: datetime
+
+class LabelAdded(NamedTuple):
+    """Operation log record for a label or description added to an entity."""
+    entity_id: EntityId
+    language: str
+    value: tuple[str, datetime, str]
+    kind: str = "labels"  # "labels" or "descriptions"
+
+class EntityDeleted(NamedTuple):
+    """Operation log record for an entity tombstoned by a node."""
+    entity_id: EntityId
+    deleted_at: datetime
+    node_id: str
+
+def operation_origin(operation: Any) -> str:
+    """Returns the ID of the node that performed a logged operation."""
+    if isinstance(operation, EntityCreated):
+        return operation.entity_id.node_id
+    if isinstance(operation, LabelAdded):
+        return operation.value[2]
+    return operation.node_id
+
+@dataclass
+class Delta:
+    """
+    The operations one replica has that a peer has not seen.
+    Operations are grouped by the node that performed them; each group is a
+    contiguous run of that node's log starting at a 1-based sequence number.
+    """
+    operations: Dict[str, tuple[int, List[Any]]] = field(default_factory=dict)
+
+    def version_vector(self) -> Dict[str, int]:
+        """The highest sequence number per node contained in the delta."""
+        return {node: first + len(ops) - 1 for node, (first, ops) in self.operations.items() if ops}
+
+    def __len__(self) -> int:
+        return sum(len(ops) for _, ops in self.operations.values())
 
 class GraphLayer:
     """
     Core graph storage and manipulation layer.
-    Maintains CRDT sets of entities and statements.
+    Maintains CRDT sets of entities and statements, plus triple indexes
+    over the statements for traversal.
+    
+    With compact set, statements are kept in interned integer columns instead
+    of a set of Statement objects (see graph_storage). The statements and
+    index attributes keep the same interface either way.
+    
+    Every entity, label and statement is also recorded in a per-node operation
+    log. A version vector of log lengths lets replicas exchange only the
+    operations a peer is missing (delta_since/apply_delta) instead of merging
+    whole graphs.
     """
-    def __init__(self, node_id: str):
+    def __init__(self, node_id: str, compact: bool = False):
         self.node_id = node_id
         self.entities: Dict[EntityId, Entity] = {}
-        self.statements: Set[Statement] = set()
+        if compact:
+            from graph_storage import CompactStatementStore, CompactTripleIndex  # Import here to avoid circular imports
+            self.statements = CompactStatementStore()
+            self.index = CompactTripleIndex(self.statements)
+        else:
+            self.statements: Set[Statement] = set()
+            self.index = TripleIndex()
         self._local_id_counter = 0
+        # Operations per originating node; sequence numbers are 1-based positions
+        self._op_log: Dict[str, List[Any]] = {}
+        self._operation_listeners: List[Callable[[str, int, Any], None]] = []
+        self._sorted_indexes: Dict[Any, 'SortedIndex'] = {}
+        self._temporal_index: Optional['TemporalIndex'] = None
+        self._text_index: Optional['TextIndex'] = None
+        # Profiling hooks (see graph_instrumentation); None keeps them off the hot path
+        self.tracer: Optional['Tracer'] = None
+        self.slow_query_log: Optional['SlowQueryLog'] = None
+        self.views: Dict[str, 'MaterializedView'] = {}
+        self.query_cache: Optional['QueryCache'] = None
+        # Lowest version vector each known peer is known to have seen
+        self._peer_versions: Dict[str, Dict[str, int]] = {}
     
     def create_entity(self, entity_type: EntityType = EntityType.STANDARD) -> Entity:
         """Creates a new entity with a unique ID."""
@@ -79,23 +316,66 @@ class GraphLayer:
             created_at=datetime.now()
         )
         self.entities[entity_id] = entity
+        self._log(EntityCreated(entity_id, entity.created_at))
         return entity
     
+    def bulk_create_entities(self, count: int, entity_type: EntityType = EntityType.STANDARD,
+                             labels: Optional[Iterable[str]] = None,
+                             language: str = "en") -> List[Entity]:
+        """
+        Creates `count` entities sharing one creation timestamp, optionally
+        labelling them in order from `labels`.
+        """
+        created_at = datetime.now()
+        entities = []
+        for _ in range(count):
+            self._local_id_counter += 1
+            entity_id = EntityId(
+                id_type=entity_type,
+                local_id=str(self._local_id_counter),
+                node_id=self.node_id
+            )
+            entity = Entity(id=entity_id, created_at=created_at)
+            self.entities[entity_id] = entity
+            self._log(EntityCreated(entity_id, created_at))
+            entities.append(entity)
+        if labels is not None:
+            for entity, label in zip(entities, labels):
+                value = (label, created_at, self.node_id)
+                self._add_label_value(entity, "labels", language, value)
+                self._log(LabelAdded(entity.id, language, value))
+        return entities
+    
     def add_label(self, entity_id: EntityId, label: str, language: str = "en") -> None:
         """Adds a label to an entity in a specific language."""
         entity = self.entities.get(entity_id)
         if not entity:
             raise ValueError(f"Entity {entity_id} not found")
         
-        if language not in entity.labels:
-            entity.labels[language] = set()
-            
         # Add to the CRDT set with timestamp and node_id
-        entity.labels[language].add((label, datetime.now(), self.node_id))
+        value = (label, datetime.now(), self.node_id)
+        self._add_label_value(entity, "labels", language, value)
+        self._log(LabelAdded(entity_id, language, value))
+    
+    def _add_label_value(self, entity: Entity, kind: str, language: str,
+                         value: tuple[str, datetime, str]) -> None:
+        """Adds a (text, timestamp, node_id) tuple to an entity's label or description set."""
+        values = getattr(entity, kind)
+        if language not in values:
+            values[language] = set()
+        values[language].add(value)
+        entity._observe(kind, language, value)
     
     def add_statement(self, subject: EntityId, predicate: EntityId, 
                      object_: Union[EntityId, str], certainty: float = 1.0) -> Statement:
         """Adds a new statement to the graph."""
+        if self.tracer is not None:
+            with self.tracer.start_span("graph.add_statement", {"predicate": str(predicate)}):
+                return self._add_statement(subject, predicate, object_, certainty)
+        return self._add_statement(subject, predicate, object_, certainty)
+
+    def _add_statement(self, subject: EntityId, predicate: EntityId,
+                       object_: Union[EntityId, str], certainty: float) -> Statement:
         statement = Statement(
             id=str(uuid.uuid4()),
             subject=subject,
@@ -105,42 +385,444 @@ class GraphLayer:
             node_id=self.node_id,
             certainty=certainty
         )
-        self.statements.add(statement)
+        self._insert_statement(statement)
+        self._log(statement)
         return statement
+
+    def bulk_add_statements(self, statements: Union[StatementBatch, Iterable[tuple]],
+                            shared_timestamp: bool = True) -> int:
+        """
+        Adds many statements at once and returns how many were added.
+        Accepts a StatementBatch or an iterable of (subject, predicate, object)
+        or (subject, predicate, object, certainty) tuples. Rows are processed
+        in chunks: each distinct predicate is validated once, statement IDs
+        come from one entropy read per chunk, and with shared_timestamp the
+        whole chunk is stamped with a single datetime.now(). Compact graphs
+        append straight to their columns without building Statement objects.
+        """
+        from graph_storage import CompactStatementStore  # Import here to avoid circular imports
+        rows = statements.rows() if isinstance(statements, StatementBatch) else iter(statements)
+        columnar = type(self.statements) is CompactStatementStore
+        validated: Set[EntityId] = set()
+        added = 0
+        while True:
+            chunk = [row for _, row in zip(range(BULK_CHUNK_SIZE), rows)]
+            if not chunk:
+                return added
+            for row in chunk:
+                predicate = row[1]
+                if predicate not in validated:
+                    if predicate.id_type != EntityType.PROPERTY:
+                        raise ValueError(f"Predicate {predicate} must be a property type entity")
+                    validated.add(predicate)
+            if columnar:
+                self._bulk_append_columns(chunk, shared_timestamp)
+            else:
+                self._bulk_insert_statements(chunk, shared_timestamp)
+            added += len(chunk)
+
+    def _bulk_insert_statements(self, chunk: List[tuple], shared_timestamp: bool) -> None:
+        timestamp = datetime.now()
+        for statement_id, row in zip(new_statement_ids(len(chunk)), chunk):
+            statement = Statement._prevalidated(
+                statement_id, row[0], row[1], row[2],
+                timestamp if shared_timestamp else datetime.now(),
+                self.node_id, row[3] if len(row) > 3 else 1.0
+            )
+            self._insert_statement(statement)
+            self._log(statement)
+
+    def _bulk_append_columns(self, chunk: List[tuple], shared_timestamp: bool) -> None:
+        from graph_storage import to_microseconds  # Import here to avoid circular imports
+        store, index = self.statements, self.index
+        encode_entity, encode_object = store.entity_codes.encode, store.encode_object
+        node = store.node_codes.encode(self.node_id)
+        timestamp = to_microseconds(datetime.now())
+        entropy = bytearray(os.urandom(16 * len(chunk)))
+        log = self._op_log.setdefault(self.node_id, [])
+        for i, row in enumerate(chunk):
+            id_bytes = entropy[i * 16:i * 16 + 16]
+            id_bytes[6] = (id_bytes[6] & 0x0F) | 0x40  # UUID version 4
+            id_bytes[8] = (id_bytes[8] & 0x3F) | 0x80  # RFC 4122 variant
+            position = store.append(
+                bytes(id_bytes), encode_entity(row[0]), encode_entity(row[1]), encode_object(row[2]),
+                timestamp if shared_timestamp else to_microseconds(datetime.now()),
+                node, row[3] if len(row) > 3 else 1.0
+            )
+            index.add_row(position)
+            log.append(position)
+            if self._operation_listeners:
+                statement = store.statement(position)
+                for listener in self._operation_listeners:
+                    listener(self.node_id, len(log), statement)
+
+    def _insert_statement(self, statement: Statement) -> bool:
+        """
+        Adds a statement to the set and the indexes.
+        Returns False if the statement was already present.
+        """
+        if statement in self.statements:
+            return False
+        self.statements.add(statement)
+        self.index.add(statement)
+        return True
+
+    def find_statements(self, subject: Optional[EntityId] = None,
+                        predicate: Optional[EntityId] = None,
+                        object_: Union[EntityId, str, None] = None) -> Iterator[Statement]:
+        """Finds statements matching a pattern, using None as a wildcard."""
+        return self.index.match(subject, predicate, object_)
+    
+    def predicate_stats(self, predicate: EntityId) -> PredicateStats:
+        """Returns cardinality statistics for a predicate."""
+        return self.index.predicate_stats.get(predicate) or PredicateStats()
+    
+    def sorted_index(self, key: 'IndexedKey', build: bool = True) -> Optional['SortedIndex']:
+        """
+        Returns the sorted index for an IndexedKey, building it on first use.
+        It is kept current through the operation log afterwards. With build
+        unset, returns None instead of building an index not yet in use.
+        """
+        index = self._sorted_indexes.get(key)
+        if index is None and build:
+            from graph_sorted_index import SortedIndex  # Import here to avoid circular imports
+            index = self._sorted_indexes[key] = SortedIndex(self, key)
+            self.add_operation_listener(index.on_operation)
+        return index
+
+    def temporal_index(self) -> 'TemporalIndex':
+        """
+        Returns the time-partitioned statement index used by as_of and current
+        queries, building it on first use (see graph_temporal).
+        """
+        if self._temporal_index is None:
+            from graph_temporal import TemporalIndex  # Import here to avoid circular imports
+            self._temporal_index = TemporalIndex(self)
+            self.add_operation_listener(self._temporal_index.on_operation)
+        return self._temporal_index
+
+    def text_index(self) -> 'TextIndex':
+        """
+        Returns the full-text index over labels, descriptions and literal
+        objects, building it on first use (see graph_text_index).
+        """
+        if self._text_index is None:
+            from graph_text_index import TextIndex  # Import here to avoid circular imports
+            self._text_index = TextIndex(self)
+            self.add_operation_listener(self._text_index.on_operation)
+        return self._text_index
+
+    def set_tracer(self, tracer: Optional['Tracer']) -> None:
+        """
+        Installs a graph_instrumentation.Tracer whose spans wrap query
+        execution, add_statement and merge. None turns tracing off.
+        """
+        self.tracer = tracer
+
+    def enable_slow_query_log(self, threshold_ms: float, max_entries: int = 100,
+                              callback: Optional[Callable[[Any], None]] = None) -> 'SlowQueryLog':
+        """
+        Starts recording queries slower than threshold_ms, with their plans
+        and per-stage timings (see graph_instrumentation.SlowQueryLog).
+        """
+        from graph_instrumentation import SlowQueryLog  # Import here to avoid circular imports
+        self.slow_query_log = SlowQueryLog(threshold_ms, max_entries, callback)
+        return self.slow_query_log
+
+    def disable_slow_query_log(self) -> None:
+        """Stops recording slow queries."""
+        self.slow_query_log = None
+
+    def register_view(self, name: str, query: 'GraphQuery') -> 'MaterializedView':
+        """
+        Registers a query as a named materialized view. Its results are built
+        now and maintained as operations arrive (see graph_views).
+        """
+        if name in self.views:
+            raise ValueError(f"View {name!r} is already registered")
+        from graph_views import MaterializedView  # Import here to avoid circular imports
+        view = self.views[name] = MaterializedView(self, name, query)
+        self.add_operation_listener(view.on_operation)
+        return view
+
+    def drop_view(self, name: str) -> None:
+        """Removes a materialized view and stops maintaining it."""
+        view = self.views.pop(name, None)
+        if view is None:
+            raise ValueError(f"View {name!r} not found")
+        self.remove_operation_listener(view.on_operation)
+
+    def views_nbytes(self) -> Dict[str, int]:
+        """Returns the approximate memory held by each materialized view."""
+        return {name: view.nbytes() for name, view in self.views.items()}
+
+    def enable_query_cache(self, max_entries: int = 256,
+                           max_bytes: Optional[int] = None) -> 'QueryCache':
+        """
+        Turns on the query result cache (see graph_query_cache), replacing any
+        existing one. Entries are invalidated through the operation log.
+        """
+        from graph_query_cache import QueryCache  # Import here to avoid circular imports
+        self.disable_query_cache()
+        self.query_cache = QueryCache(self, max_entries, max_bytes)
+        self.add_operation_listener(self.query_cache.on_operation)
+        return self.query_cache
+
+    def disable_query_cache(self) -> None:
+        """Turns off the query result cache."""
+        if self.query_cache is not None:
+            self.remove_operation_listener(self.query_cache.on_operation)
+            self.query_cache = None
+
+    def add_description(self, entity_id: EntityId, description: str, language: str = "en") -> None:
+        """Adds a description to an entity in a specific language."""
+        entity = self.entities.get(entity_id)
+        if not entity:
+            raise ValueError(f"Entity {entity_id} not found")
+        
+        value = (description, datetime.now(), self.node_id)
+        self._add_label_value(entity, "descriptions", language, value)
+        self._log(LabelAdded(entity_id, language, value, kind="descriptions"))
+    
+    def delete_entity(self, entity_id: EntityId) -> None:
+        """
+        Tombstones an entity. Its statements stay in the history; queries in
+        current or as_of mode hide it from the deletion time onwards.
+        """
+        entity = self.entities.get(entity_id)
+        if not entity:
+            raise ValueError(f"Entity {entity_id} not found")
+        entity.tombstone = True
+        self._log(EntityDeleted(entity_id, datetime.now(), self.node_id))
     
     def get_latest_label(self, entity_id: EntityId, language: str = "en") -> Optional[str]:
-        """Gets the most recent label for an entity in a specific language."""
+        """
+        Gets the most recent label for an entity in a specific language.
+        The winner is cached on the entity, so this is O(1) after first use.
+        """
+        entity = self.entities.get(entity_id)
+        latest = entity.latest("labels", language) if entity else None
+        return latest[0] if latest else None
+    
+    def get_latest_description(self, entity_id: EntityId, language: str = "en") -> Optional[str]:
+        """Gets the most recent description for an entity in a specific language."""
         entity = self.entities.get(entity_id)
-        if not entity or language not in entity.labels:
-            return None
-            
-        # Get the label with the latest timestamp
-        latest = max(entity.labels[language], key=lambda x: x[1])
-        return latest[0]
+        latest = entity.latest("descriptions", language) if entity else None
+        return latest[0] if latest else None
+
+    def observe_peer(self, node_id: str, version_vector: Dict[str, int]) -> None:
+        """
+        Records that a replica has seen at least the given version vector.
+        compact_labels only prunes values every known replica has observed.
+        Called automatically when syncing or merging from another replica.
+        """
+        known = self._peer_versions.setdefault(node_id, {})
+        for node, seen in version_vector.items():
+            known[node] = max(known.get(node, 0), seen)
+
+    def compact_labels(self) -> int:
+        """
+        Prunes label and description values superseded by a winner that every
+        known replica (this one and those passed to observe_peer) has already
+        observed, and returns how many values were removed. A late copy of a
+        pruned value would lose to the winner again, so results are unchanged.
+        The operation log keeps every value for peers that still need them.
+        """
+        stable = self.version_vector()
+        for version in self._peer_versions.values():
+            stable = {node: min(seen, version.get(node, 0)) for node, seen in stable.items()}
+        stable_values = set()
+        for node, seen in stable.items():
+            for entry in self._op_log[node][:seen]:
+                if isinstance(entry, LabelAdded):
+                    stable_values.add((entry.entity_id, entry.kind, entry.language, entry.value))
+        
+        pruned = 0
+        for entity in self.entities.values():
+            for kind in ("labels", "descriptions"):
+                for language, values in getattr(entity, kind).items():
+                    winner = entity.latest(kind, language)
+                    if len(values) > 1 and (entity.id, kind, language, winner) in stable_values:
+                        pruned += len(values) - 1
+                        values.intersection_update((winner,))
+        return pruned
     
     def merge(self, other_graph: 'GraphLayer') -> None:
         """
         Merges another graph into this one.
         Implements CRDT merge operation.
         """
+        if self.tracer is not None:
+            with self.tracer.start_span("graph.merge", {"from_node": other_graph.node_id}) as span:
+                before = len(self.statements)
+                self._merge(other_graph)
+                span.set_attribute("statements_added", len(self.statements) - before)
+            return
+        self._merge(other_graph)
+
+    def _merge(self, other_graph: 'GraphLayer') -> None:
         # Merge entities
         for entity_id, entity in other_graph.entities.items():
             if entity_id not in self.entities:
-                self.entities[entity_id] = entity
+                # Copy the label sets so the replicas never share mutable state
+                self.entities[entity_id] = Entity(
+                    id=entity_id,
+                    created_at=entity.created_at,
+                    tombstone=entity.tombstone,
+                    labels={lang: set(values) for lang, values in entity.labels.items()},
+                    descriptions={lang: set(values) for lang, values in entity.descriptions.items()}
+                )
             else:
-                # Merge labels and descriptions (CRDT union)
-                for lang, labels in entity.labels.items():
-                    if lang not in self.entities[entity_id].labels:
-                        self.entities[entity_id].labels[lang] = set()
-                    self.entities[entity_id].labels[lang].update(labels)
-                
-                for lang, descs in entity.descriptions.items():
-                    if lang not in self.entities[entity_id].descriptions:
-                        self.entities[entity_id].descriptions[lang] = set()
-                    self.entities[entity_id].descriptions[lang].update(descs)
+                # Merge labels and descriptions (CRDT union), keeping the cached winners current
+                local = self.entities[entity_id]
+                local.tombstone = local.tombstone or entity.tombstone
+                for kind in ("labels", "descriptions"):
+                    local_values = getattr(local, kind)
+                    for lang, values in getattr(entity, kind).items():
+                        if lang not in local_values:
+                            local_values[lang] = set()
+                        local_values[lang].update(values)
+                        winner = entity.latest(kind, lang)
+                        if winner is not None:
+                            local._observe(kind, lang, winner)
         
-        # Merge statements (CRDT union)
-        self.statements.update(other_graph.statements)
+        # Merge statements (CRDT union), indexing only the ones we lack
+        for statement in other_graph.statements:
+            self._insert_statement(statement)
+        
+        # Adopt the operations the other replica has logged beyond ours
+        for node in other_graph._op_log:
+            seen = len(self._op_log.get(node, ()))
+            for operation in other_graph._operations_from(node, seen):
+                self._append_log(node, operation)
+        self.observe_peer(other_graph.node_id, other_graph.version_vector())
+
+    def add_operation_listener(self, listener: Callable[[str, int, Any], None]) -> None:
+        """
+        Registers a callback for every operation appended to the log, whether
+        performed locally, merged or applied from a delta. It is called with
+        the originating node, the operation's sequence number and the operation.
+        """
+        self._operation_listeners.append(listener)
+
+    def remove_operation_listener(self, listener: Callable[[str, int, Any], None]) -> None:
+        """Unregisters a callback added with add_operation_listener."""
+        self._operation_listeners.remove(listener)
+
+    def _log(self, operation: Any) -> None:
+        """Appends a locally performed operation to its node's log."""
+        self._append_log(operation_origin(operation), operation)
+
+    def _append_log(self, node: str, operation: Any) -> None:
+        log = self._op_log.setdefault(node, [])
+        log.append(self._log_entry(operation))
+        for listener in self._operation_listeners:
+            listener(node, len(log), operation)
+
+    def _log_entry(self, operation: Any) -> Any:
+        """
+        Returns what to keep in the log for an operation. Compact graphs log
+        statements by row number so the log holds no Statement objects.
+        """
+        if isinstance(operation, Statement) and not isinstance(self.statements, set):
+            return self.statements.row_for_id(operation.id)
+        return operation
+
+    def _resolve_operation(self, entry: Any) -> Any:
+        """Turns a log entry back into the operation it records."""
+        if isinstance(entry, int):
+            return self.statements.statement(entry)
+        return entry
+
+    def _operations_from(self, node: str, seen: int) -> Iterator[Any]:
+        """
+        Yields a node's logged operations after the first `seen`, one entry at
+        a time, so snapshot-backed logs decode only the entries read.
+        """
+        entries = self._op_log.get(node, ())
+        for position in range(seen, len(entries)):
+            yield self._resolve_operation(entries[position])
+
+    def version_vector(self) -> Dict[str, int]:
+        """Returns the number of operations seen from each node."""
+        return {node: len(operations) for node, operations in self._op_log.items()}
+
+    def delta_since(self, version_vector: Dict[str, int]) -> Delta:
+        """
+        Returns the operations not covered by a peer's version vector.
+        Cost is proportional to the number of nodes plus the size of the delta.
+        """
+        delta = Delta()
+        for node, operations in self._op_log.items():
+            seen = version_vector.get(node, 0)
+            if seen < len(operations):
+                delta.operations[node] = (seen + 1, list(self._operations_from(node, seen)))
+        return delta
+
+    def apply_delta(self, delta: Delta) -> int:
+        """
+        Applies a delta from another replica and returns the number of new
+        operations. Operations already seen are skipped, so deltas may overlap.
+        Raises ValueError if a delta would leave a gap in a node's log.
+        """
+        pending = []
+        for node, (first, operations) in delta.operations.items():
+            seen = len(self._op_log.get(node, ()))
+            if first > seen + 1:
+                raise ValueError(
+                    f"Delta for node {node} starts at operation {first}, but only {seen} have been seen"
+                )
+            pending.append((node, operations[seen + 1 - first:]))
+        
+        # Entities first, so labels from any node can find the entity they describe
+        for _, operations in pending:
+            for operation in operations:
+                if isinstance(operation, EntityCreated) and operation.entity_id not in self.entities:
+                    self.entities[operation.entity_id] = Entity(
+                        id=operation.entity_id, created_at=operation.created_at
+                    )
+        
+        applied = 0
+        for node, operations in pending:
+            for operation in operations:
+                self._apply_operation(operation)
+                self._append_log(node, operation)
+                applied += 1
+        return applied
+
+    def _apply_operation(self, operation: Any) -> None:
+        """Applies a logged operation from any node to the graph state, idempotently."""
+        if isinstance(operation, EntityCreated):
+            entity = self.entities.get(operation.entity_id)
+            if entity is None:
+                self.entities[operation.entity_id] = Entity(
+                    id=operation.entity_id, created_at=operation.created_at
+                )
+            else:
+                # A label or deletion from another node may have arrived first
+                entity.created_at = operation.created_at
+        elif isinstance(operation, LabelAdded):
+            entity = self.entities.get(operation.entity_id)
+            if entity is None:
+                entity = self.entities[operation.entity_id] = Entity(
+                    id=operation.entity_id, created_at=operation.value[1]
+                )
+            self._add_label_value(entity, operation.kind, operation.language, operation.value)
+        elif isinstance(operation, EntityDeleted):
+            entity = self.entities.get(operation.entity_id)
+            if entity is None:
+                entity = self.entities[operation.entity_id] = Entity(
+                    id=operation.entity_id, created_at=operation.deleted_at
+                )
+            entity.tombstone = True
+        else:
+            self._insert_statement(operation)
+
+    def sync_from(self, other_graph: 'GraphLayer') -> int:
+        """Pulls the operations this replica is missing from another one."""
+        applied = self.apply_delta(other_graph.delta_since(self.version_vector()))
+        self.observe_peer(other_graph.node_id, other_graph.version_vector())
+        return applied
 
     def query(self) -> 'GraphQuery':
         """
@@ -0,0 +1,161 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Set, Dict, Any, Optional
+import os
+import pickle
+import shutil
+import tempfile
+from graph_layer_core import GraphLayer, EntityId, Delta
+from graph_query_planner import (
+    PlanStep, ExecutionContext, ExpandForward, ExpandInverse, ExpandRepeated, Filter,
+    successors, predecessors
+)
+from graph_persistence import write_snapshot, load_snapshot
+from graph_temporal import TemporalView
+
+# Frontiers smaller than this are processed in the calling process
+DEFAULT_MIN_PARTITION = 10_000
+# Operations logged since the base snapshot before it is rewritten
+DEFAULT_REBASE_AFTER = 100_000
+
+# Per-worker-process state: the snapshot graph and the generation it belongs to
+_worker_graph: Optional[GraphLayer] = None
+_worker_generation: Optional[int] = None
+
+def _worker_graph_for(path: str, generation: int, tail: Optional[Delta]) -> GraphLayer:
+    """Maps the base snapshot for a generation once, then applies the operations logged since."""
+    global _worker_graph, _worker_generation
+    if _worker_generation != generation:
+        _worker_graph = load_snapshot(path)
+        _worker_generation = generation
+    if tail is not None:
+        _worker_graph.apply_delta(tail)  # Skips operations applied for earlier tasks
+    return _worker_graph
+
+def _expand_partition(base: tuple[str, int, Optional[Delta]], hop: tuple[EntityId, Optional[TemporalView], bool],
+                      partition: List[EntityId]) -> tuple[Set[EntityId], int, int]:
+    """Expands a partition, returning the result with its index hits and statements scanned."""
+    predicate, view, inverse = hop
+    neighbours = predecessors if inverse else successors
+    ctx = ExecutionContext(graph=_worker_graph_for(*base))
+    return neighbours(ctx.graph, predicate, partition, view, ctx), ctx.index_hits, ctx.statements_scanned
+
+def _filter_partition(base: tuple[str, int, Optional[Delta]], step: Filter,
+                      partition: List[EntityId]) -> tuple[Set[EntityId], int, int]:
+    """Filters a partition, returning the result with its index hits and statements scanned."""
+    ctx = ExecutionContext(graph=_worker_graph_for(*base))
+    return step._filter_set(set(partition), ctx), ctx.index_hits, ctx.statements_scanned
+
+class ParallelExecutor:
+    """
+    Opt-in executor that runs hop expansion and filtering for wide frontiers
+    in a process pool. Pass it to GraphQuery.execute(executor=...).
+    
+    Workers open a memory-mapped base snapshot of the graph (see
+    graph_persistence), so the statement columns and indexes are shared
+    through the page cache rather than copied into each process. Writes made
+    after the base was taken reach the workers as the log tail: each task
+    carries the delta since the base, which a worker applies on top of its
+    mapping, skipping what it already holds. Writing a base costs a pass over
+    the whole graph, so it is only redone once the tail exceeds rebase_after
+    operations; in between, interleaved writes cost each task the size of
+    the tail rather than a new snapshot.
+    
+    Frontiers are split into partitions whose results are unioned; row order
+    comes from the Sort and Materialize steps, which run in the calling
+    process as usual, along with pagination. Filters must be picklable
+    (filter expressions are; lambdas are not) to run in the workers;
+    otherwise they run locally.
+    """
+    def __init__(self, graph: GraphLayer, workers: Optional[int] = None,
+                 min_partition: int = DEFAULT_MIN_PARTITION, rebase_after: int = DEFAULT_REBASE_AFTER):
+        self.graph = graph
+        self.workers = workers or os.cpu_count() or 1
+        self.min_partition = min_partition
+        self.rebase_after = rebase_after
+        self._directory = tempfile.mkdtemp(prefix="yggra-parallel-")
+        self._snapshot_path: Optional[str] = None
+        self._snapshot_version: Optional[Dict[str, int]] = None
+        self._generation = 0
+        self._tail: Optional[Delta] = None
+        self._tail_version: Optional[Dict[str, int]] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _base(self) -> tuple[str, int, Optional[Delta]]:
+        """
+        Returns the base snapshot path, its generation and the operations
+        logged since it was taken, rewriting the base first if there is none
+        yet or the tail has outgrown rebase_after.
+        """
+        version = self.graph.version_vector()
+        if version != self._tail_version:
+            tail = self.graph.delta_since(self._snapshot_version) if self._snapshot_version is not None else None
+            if tail is None or len(tail) > self.rebase_after:
+                self._generation += 1
+                path = os.path.join(self._directory, f"snapshot-{self._generation}.ygs")
+                write_snapshot(self.graph, path)
+                if self._snapshot_path is not None:
+                    os.remove(self._snapshot_path)  # Workers still mapping it keep their view
+                self._snapshot_path = path
+                self._snapshot_version = version
+                tail = None
+            self._tail = tail if tail else None
+            self._tail_version = version
+        return self._snapshot_path, self._generation, self._tail
+
+    def _partitions(self, rows: Set[EntityId]) -> List[List[EntityId]]:
+        rows = list(rows)
+        size = -(-len(rows) // self.workers)
+        return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+    def _map(self, function, argument: Any, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        """Unions the workers' results, adding their counters to ctx."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        base = self._base()
+        partitions = self._partitions(rows)
+        merged: Set[EntityId] = set()
+        for part, index_hits, statements_scanned in self._pool.map(
+                function, [base] * len(partitions), [argument] * len(partitions), partitions):
+            merged.update(part)
+            ctx.index_hits += index_hits
+            ctx.statements_scanned += statements_scanned
+        return merged
+
+    def _parallel_expand(self, predicate: EntityId, rows: Set[EntityId], ctx: ExecutionContext,
+                         view: Optional[TemporalView] = None, inverse: bool = False) -> Set[EntityId]:
+        if len(rows) < self.min_partition:
+            return (predecessors if inverse else successors)(self.graph, predicate, rows, view, ctx)
+        return self._map(_expand_partition, (predicate, view, inverse), rows, ctx)
+
+    def run_step(self, step: PlanStep, rows: Any, ctx: ExecutionContext) -> Any:
+        """Runs one plan step, in the pool when it is a wide expansion or filter."""
+        if isinstance(step, ExpandForward) and len(rows) >= self.min_partition:
+            return self._parallel_expand(step.predicate, rows, ctx, step.view)
+        if isinstance(step, ExpandInverse) and len(rows) >= self.min_partition:
+            return self._parallel_expand(step.predicate, rows, ctx, step.view, inverse=True)
+        if isinstance(step, ExpandRepeated) and len(rows) >= self.min_partition:
+            hop = step.hop
+            return step.expand(rows, lambda level: self._parallel_expand(hop.predicate, level, ctx, step.view, hop.inverse))
+        if isinstance(step, Filter) and isinstance(rows, set) and len(rows) >= self.min_partition:
+            try:
+                pickle.dumps(step)
+            except (pickle.PicklingError, AttributeError, TypeError):
+                return step.run(rows, ctx)
+            ctx.candidates = rows
+            filtered = self._map(_filter_partition, step, rows, ctx)
+            ctx.total_matches = len(filtered)
+            return filtered
+        return step.run(rows, ctx)
+
+    def close(self) -> None:
+        """Shuts the worker pool down and removes the snapshot."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self) -> 'ParallelExecutor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
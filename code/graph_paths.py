@@ -0,0 +1,186 @@
+from typing import List, Set, Dict, Optional, Iterable, Iterator
+from graph_layer_core import GraphLayer, EntityId, Statement
+
+class Path:
+    """
+    A path through the graph stored as a predecessor pointer.
+    Each Path holds its last entity, the statement that reached it and the
+    Path it extends, so paths that share a prefix share its nodes instead of
+    copying them. The full entity or statement sequence is built on demand.
+    """
+    __slots__ = ("entity", "statement", "parent", "length")
+
+    def __init__(self, entity: EntityId, statement: Optional[Statement] = None,
+                 parent: Optional['Path'] = None):
+        self.entity = entity
+        self.statement = statement
+        self.parent = parent
+        self.length = parent.length + 1 if parent is not None else 0
+
+    @property
+    def start(self) -> EntityId:
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node.entity
+
+    @property
+    def end(self) -> EntityId:
+        return self.entity
+
+    def extend(self, statement: Statement, inverse: bool = False) -> 'Path':
+        """
+        Returns a new path that follows the statement from this path's end,
+        or backwards from its object to its subject if inverse is set.
+        """
+        return Path(statement.subject if inverse else statement.object, statement, self)
+
+    def visits(self, entity_id: EntityId) -> bool:
+        """Checks whether the path passes through an entity."""
+        node = self
+        while node is not None:
+            if node.entity == entity_id:
+                return True
+            node = node.parent
+        return False
+
+    def entities(self) -> List[EntityId]:
+        """Returns the entities along the path, from start to end."""
+        entities = []
+        node = self
+        while node is not None:
+            entities.append(node.entity)
+            node = node.parent
+        entities.reverse()
+        return entities
+
+    def statements(self) -> List[Statement]:
+        """Returns the statements along the path, from start to end."""
+        statements = []
+        node = self
+        while node.parent is not None:
+            statements.append(node.statement)
+            node = node.parent
+        statements.reverse()
+        return statements
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return "Path(" + " -> ".join(str(e) for e in self.entities()) + ")"
+
+def outgoing(graph: GraphLayer, entity_id: EntityId,
+             predicates: Optional[Set[EntityId]] = None) -> Iterator[Statement]:
+    """Yields statements from an entity to other entities along the allowed predicates."""
+    by_predicate = graph.index.spo.get(entity_id, {})
+    keys = by_predicate.keys() if predicates is None else predicates & by_predicate.keys()
+    for predicate in keys:
+        for statement in by_predicate[predicate]:
+            if isinstance(statement.object, EntityId):
+                yield statement
+
+def incoming(graph: GraphLayer, entity_id: EntityId,
+             predicates: Optional[Set[EntityId]] = None) -> Iterator[Statement]:
+    """Yields statements from other entities to an entity along the allowed predicates."""
+    for statements in graph.index.osp.get(entity_id, {}).values():
+        for statement in statements:
+            if predicates is None or statement.predicate in predicates:
+                yield statement
+
+def shortest_paths(graph: GraphLayer, sources: Iterable[EntityId], targets: Iterable[EntityId],
+                   predicates: Optional[Set[EntityId]] = None,
+                   max_depth: Optional[int] = None) -> List[Path]:
+    """
+    Finds the shortest paths from any source to any target with a
+    bidirectional breadth-first search.
+    The smaller frontier is expanded one level at a time, forward from the
+    sources or backward from the targets, until the two searches meet. One path
+    is returned per meeting entity at the minimal length. Each side keeps a
+    single predecessor pointer per visited entity, which also cuts cycles.
+    """
+    forward: Dict[EntityId, Path] = {s: Path(s) for s in sources}
+    # Backward pointers run toward the targets: parent is the next entity on the path
+    backward: Dict[EntityId, Path] = {t: Path(t) for t in targets}
+    meeting = forward.keys() & backward.keys()
+    forward_frontier, backward_frontier = list(forward), list(backward)
+    depth = 0
+
+    while not meeting and forward_frontier and backward_frontier:
+        if max_depth is not None and depth >= max_depth:
+            break
+        depth += 1
+        if len(forward_frontier) <= len(backward_frontier):
+            next_frontier = []
+            for entity_id in forward_frontier:
+                for statement in outgoing(graph, entity_id, predicates):
+                    if statement.object not in forward:
+                        forward[statement.object] = forward[entity_id].extend(statement)
+                        next_frontier.append(statement.object)
+            forward_frontier = next_frontier
+            meeting = [e for e in next_frontier if e in backward]
+        else:
+            next_frontier = []
+            for entity_id in backward_frontier:
+                for statement in incoming(graph, entity_id, predicates):
+                    if statement.subject not in backward:
+                        backward[statement.subject] = Path(statement.subject, statement, backward[entity_id])
+                        next_frontier.append(statement.subject)
+            backward_frontier = next_frontier
+            meeting = [e for e in next_frontier if e in forward]
+
+    if not meeting:
+        return []
+    shortest = min(len(forward[e]) + len(backward[e]) for e in meeting)
+    paths = []
+    for entity_id in meeting:
+        if len(forward[entity_id]) + len(backward[entity_id]) != shortest:
+            continue
+        path = forward[entity_id]
+        node = backward[entity_id]
+        while node.parent is not None:
+            path = path.extend(node.statement)
+            node = node.parent
+        paths.append(path)
+    return paths
+
+def all_paths(graph: GraphLayer, sources: Iterable[EntityId], targets: Iterable[EntityId],
+              predicates: Optional[Set[EntityId]] = None,
+              max_depth: Optional[int] = None) -> List[Path]:
+    """
+    Finds every simple path from a source to a target of at most max_depth
+    statements. A backward search from the targets first records each entity's
+    distance to the nearest target, so branches that cannot reach a target
+    within the remaining depth are never explored. Paths never revisit an
+    entity, which keeps cyclic graphs finite.
+    """
+    targets = set(targets)
+    distance: Dict[EntityId, int] = {t: 0 for t in targets}
+    frontier = list(targets)
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_frontier = []
+        for entity_id in frontier:
+            for statement in incoming(graph, entity_id, predicates):
+                if statement.subject not in distance:
+                    distance[statement.subject] = depth
+                    next_frontier.append(statement.subject)
+        frontier = next_frontier
+
+    paths = []
+    stack = [Path(s) for s in set(sources) if s in distance]
+    while stack:
+        path = stack.pop()
+        if path.entity in targets:
+            paths.append(path)
+        for statement in outgoing(graph, path.entity, predicates):
+            remaining = distance.get(statement.object)
+            if remaining is None:
+                continue
+            if max_depth is not None and len(path) + 1 + remaining > max_depth:
+                continue
+            if path.visits(statement.object):
+                continue
+            stack.append(path.extend(statement))
+    return paths
@@ -0,0 +1,197 @@
+"""
+Conjunctive basic graph pattern matching: triple patterns whose terms are
+constants or variables, joined on their shared variables.
+
+Solutions are found with a generic (worst-case optimal) join that binds one
+variable at a time instead of joining whole patterns pairwise. At each step
+the variable with the fewest candidates, as estimated from the triple index
+given the bindings so far, is bound next. Its candidates are enumerated from
+the most selective pattern that mentions it, and each is kept only if every
+other pattern mentioning it still has a match, probed through the SPO, POS
+or OSP index. Work is thereby bounded by the smallest candidate set at each
+step rather than by the largest intermediate join result.
+"""
+from dataclasses import dataclass
+from typing import List, Set, Dict, Any, Optional, Iterable, Iterator, Tuple, Union
+from graph_layer_core import GraphLayer, EntityId, EntityType
+
+POSITIONS = ("subject", "predicate", "object")
+
+@dataclass(frozen=True)
+class Variable:
+    """A named variable in a triple pattern."""
+    name: str
+
+    def __str__(self) -> str:
+        return f"?{self.name}"
+
+def var(name: str) -> Variable:
+    """Shorthand for Variable(name)."""
+    return Variable(name)
+
+Term = Union[EntityId, str, Variable]
+
+@dataclass(frozen=True)
+class TriplePattern:
+    """A (subject, predicate, object) pattern; any term may be a Variable."""
+    subject: Term
+    predicate: Term
+    object: Term
+
+    def __post_init__(self):
+        if not isinstance(self.subject, (EntityId, Variable)):
+            raise ValueError("Pattern subjects must be entities or variables")
+        if isinstance(self.predicate, EntityId):
+            if self.predicate.id_type != EntityType.PROPERTY:
+                raise ValueError("Pattern predicates must be property type entities")
+        elif not isinstance(self.predicate, Variable):
+            raise ValueError("Pattern predicates must be properties or variables")
+
+    def terms(self) -> Tuple[Term, Term, Term]:
+        return (self.subject, self.predicate, self.object)
+
+    def variables(self) -> List[Variable]:
+        """The pattern's distinct variables, in position order."""
+        return list(dict.fromkeys(t for t in self.terms() if isinstance(t, Variable)))
+
+    def resolve(self, bindings: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+        """The pattern's terms with bound variables replaced; unbound ones become None."""
+        return tuple(bindings.get(t.name) if isinstance(t, Variable) else t for t in self.terms())
+
+    def __str__(self) -> str:
+        return "(" + " ".join(repr(t) if isinstance(t, str) else str(t) for t in self.terms()) + ")"
+
+def _count(graph: GraphLayer, subject: Any, predicate: Any, object_: Any) -> int:
+    """Upper bound on the statements matching a partly bound pattern, read from index sizes."""
+    index = graph.index
+    if subject is not None:
+        by_predicate = index.spo.get(subject)
+        if not by_predicate:
+            return 0
+        if predicate is not None:
+            statements = by_predicate.get(predicate, ())
+            if object_ is not None:
+                return min(len(statements), len(index.osp.get(object_, {}).get(subject, ())))
+            return len(statements)
+        if object_ is not None:
+            return len(index.osp.get(object_, {}).get(subject, ()))
+        return sum(len(statements) for statements in by_predicate.values())
+    if predicate is not None:
+        if object_ is not None:
+            return len(index.pos.get(predicate, {}).get(object_, ()))
+        return graph.predicate_stats(predicate).statement_count
+    if object_ is not None:
+        return sum(len(statements) for statements in index.osp.get(object_, {}).values())
+    return len(graph.statements)
+
+def _candidates(graph: GraphLayer, position: int, subject: Any, predicate: Any,
+                object_: Any) -> Iterable[Any]:
+    """Distinct values at `position` of the statements matching a partly bound pattern."""
+    index = graph.index
+    if position == 0:
+        if predicate is not None:
+            by_object = index.pos.get(predicate, {})
+            if object_ is not None:
+                return {s.subject for s in by_object.get(object_, ())}
+            return {s.subject for statements in by_object.values() for s in statements}
+        if object_ is not None:
+            return index.osp.get(object_, {}).keys()
+        return index.spo.keys()
+    if position == 2:
+        if subject is not None:
+            by_predicate = index.spo.get(subject, {})
+            if predicate is not None:
+                return {s.object for s in by_predicate.get(predicate, ())}
+            return {s.object for statements in by_predicate.values() for s in statements}
+        if predicate is not None:
+            return index.pos.get(predicate, {}).keys()
+        return index.osp.keys()
+    if subject is not None:
+        if object_ is not None:
+            return {s.predicate for s in index.osp.get(object_, {}).get(subject, ())}
+        return index.spo.get(subject, {}).keys()
+    if object_ is not None:
+        return {s.predicate for statements in index.osp.get(object_, {}).values() for s in statements}
+    return index.pos.keys()
+
+def _exists(graph: GraphLayer, subject: Any, predicate: Any, object_: Any) -> bool:
+    return next(iter(graph.index.match(subject, predicate, object_)), None) is not None
+
+@dataclass(frozen=True)
+class BasicGraphPattern:
+    """
+    A conjunction of triple patterns. With `select` set (by default the first
+    variable), entities() gives the distinct entities that variable takes in
+    the solutions, for seeding a query's traversal.
+    """
+    patterns: Tuple[TriplePattern, ...]
+    select: Optional[Variable] = None
+
+    def __post_init__(self):
+        if not self.patterns:
+            raise ValueError("A graph pattern needs at least one triple pattern")
+        if self.select is not None and self.select not in self.variables():
+            raise ValueError(f"Selected variable {self.select} does not occur in the patterns")
+
+    def variables(self) -> List[Variable]:
+        """Every variable, in order of first occurrence."""
+        return list(dict.fromkeys(v for pattern in self.patterns for v in pattern.variables()))
+
+    def selected(self) -> Optional[Variable]:
+        variables = self.variables()
+        return self.select or (variables[0] if variables else None)
+
+    def predicates(self) -> Set[EntityId]:
+        """The constant predicates the patterns read."""
+        return {p.predicate for p in self.patterns if isinstance(p.predicate, EntityId)}
+
+    def any_predicate(self) -> bool:
+        """True if a variable predicate makes the solutions depend on statements of every predicate."""
+        return any(isinstance(p.predicate, Variable) for p in self.patterns)
+
+    def estimate(self, graph: GraphLayer) -> float:
+        """Upper bound on the solutions: the most selective pattern's match count."""
+        return float(min(_count(graph, *p.resolve({})) for p in self.patterns))
+
+    def solutions(self, graph: GraphLayer) -> Iterator[Dict[str, Any]]:
+        """Yields every binding of the variables that satisfies all the patterns."""
+        if not all(_exists(graph, *p.resolve({})) for p in self.patterns if not p.variables()):
+            return
+        mentions = {v: [p for p in self.patterns if v in p.variables()] for v in self.variables()}
+        yield from self._search(graph, {}, self.variables(), mentions)
+
+    def _search(self, graph: GraphLayer, bindings: Dict[str, Any], remaining: List[Variable],
+                mentions: Dict[Variable, List[TriplePattern]]) -> Iterator[Dict[str, Any]]:
+        if not remaining:
+            yield dict(bindings)
+            return
+        best: Optional[tuple] = None
+        for variable in remaining:
+            for pattern in mentions[variable]:
+                size = _count(graph, *pattern.resolve(bindings))
+                if best is None or size < best[0]:
+                    best = (size, variable, pattern)
+        size, variable, source = best
+        if size == 0:
+            return
+        position = source.terms().index(variable)
+        probes = [p for p in mentions[variable] if p is not source or source.terms().count(variable) > 1]
+        rest = [v for v in remaining if v != variable]
+        for value in list(_candidates(graph, position, *source.resolve(bindings))):
+            bindings[variable.name] = value
+            if all(_exists(graph, *p.resolve(bindings)) for p in probes):
+                yield from self._search(graph, bindings, rest, mentions)
+        bindings.pop(variable.name, None)
+
+    def entities(self, graph: GraphLayer) -> Set[EntityId]:
+        """Distinct entities bound to the selected variable in any solution."""
+        selected = self.selected()
+        if selected is None:
+            return set()
+        return {b[selected.name] for b in self.solutions(graph) if isinstance(b[selected.name], EntityId)}
+
+    def __str__(self) -> str:
+        detail = " . ".join(str(p) for p in self.patterns)
+        if self.select is not None:
+            detail += f" select {self.select}"
+        return detail
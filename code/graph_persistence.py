@@ -0,0 +1,991 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Set as AbstractSet, Mapping, MutableMapping, Sequence, Collection
+from typing import Dict, List, Any, Optional, Callable, Iterator, Iterable, BinaryIO, Union
+import json
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from graph_layer_core import (
+    GraphLayer, Entity, EntityId, EntityType, Statement, TripleIndex, PredicateStats,
+    EntityCreated, LabelAdded, EntityDeleted, operation_origin
+)
+from graph_storage import (
+    CompactStatementStore, CompactTripleIndex, Interner, to_microseconds, from_microseconds
+)
+
+LOG_MAGIC = b"YGLOG001"
+SNAPSHOT_MAGIC = b"YGSNAP01"
+SNAPSHOT_VERSION = 2
+# Records written between fsync calls on the operation log
+DEFAULT_SYNC_EVERY = 256
+# Read buffer size when scanning an operation log
+LOG_READ_CHUNK = 1 << 20
+
+_RECORD_HEADER = struct.Struct("<II")  # payload length, crc32
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+_ENTITY_CREATED, _LABEL_ADDED, _STATEMENT, _ENTITY_DELETED = 1, 2, 3, 4
+_LABEL_KINDS = ("labels", "descriptions")
+
+# Operation encoding, shared by the log and snapshots
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return _U32.pack(len(data)) + data
+
+def _pack_entity_id(entity_id: EntityId) -> bytes:
+    kind = b"\x01" if entity_id.id_type == EntityType.PROPERTY else b"\x00"
+    return kind + _pack_str(entity_id.local_id) + _pack_str(entity_id.node_id)
+
+def encode_operation(operation: Any) -> bytes:
+    """Encodes a logged operation (entity, label, deletion or statement) as bytes."""
+    if isinstance(operation, EntityCreated):
+        return (bytes([_ENTITY_CREATED]) + _pack_entity_id(operation.entity_id)
+                + _I64.pack(to_microseconds(operation.created_at)))
+    if isinstance(operation, LabelAdded):
+        text, timestamp, node_id = operation.value
+        return (bytes([_LABEL_ADDED, _LABEL_KINDS.index(operation.kind)])
+                + _pack_entity_id(operation.entity_id) + _pack_str(operation.language)
+                + _pack_str(text) + _I64.pack(to_microseconds(timestamp)) + _pack_str(node_id))
+    if isinstance(operation, EntityDeleted):
+        return (bytes([_ENTITY_DELETED]) + _pack_entity_id(operation.entity_id)
+                + _I64.pack(to_microseconds(operation.deleted_at)) + _pack_str(operation.node_id))
+    if isinstance(operation.object, EntityId):
+        object_ = b"\x00" + _pack_entity_id(operation.object)
+    elif isinstance(operation.object, str):
+        object_ = b"\x01" + _pack_str(operation.object)
+    else:
+        raise TypeError(f"Cannot persist literal of type {type(operation.object).__name__}")
+    return (bytes([_STATEMENT]) + _pack_str(operation.id) + _pack_entity_id(operation.subject)
+            + _pack_entity_id(operation.predicate) + object_
+            + _I64.pack(to_microseconds(operation.timestamp)) + _pack_str(operation.node_id)
+            + _F64.pack(operation.certainty))
+
+class _Reader:
+    """Sequential decoder over a bytes-like buffer."""
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def byte(self) -> int:
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def int64(self) -> int:
+        value = _I64.unpack_from(self.data, self.pos)[0]
+        self.pos += 8
+        return value
+
+    def float64(self) -> float:
+        value = _F64.unpack_from(self.data, self.pos)[0]
+        self.pos += 8
+        return value
+
+    def string(self) -> str:
+        length = _U32.unpack_from(self.data, self.pos)[0]
+        start = self.pos + 4
+        self.pos = start + length
+        return bytes(self.data[start:self.pos]).decode("utf-8")
+
+    def entity_id(self) -> EntityId:
+        id_type = EntityType.PROPERTY if self.byte() else EntityType.STANDARD
+        return EntityId(id_type=id_type, local_id=self.string(), node_id=self.string())
+
+def decode_operation(data: bytes) -> Any:
+    """Decodes an operation written by encode_operation."""
+    reader = _Reader(data)
+    kind = reader.byte()
+    if kind == _ENTITY_CREATED:
+        return EntityCreated(reader.entity_id(), from_microseconds(reader.int64()))
+    if kind == _LABEL_ADDED:
+        label_kind = _LABEL_KINDS[reader.byte()]
+        entity_id, language, text = reader.entity_id(), reader.string(), reader.string()
+        value = (text, from_microseconds(reader.int64()), reader.string())
+        return LabelAdded(entity_id, language, value, label_kind)
+    if kind == _ENTITY_DELETED:
+        return EntityDeleted(reader.entity_id(), from_microseconds(reader.int64()), reader.string())
+    if kind == _STATEMENT:
+        statement_id, subject, predicate = reader.string(), reader.entity_id(), reader.entity_id()
+        object_ = reader.entity_id() if reader.byte() == 0 else reader.string()
+        return Statement(
+            id=statement_id, subject=subject, predicate=predicate, object=object_,
+            timestamp=from_microseconds(reader.int64()), node_id=reader.string(),
+            certainty=reader.float64()
+        )
+    raise ValueError(f"Unknown operation kind {kind}")
+
+# Append-only operation log
+
+class OperationLog:
+    """
+    Append-only, checksummed log of graph operations.
+    Each record is framed as (payload length, crc32, payload) and the payload
+    holds the operation's sequence number in its node's log followed by the
+    encoded operation. Records are flushed and fsynced in batches of
+    sync_every, so a crash loses at most the last unsynced batch; a torn or
+    corrupt tail is detected by its checksum and cut off on the next open.
+    """
+    def __init__(self, path: str, sync_every: int = DEFAULT_SYNC_EVERY,
+                 valid_length: Optional[int] = None):
+        self.path = path
+        self.sync_every = sync_every
+        self._pending = 0
+        # Callers that already scanned the log pass the intact length to skip a second scan
+        if valid_length is None:
+            valid_length = self._valid_length()
+        self._file: BinaryIO = open(path, "r+b" if valid_length else "w+b")
+        if valid_length:
+            self._file.truncate(valid_length)
+            self._file.seek(valid_length)
+        else:
+            self._file.write(LOG_MAGIC)
+            self.flush()
+
+    def _valid_length(self) -> int:
+        """Returns the length of the intact prefix of an existing log, or 0 for a new one."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return 0
+        with open(self.path, "rb") as file:
+            if file.read(len(LOG_MAGIC)) != LOG_MAGIC:
+                raise ValueError(f"{self.path} is not an operation log")
+        end = len(LOG_MAGIC)
+        for _, end in self._scan(self.path):
+            pass
+        return end
+
+    @staticmethod
+    def _scan(path: str) -> Iterator[tuple[bytes, int]]:
+        """
+        Yields (payload, end offset) for each intact record, stopping at the
+        first bad one. The file is streamed through a LOG_READ_CHUNK buffer,
+        so memory use is bounded by that and the largest record.
+        """
+        with open(path, "rb", buffering=LOG_READ_CHUNK) as file:
+            size = os.fstat(file.fileno()).st_size
+            if file.read(len(LOG_MAGIC)) != LOG_MAGIC:
+                return
+            pos = len(LOG_MAGIC)
+            while pos + _RECORD_HEADER.size <= size:
+                length, checksum = _RECORD_HEADER.unpack(file.read(_RECORD_HEADER.size))
+                if pos + _RECORD_HEADER.size + length > size:
+                    return
+                payload = file.read(length)
+                if zlib.crc32(payload) != checksum:
+                    return
+                pos += _RECORD_HEADER.size + length
+                yield payload, pos
+
+    @staticmethod
+    def decode_record(payload: bytes) -> tuple[int, Any]:
+        """Splits a record payload into its sequence number and operation."""
+        return _I64.unpack_from(payload)[0], decode_operation(payload[8:])
+
+    @classmethod
+    def read(cls, path: str) -> Iterator[tuple[int, Any]]:
+        """Yields (sequence number, operation) for every intact record in a log file."""
+        if not os.path.exists(path):
+            return
+        for payload, _ in cls._scan(path):
+            yield cls.decode_record(payload)
+
+    def append(self, sequence: int, operation: Any) -> None:
+        payload = _I64.pack(sequence) + encode_operation(operation)
+        self._file.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._pending += 1
+        if self._pending >= self.sync_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes buffered records and fsyncs them to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def reset(self) -> None:
+        """Discards every record, after their operations reached a snapshot."""
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(LOG_MAGIC)
+        self.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+# Snapshots
+
+def _label_json(values: Dict[str, set]) -> Dict[str, list]:
+    return {lang: [[text, to_microseconds(ts), node] for text, ts, node in sorted(entries, key=repr)]
+            for lang, entries in values.items()}
+
+def _label_sets(values: Dict[str, list]) -> Dict[str, set]:
+    return {lang: {(text, from_microseconds(ts), node) for text, ts, node in entries}
+            for lang, entries in values.items()}
+
+def _pack_blob(values: Iterable[bytes]) -> tuple[bytes, bytes]:
+    """Concatenates byte strings into (offsets column, blob); value i is blob[offsets[i]:offsets[i + 1]]."""
+    blob = bytearray()
+    offsets = array('q', [0])
+    for value in values:
+        blob += value
+        offsets.append(len(blob))
+    return offsets.tobytes(), bytes(blob)
+
+def write_snapshot(graph: GraphLayer, path: str) -> None:
+    """
+    Writes a compacted, memory-mappable snapshot of a graph.
+    Statements are stored as typed columns in (subject, predicate, object)
+    order, with CSR offsets and permutations serving as the SPO, POS and OSP
+    indexes, so a loaded snapshot answers queries straight from the mapping.
+    Entity IDs, entity records and logged operations are stored as
+    individually encoded values behind offset columns so they can be decoded
+    one at a time. The file is written next to `path` and renamed into place
+    atomically.
+    """
+
+    # Read encoded rows straight from column stores; Statement sets are encoded here
+    if hasattr(graph.statements, "export_rows"):
+        exported = list(graph.statements.export_rows())
+    else:
+        exported = []
+        for statement in graph.statements:
+            id_bytes, standard = CompactStatementStore.encode_id(statement.id)
+            exported.append((None, id_bytes, None if standard else statement.id, statement.subject,
+                             statement.predicate, statement.object, to_microseconds(statement.timestamp),
+                             statement.node_id, statement.certainty))
+
+    # Entity codes follow the order of the encoded IDs, so a loaded snapshot finds codes by bisection
+    entity_set, literals = set(graph.entities), set()
+    for _, _, _, subject, predicate, object_, _, _, _ in exported:
+        entity_set.add(subject)
+        entity_set.add(predicate)
+        if isinstance(object_, EntityId):
+            entity_set.add(object_)
+        elif isinstance(object_, str):
+            literals.add(object_)
+        else:
+            raise TypeError(f"Cannot persist literal of type {type(object_).__name__}")
+    packed_ids = sorted((_pack_entity_id(entity_id), entity_id) for entity_id in entity_set)
+    del entity_set
+    entity_codes = Interner()
+    for _, entity_id in packed_ids:
+        entity_codes.encode(entity_id)
+    sorted_literals = sorted(literals)
+    literal_rank = {value: rank for rank, value in enumerate(sorted_literals)}
+    entity_count, literal_count = len(entity_codes), len(sorted_literals)
+    codes = entity_codes.codes
+
+    keyed = sorted(
+        (codes[subject], codes[predicate],
+         codes[object_] if isinstance(object_, EntityId) else -1 - literal_rank[object_], i)
+        for i, (_, _, _, subject, predicate, object_, _, _, _) in enumerate(exported)
+    )
+
+    node_codes = Interner()
+    columns = {name: array('q') for name in ("subjects", "predicates", "objects", "timestamps", "nodes")}
+    columns["certainties"] = array('d')
+    ids = bytearray()
+    nonstandard_ids = {}
+    new_row_of_source: Dict[int, int] = {}
+    new_row_of_id: Dict[bytes, int] = {}
+    for row, (subject, predicate, object_, i) in enumerate(keyed):
+        source_row, id_bytes, nonstandard, _, _, _, timestamp, node_id, certainty = exported[i]
+        columns["subjects"].append(subject)
+        columns["predicates"].append(predicate)
+        columns["objects"].append(object_)
+        columns["timestamps"].append(timestamp)
+        columns["nodes"].append(node_codes.encode(node_id))
+        columns["certainties"].append(certainty)
+        ids += id_bytes
+        if nonstandard is not None:
+            nonstandard_ids[row] = nonstandard
+        if source_row is not None:
+            new_row_of_source[source_row] = row
+        else:
+            new_row_of_id[id_bytes] = row
+    row_count = len(keyed)
+    del exported
+
+    def offsets(keys: Iterable[int], size: int) -> array:
+        counts = array('q', bytes(8 * (size + 1)))
+        for key in keys:
+            counts[key + 1] += 1
+        for i in range(size):
+            counts[i + 1] += counts[i]
+        return counts
+
+    dense = lambda code: code if code >= 0 else entity_count - 1 - code
+    subjects, predicates, objects = (columns[c].tolist() for c in ("subjects", "predicates", "objects"))
+    pos_keys = list(zip(predicates, objects, subjects))
+    pos_rows = array('q', sorted(range(row_count), key=pos_keys.__getitem__))
+    osp_keys = list(zip(map(dense, objects), subjects, predicates))
+    osp_rows = array('q', sorted(range(row_count), key=osp_keys.__getitem__))
+    id_keys = [bytes(ids[r * 16:r * 16 + 16]) for r in range(row_count)]
+    id_order = array('q', sorted(range(row_count), key=id_keys.__getitem__))
+    del pos_keys, osp_keys, id_keys
+
+    entity_records = [b""] * entity_count
+    for entity in graph.entities.values():
+        entity_records[codes[entity.id]] = json.dumps(
+            [to_microseconds(entity.created_at), entity.tombstone,
+             _label_json(entity.labels), _label_json(entity.descriptions)]).encode("utf-8")
+
+    # Operation log: statements by row, other operations inline
+    other_operations = []
+    operation_logs = {}
+    for node, entries in graph._op_log.items():
+        refs = array('q')
+        for entry in entries:
+            if isinstance(entry, int):
+                refs.append(new_row_of_source[entry])
+            elif isinstance(entry, Statement):
+                refs.append(new_row_of_id[CompactStatementStore.encode_id(entry.id)[0]])
+            else:
+                refs.append(-1 - len(other_operations))
+                other_operations.append(encode_operation(entry))
+        operation_logs[node] = refs
+
+    sections: Dict[str, bytes] = {}
+    sections["entity_id_offsets"], sections["entity_id_blob"] = _pack_blob(packed for packed, _ in packed_ids)
+    sections["entity_offsets"], sections["entity_blob"] = _pack_blob(entity_records)
+    sections["operation_offsets"], sections["operation_blob"] = _pack_blob(other_operations)
+    sections["literal_offsets"], sections["literal_blob"] = _pack_blob(
+        value.encode("utf-8") for value in sorted_literals)
+    del packed_ids, entity_records, other_operations
+    sections.update({
+        "ids": bytes(ids),
+        "spo_offsets": offsets(columns["subjects"], entity_count).tobytes(),
+        "pos_rows": pos_rows.tobytes(),
+        "pos_offsets": offsets(columns["predicates"], entity_count).tobytes(),
+        "osp_rows": osp_rows.tobytes(),
+        "osp_offsets": offsets((dense(o) for o in columns["objects"]), entity_count + literal_count).tobytes(),
+        "id_order": id_order.tobytes(),
+    })
+    for name, column in columns.items():
+        sections[name] = column.tobytes()
+    for node, refs in operation_logs.items():
+        sections[f"log:{node}"] = refs.tobytes()
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "node_id": graph.node_id,
+        "rows": row_count,
+        "entity_count": entity_count,
+        "literal_count": literal_count,
+        "entities": len(graph.entities),
+        "local_id_counter": max(graph._local_id_counter, _max_local_id(graph)),
+        "nodes": node_codes.values,
+        "nonstandard_ids": {str(row): value for row, value in nonstandard_ids.items()},
+        "predicate_stats": {
+            str(entity_codes.codes[p]): [st.statement_count, st.distinct_subjects, st.distinct_objects]
+            for p, st in graph.index.predicate_stats.items()
+        },
+        "logs": list(operation_logs),
+        "sections": {},
+    }
+    # Section offsets are relative to the 8-byte aligned end of the header
+    layout, position = {}, 0
+    for name, data in sections.items():
+        layout[name] = [position, len(data), zlib.crc32(data)]
+        position += (len(data) + 7) // 8 * 8
+    header["sections"] = layout
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = (len(SNAPSHOT_MAGIC) + 8 + len(header_bytes) + 7) // 8 * 8
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(SNAPSHOT_MAGIC + _I64.pack(len(header_bytes)) + header_bytes)
+        file.write(b"\0" * (data_start - file.tell()))
+        for name, data in sections.items():
+            file.write(data)
+            file.write(b"\0" * ((8 - len(data) % 8) % 8))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+class _LiteralTable:
+    """Sorted literal pool read from a snapshot; values are decoded on demand."""
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+        self.count = len(offsets) - 1
+
+    def value(self, rank: int) -> str:
+        return bytes(self.blob[self.offsets[rank]:self.offsets[rank + 1]]).decode("utf-8")
+
+    def rank(self, value: str) -> Optional[int]:
+        rank = bisect_left(range(self.count), value, key=self.value)
+        if rank < self.count and self.value(rank) == value:
+            return rank
+        return None
+
+class _EntityTable(Sequence):
+    """
+    Entity IDs read from a snapshot, indexed by code. IDs are stored encoded
+    in code order, so an ID's code is found by binary search; each ID is
+    decoded on first access and kept for reuse.
+    """
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+        self.count = len(offsets) - 1
+        self._decoded: Dict[int, EntityId] = {}
+
+    def encoded(self, code: int) -> bytes:
+        return bytes(self.blob[self.offsets[code]:self.offsets[code + 1]])
+
+    def __getitem__(self, code: int) -> EntityId:
+        entity_id = self._decoded.get(code)
+        if entity_id is None:
+            if not 0 <= code < self.count:
+                raise IndexError(code)
+            entity_id = self._decoded[code] = _Reader(self.encoded(code)).entity_id()
+        return entity_id
+
+    def __len__(self) -> int:
+        return self.count
+
+    def code(self, entity_id: Any) -> Optional[int]:
+        """Returns an entity ID's code, or None if the snapshot does not mention it."""
+        if not isinstance(entity_id, EntityId):
+            return None
+        packed = _pack_entity_id(entity_id)
+        code = bisect_left(range(self.count), packed, key=self.encoded)
+        if code < self.count and self.encoded(code) == packed:
+            return code
+        return None
+
+class _MappedEntities(MutableMapping):
+    """
+    The entities of a loaded snapshot, each decoded from its record on first
+    access. Decoded and newly added entities are held in memory, since the
+    graph updates entities in place; the rest stay in the mapping. Entities
+    are tombstoned rather than removed, so removal is not supported.
+    """
+    def __init__(self, table: _EntityTable, offsets: memoryview, blob: memoryview, count: int):
+        self.table = table
+        self.offsets = offsets
+        self.blob = blob
+        self.base_count = count
+        self.loaded: Dict[EntityId, Entity] = {}
+        self._added = 0
+
+    def _record(self, entity_id: Any) -> Optional[int]:
+        """The code of an entity stored in the snapshot, or None."""
+        code = self.table.code(entity_id)
+        if code is not None and self.offsets[code] < self.offsets[code + 1]:
+            return code
+        return None
+
+    def __getitem__(self, entity_id: Any) -> Entity:
+        entity = self.loaded.get(entity_id)
+        if entity is None:
+            code = self._record(entity_id)
+            if code is None:
+                raise KeyError(entity_id)
+            created_at, tombstone, labels, descriptions = json.loads(
+                bytes(self.blob[self.offsets[code]:self.offsets[code + 1]]))
+            entity = self.loaded[entity_id] = Entity(
+                id=entity_id, created_at=from_microseconds(created_at), tombstone=tombstone,
+                labels=_label_sets(labels), descriptions=_label_sets(descriptions)
+            )
+        return entity
+
+    def __setitem__(self, entity_id: EntityId, entity: Entity) -> None:
+        if entity_id not in self.loaded and self._record(entity_id) is None:
+            self._added += 1
+        self.loaded[entity_id] = entity
+
+    def __delitem__(self, entity_id: EntityId) -> None:
+        raise TypeError("Entities of a loaded snapshot cannot be removed; tombstone them instead")
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self.loaded or self._record(entity_id) is not None
+
+    def __iter__(self) -> Iterator[EntityId]:
+        offsets, table = self.offsets, self.table
+        for code in range(table.count):
+            if offsets[code] < offsets[code + 1]:
+                yield table[code]
+        if self._added:
+            for entity_id in list(self.loaded):
+                if self._record(entity_id) is None:
+                    yield entity_id
+
+    def __len__(self) -> int:
+        return self.base_count + self._added
+
+class _MappedLog(Sequence):
+    """
+    One node's operation log from a snapshot, followed by entries appended
+    since loading. Snapshot entries are statement rows or references to
+    encoded operations, read from the mapping and decoded on access.
+    """
+    __slots__ = ("refs", "offsets", "blob", "appended")
+
+    def __init__(self, refs: memoryview, offsets: memoryview, blob: memoryview):
+        self.refs = refs
+        self.offsets = offsets
+        self.blob = blob
+        self.appended: List[Any] = []
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        base = len(self.refs)
+        if index < 0:
+            index += len(self)
+        if index >= base:
+            return self.appended[index - base]
+        if index < 0:
+            raise IndexError(index)
+        ref = self.refs[index]
+        if ref >= 0:
+            return ref
+        return decode_operation(bytes(self.blob[self.offsets[-1 - ref]:self.offsets[-ref]]))
+
+    def __len__(self) -> int:
+        return len(self.refs) + len(self.appended)
+
+    def append(self, entry: Any) -> None:
+        self.appended.append(entry)
+
+class MappedStatementStore(AbstractSet):
+    """
+    Statement store backed by a memory-mapped snapshot.
+    Snapshot rows are read from the mapping on demand; statements added after
+    loading go into an in-memory CompactStatementStore overlay whose rows are
+    numbered after the snapshot's.
+    """
+    def __init__(self, columns: Dict[str, memoryview], entity_ids: _EntityTable,
+                 nodes: List[str], literals: _LiteralTable, nonstandard_ids: Dict[int, str]):
+        self.columns = columns
+        self.entity_ids = entity_ids
+        self.node_names = nodes
+        self.literals = literals
+        self.nonstandard_ids = nonstandard_ids
+        self.base_rows = len(columns["subjects"])
+        self.overlay = CompactStatementStore()
+
+    def lookup_entity(self, entity_id: Any) -> Optional[int]:
+        return self.entity_ids.code(entity_id)
+
+    def lookup_object(self, object_: Any) -> Optional[int]:
+        if isinstance(object_, EntityId):
+            return self.entity_ids.code(object_)
+        if isinstance(object_, str):
+            rank = self.literals.rank(object_)
+            return -1 - rank if rank is not None else None
+        return None
+
+    def decode_object(self, code: int) -> Union[EntityId, str]:
+        if code >= 0:
+            return self.entity_ids[code]
+        return self.literals.value(-1 - code)
+
+    def add(self, statement: Statement) -> int:
+        return self.base_rows + self.overlay.add(statement)
+
+    def row_for_id(self, statement_id: str) -> Optional[int]:
+        id_bytes, _ = CompactStatementStore.encode_id(statement_id)
+        ids, order = self.columns["ids"], self.columns["id_order"]
+        key = lambda row: bytes(ids[row * 16:row * 16 + 16])
+        i = bisect_left(order, id_bytes, key=key)
+        if i < len(order) and key(order[i]) == id_bytes:
+            return order[i]
+        row = self.overlay.row_for_id(statement_id)
+        return self.base_rows + row if row is not None else None
+
+    def row_of(self, statement: Statement) -> Optional[int]:
+        row = self.row_for_id(statement.id)
+        if row is None or self.statement(row) != statement:
+            return None
+        return row
+
+    def statement(self, row: int) -> Statement:
+        if row >= self.base_rows:
+            return self.overlay.statement(row - self.base_rows)
+        columns = self.columns
+        statement_id = self.nonstandard_ids.get(row)
+        if statement_id is None:
+            statement_id = str(uuid.UUID(bytes=bytes(columns["ids"][row * 16:row * 16 + 16])))
+        return Statement(
+            id=statement_id,
+            subject=self.entity_ids[columns["subjects"][row]],
+            predicate=self.entity_ids[columns["predicates"][row]],
+            object=self.decode_object(columns["objects"][row]),
+            timestamp=from_microseconds(columns["timestamps"][row]),
+            node_id=self.node_names[columns["nodes"][row]],
+            certainty=columns["certainties"][row]
+        )
+
+    def export_rows(self) -> Iterator[tuple]:
+        """Yields every row in the layout of CompactStatementStore.export_rows."""
+        columns, entities, nodes = self.columns, self.entity_ids, self.node_names
+        for row in range(self.base_rows):
+            yield (row, bytes(columns["ids"][row * 16:row * 16 + 16]), self.nonstandard_ids.get(row),
+                   entities[columns["subjects"][row]], entities[columns["predicates"][row]],
+                   self.decode_object(columns["objects"][row]), columns["timestamps"][row],
+                   nodes[columns["nodes"][row]], columns["certainties"][row])
+        for exported in self.overlay.export_rows():
+            yield (self.base_rows + exported[0],) + exported[1:]
+
+    def nbytes(self) -> int:
+        """Bytes held in memory by statements added since the snapshot."""
+        return self.overlay.nbytes()
+
+    def __contains__(self, statement: object) -> bool:
+        return isinstance(statement, Statement) and self.row_of(statement) is not None
+
+    def __iter__(self) -> Iterator[Statement]:
+        for row in range(self.base_rows):
+            yield self.statement(row)
+        yield from self.overlay
+
+    def __len__(self) -> int:
+        return self.base_rows + len(self.overlay)
+
+    __hash__ = None
+
+class _MappedRows(Collection):
+    """Statements at positions lo..hi of a row sequence in the snapshot."""
+    __slots__ = ("store", "rows", "lo", "hi")
+
+    def __init__(self, store: MappedStatementStore, rows: Any, lo: int, hi: int):
+        self.store, self.rows, self.lo, self.hi = store, rows, lo, hi
+
+    def __iter__(self) -> Iterator[Statement]:
+        statement, rows = self.store.statement, self.rows
+        return (statement(rows[i]) for i in range(self.lo, self.hi))
+
+    def __len__(self) -> int:
+        return self.hi - self.lo
+
+    def __contains__(self, statement: object) -> bool:
+        return any(s == statement for s in self)
+
+class _MappedRuns(Mapping):
+    """
+    Inner index level over positions lo..hi of a row sequence that is sorted by
+    one column; each run of equal values is one key, found by binary search.
+    """
+    __slots__ = ("store", "rows", "lo", "hi", "column", "lookup", "decode", "_length")
+
+    def __init__(self, store, rows, lo, hi, column, lookup, decode):
+        self.store, self.rows, self.lo, self.hi = store, rows, lo, hi
+        self.column, self.lookup, self.decode = column, lookup, decode
+        self._length = None
+
+    def _run(self, code: int, start: int) -> tuple[int, int]:
+        key = self.column.__getitem__
+        first = bisect_left(self.rows, code, start, self.hi, key=key)
+        return first, bisect_right(self.rows, code, first, self.hi, key=key)
+
+    def __getitem__(self, key: Any) -> _MappedRows:
+        code = self.lookup(key)
+        if code is not None:
+            first, last = self._run(code, self.lo)
+            if first < last:
+                return _MappedRows(self.store, self.rows, first, last)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[Any]:
+        position = self.lo
+        while position < self.hi:
+            code = self.column[self.rows[position]]
+            yield self.decode(code)
+            position = self._run(code, position)[1]
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self)
+        return self._length
+
+class _MappedLevel(Mapping):
+    """Outer index level: CSR offsets from a dense key code to a run of rows."""
+    __slots__ = ("offsets", "dense", "undense", "inner", "_length")
+
+    def __init__(self, offsets: memoryview, dense: Callable[[Any], Optional[int]],
+                 undense: Callable[[int], Any], inner: Callable[[int, int], Mapping]):
+        self.offsets, self.dense, self.undense, self.inner = offsets, dense, undense, inner
+        self._length = None
+
+    def __getitem__(self, key: Any) -> Mapping:
+        code = self.dense(key)
+        if code is not None and self.offsets[code] < self.offsets[code + 1]:
+            return self.inner(self.offsets[code], self.offsets[code + 1])
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        code = self.dense(key)
+        return code is not None and self.offsets[code] < self.offsets[code + 1]
+
+    def __iter__(self) -> Iterator[Any]:
+        offsets = self.offsets
+        return (self.undense(c) for c in range(len(offsets) - 1) if offsets[c] < offsets[c + 1])
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self)
+        return self._length
+
+class _ChainedRows(Collection):
+    """Snapshot statements followed by overlay statements for one index key."""
+    __slots__ = ("parts",)
+
+    def __init__(self, *parts: Collection):
+        self.parts = parts
+
+    def __iter__(self) -> Iterator[Statement]:
+        for part in self.parts:
+            yield from part
+
+    def __len__(self) -> int:
+        return sum(len(part) for part in self.parts)
+
+    def __contains__(self, statement: object) -> bool:
+        return any(statement in part for part in self.parts)
+
+class _UnionMapping(Mapping):
+    """Combines a snapshot index level with the matching overlay level."""
+    __slots__ = ("base", "overlay", "combine")
+
+    def __init__(self, base: Mapping, overlay: Mapping, combine: Callable[[Any, Any], Any]):
+        self.base, self.overlay, self.combine = base, overlay, combine
+
+    def __getitem__(self, key: Any) -> Any:
+        in_base, in_overlay = key in self.base, key in self.overlay
+        if in_base and in_overlay:
+            return self.combine(self.base[key], self.overlay[key])
+        if in_base:
+            return self.base[key]
+        if in_overlay:
+            return self.overlay[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.base or key in self.overlay
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from self.base
+        for key in self.overlay:
+            if key not in self.base:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+class MappedTripleIndex(TripleIndex):
+    """
+    Triple indexes answered from a memory-mapped snapshot, plus an overlay
+    CompactTripleIndex for statements added since it was loaded. Exposes the
+    same spo/pos/osp mapping shape as the in-memory indexes.
+    """
+    def __init__(self, store: MappedStatementStore, columns: Dict[str, memoryview],
+                 predicate_stats: Dict[EntityId, PredicateStats]):
+        self.store = store
+        self.overlay = CompactTripleIndex(store.overlay)
+        self.predicate_stats = predicate_stats
+
+        entity_ids = store.entity_ids
+        entity_count = len(entity_ids)
+        identity = range(store.base_rows)
+        lookup_entity, lookup_object, decode_object = store.lookup_entity, store.lookup_object, store.decode_object
+
+        def dense_object(object_):
+            code = lookup_object(object_)
+            if code is None:
+                return None
+            return code if code >= 0 else entity_count - 1 - code
+
+        def undense_object(code):
+            return entity_ids[code] if code < entity_count else store.literals.value(code - entity_count)
+
+        base_spo = _MappedLevel(columns["spo_offsets"], lookup_entity, entity_ids.__getitem__,
+                                lambda lo, hi: _MappedRuns(store, identity, lo, hi, columns["predicates"],
+                                                           lookup_entity, entity_ids.__getitem__))
+        base_pos = _MappedLevel(columns["pos_offsets"], lookup_entity, entity_ids.__getitem__,
+                                lambda lo, hi: _MappedRuns(store, columns["pos_rows"], lo, hi, columns["objects"],
+                                                           lookup_object, decode_object))
+        base_osp = _MappedLevel(columns["osp_offsets"], dense_object, undense_object,
+                                lambda lo, hi: _MappedRuns(store, columns["osp_rows"], lo, hi, columns["subjects"],
+                                                           lookup_entity, entity_ids.__getitem__))
+        inner = lambda base, overlay: _UnionMapping(base, overlay, _ChainedRows)
+        self.spo = _UnionMapping(base_spo, self.overlay.spo, inner)
+        self.pos = _UnionMapping(base_pos, self.overlay.pos, inner)
+        self.osp = _UnionMapping(base_osp, self.overlay.osp, inner)
+
+    def add(self, statement: Statement) -> None:
+        """Indexes a statement added to the overlay store since loading."""
+        stats = self.predicate_stats.get(statement.predicate)
+        if stats is None:
+            stats = self.predicate_stats[statement.predicate] = PredicateStats()
+        stats.statement_count += 1
+        if statement.predicate not in self.spo.get(statement.subject, {}):
+            stats.distinct_subjects += 1
+        if statement.object not in self.pos.get(statement.predicate, {}):
+            stats.distinct_objects += 1
+        self.overlay.add_row(self.store.overlay.row_for_id(statement.id))
+
+def load_snapshot(path: str, verify: bool = False) -> GraphLayer:
+    """
+    Opens a snapshot written by write_snapshot as a GraphLayer.
+    Statement columns, indexes, entities and operation logs stay in the
+    memory mapping and are decoded on demand, so opening costs only the
+    header. With verify set, every section's checksum is checked first.
+    """
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapping[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a graph snapshot")
+    header_length = _I64.unpack_from(mapping, len(SNAPSHOT_MAGIC))[0]
+    header_start = len(SNAPSHOT_MAGIC) + 8
+    header = json.loads(mapping[header_start:header_start + header_length])
+    if header["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {header['version']}")
+    data_start = (header_start + header_length + 7) // 8 * 8
+
+    view = memoryview(mapping)
+    def section(name: str) -> memoryview:
+        offset, length, checksum = header["sections"][name]
+        data = view[data_start + offset:data_start + offset + length]
+        if verify and zlib.crc32(data) != checksum:
+            raise ValueError(f"Snapshot section {name} is corrupt")
+        return data
+
+    columns = {name: section(name).cast('q') for name in (
+        "subjects", "predicates", "objects", "timestamps", "nodes", "spo_offsets",
+        "pos_rows", "pos_offsets", "osp_rows", "osp_offsets", "id_order")}
+    columns["certainties"] = section("certainties").cast('d')
+    columns["ids"] = section("ids")
+
+    entity_ids = _EntityTable(section("entity_id_offsets").cast('q'), section("entity_id_blob"))
+    literals = _LiteralTable(section("literal_offsets").cast('q'), section("literal_blob"))
+    store = MappedStatementStore(
+        columns, entity_ids, header["nodes"], literals,
+        {int(row): value for row, value in header["nonstandard_ids"].items()}
+    )
+    predicate_stats = {entity_ids[int(code)]: PredicateStats(*values)
+                       for code, values in header["predicate_stats"].items()}
+
+    graph = GraphLayer(node_id=header["node_id"], compact=True)
+    graph.statements = store
+    graph.index = MappedTripleIndex(store, columns, predicate_stats)
+
+    graph.entities = _MappedEntities(entity_ids, section("entity_offsets").cast('q'),
+                                     section("entity_blob"), header["entities"])
+    operation_offsets, operation_blob = section("operation_offsets").cast('q'), section("operation_blob")
+    for node in header["logs"]:
+        graph._op_log[node] = _MappedLog(section(f"log:{node}").cast('q'), operation_offsets, operation_blob)
+
+    graph._local_id_counter = header["local_id_counter"]
+    return graph
+
+def _local_id(graph: GraphLayer, entity_id: EntityId) -> int:
+    """The numeric local ID of an entity this graph's node created, or 0."""
+    if entity_id.node_id == graph.node_id and entity_id.local_id.isdigit():
+        return int(entity_id.local_id)
+    return 0
+
+def _max_local_id(graph: GraphLayer) -> int:
+    """Finds the highest numeric local ID this graph's node has assigned."""
+    return max((_local_id(graph, entity_id) for entity_id in graph.entities), default=0)
+
+class GraphStorage:
+    """
+    Durable storage engine for a GraphLayer in a directory.
+    - snapshot.ygs: the latest compacted snapshot, memory-mapped on open
+    - operations.log: every operation since that snapshot, appended with
+      checksums and fsynced in batches
+
+    open() maps the snapshot, replays the log on top of it and then records
+    every further operation on the graph. snapshot() compacts the current
+    state into a new snapshot and empties the log; with snapshot_every set this
+    happens automatically after that many logged operations.
+    """
+    SNAPSHOT_FILE = "snapshot.ygs"
+    LOG_FILE = "operations.log"
+
+    def __init__(self, directory: str, sync_every: int = DEFAULT_SYNC_EVERY,
+                 snapshot_every: Optional[int] = None):
+        self.directory = directory
+        self.sync_every = sync_every
+        self.snapshot_every = snapshot_every
+        self.graph: Optional[GraphLayer] = None
+        self._log: Optional[OperationLog] = None
+        self._logged_since_snapshot = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, self.SNAPSHOT_FILE)
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.directory, self.LOG_FILE)
+
+    def open(self, node_id: str) -> GraphLayer:
+        """Loads the stored graph for a node, or creates an empty one."""
+        if os.path.exists(self.snapshot_path):
+            graph = load_snapshot(self.snapshot_path)
+            if graph.node_id != node_id:
+                raise ValueError(f"Storage belongs to node {graph.node_id}, not {node_id}")
+        else:
+            graph = GraphLayer(node_id=node_id, compact=True)
+
+        # Replay operations logged after the snapshot, skipping any it already holds
+        valid_length = None
+        scanned = OperationLog._scan(self.log_path) if os.path.exists(self.log_path) else ()
+        for payload, valid_length in scanned:
+            sequence, operation = OperationLog.decode_record(payload)
+            if isinstance(operation, EntityCreated):
+                graph._local_id_counter = max(graph._local_id_counter, _local_id(graph, operation.entity_id))
+            node = operation_origin(operation)
+            seen = len(graph._op_log.get(node, ()))
+            if sequence <= seen:
+                continue
+            if sequence != seen + 1:
+                raise ValueError(f"Operation log for node {node} skips from {seen} to {sequence}")
+            graph._apply_operation(operation)
+            graph._op_log.setdefault(node, []).append(graph._log_entry(operation))
+
+        self._log = OperationLog(self.log_path, self.sync_every, valid_length)
+        graph.add_operation_listener(self._record)
+        self.graph = graph
+        return graph
+
+    def _record(self, node: str, sequence: int, operation: Any) -> None:
+        self._log.append(sequence, operation)
+        self._logged_since_snapshot += 1
+        if self.snapshot_every is not None and self._logged_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        """Writes the current graph to a new snapshot and empties the log."""
+        self._log.flush()
+        write_snapshot(self.graph, self.snapshot_path)
+        self._log.reset()
+        self._logged_since_snapshot = 0
+
+    def flush(self) -> None:
+        """Forces logged operations to disk."""
+        self._log.flush()
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
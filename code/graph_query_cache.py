@@ -0,0 +1,156 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Set, Dict, Any, Optional, Hashable
+import sys
+from graph_layer_core import GraphLayer, EntityId, Statement, EntityCreated, LabelAdded, EntityDeleted
+from graph_query_system import GraphQuery, QueryResult, QueryResultType
+from graph_filters import FilterExpression
+
+DEFAULT_MAX_ENTRIES = 256
+
+@dataclass
+class CacheEntry:
+    """A cached result and what it depends on."""
+    result: QueryResult
+    predicates: Set[EntityId]
+    any_predicate: bool  # Path searches without `via` depend on every predicate
+    entities: Set[EntityId]  # Entities the filters, values and order keys looked at
+    subjects: Set[EntityId]  # Subjects whose statements are results
+    nbytes: int
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results keyed by GraphQuery.fingerprint().
+    
+    Entries are invalidated through the operation log: a statement invalidates
+    queries that follow or filter on its predicate (or return statements
+    about its subject), and a created or labelled entity invalidates queries whose
+    filter step examined that entity. A deleted entity also invalidates every
+    as_of and current query, since it may have been anywhere on their paths.
+    Queries that start from a text search are invalidated by any label, and
+    like text filters over literal objects, by any statement. Graph patterns
+    depend on statements of their predicates, or of every predicate if one
+    is a variable.
+    Filters and order keys are assumed to
+    depend only on the entity they are given, and are fingerprinted by
+    identity, so only queries built with the same callables share entries.
+    
+    The cache is bounded by entry count and, optionally, by an approximate
+    byte size of the cached result lists.
+    """
+    def __init__(self, graph: GraphLayer, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: Optional[int] = None):
+        self.graph = graph
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._by_predicate: Dict[EntityId, Set[Hashable]] = {}
+        self._by_entity: Dict[EntityId, Set[Hashable]] = {}
+        self._by_subject: Dict[EntityId, Set[Hashable]] = {}
+        self._any_predicate: Set[Hashable] = set()
+        self._temporal: Set[Hashable] = set()
+        self._searching: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, key: Hashable) -> Optional[QueryResult]:
+        """Returns the cached result for a fingerprint, counting the hit or miss."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry.result
+
+    def store(self, key: Hashable, query: GraphQuery, candidates: Set[EntityId],
+              result: QueryResult) -> None:
+        """Caches a result along with the dependencies taken from its query and execution."""
+        if key in self.entries:
+            self._remove(key)
+        predicates = {hop.predicate for chain in query.property_chains for hop in chain}
+        for f in query.filters:
+            if isinstance(f, FilterExpression):
+                predicates |= f.predicates()
+        any_predicate = any(e.any_predicate() for e in query.start_searches) or \
+            any(f.any_predicate() for f in query.filters if isinstance(f, FilterExpression))
+        if query.patterns:
+            from graph_patterns import BasicGraphPattern  # Import here to avoid circular imports
+            pattern = BasicGraphPattern(tuple(query.patterns))
+            predicates |= pattern.predicates()
+            any_predicate = any_predicate or pattern.any_predicate()
+        if query.path_search is not None:
+            if query.path_search.predicates is None:
+                any_predicate = True
+            else:
+                predicates |= query.path_search.predicates
+        entities = set(candidates)
+        subjects = entities if query.result_type == QueryResultType.STATEMENTS else set()
+        nbytes = sys.getsizeof(result.results) + sys.getsizeof(entities)
+        entry = CacheEntry(result, predicates, any_predicate, entities, subjects, nbytes)
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.nbytes += nbytes
+        for predicate in predicates:
+            self._by_predicate.setdefault(predicate, set()).add(key)
+        for entity_id in entities:
+            self._by_entity.setdefault(entity_id, set()).add(key)
+        for subject in subjects:
+            self._by_subject.setdefault(subject, set()).add(key)
+        if any_predicate:
+            self._any_predicate.add(key)
+        if query._as_of is not None or query._current:
+            self._temporal.add(key)
+        if query.start_searches:
+            self._searching.add(key)
+        while len(self.entries) > self.max_entries or \
+                (self.max_bytes is not None and self.nbytes > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self.entries.pop(key)
+        self.nbytes -= entry.nbytes
+        for index, dependencies in ((self._by_predicate, entry.predicates),
+                                    (self._by_entity, entry.entities),
+                                    (self._by_subject, entry.subjects)):
+            for dependency in dependencies:
+                keys = index.get(dependency)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[dependency]
+        self._any_predicate.discard(key)
+        self._temporal.discard(key)
+        self._searching.discard(key)
+
+    def _invalidate(self, keys: Set[Hashable]) -> None:
+        for key in list(keys):
+            if key in self.entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drops every entry; counters are kept."""
+        for key in list(self.entries):
+            self._remove(key)
+
+    def on_operation(self, node: str, sequence: int, operation: Any) -> None:
+        """Operation listener that invalidates the entries an operation affects."""
+        if isinstance(operation, Statement):
+            self._invalidate(self._by_predicate.get(operation.predicate, ()))
+            self._invalidate(self._by_subject.get(operation.subject, ()))
+            self._invalidate(self._any_predicate)
+        elif isinstance(operation, (EntityCreated, LabelAdded, EntityDeleted)):
+            self._invalidate(self._by_entity.get(operation.entity_id, ()))
+            if isinstance(operation, EntityDeleted):
+                self._invalidate(self._temporal)
+            elif isinstance(operation, LabelAdded):
+                self._invalidate(self._searching)
@@ -0,0 +1,917 @@
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import List, Set, Dict, Any, Optional, Callable, Iterable, Iterator, Tuple, Union
+import heapq
+import time
+from graph_layer_core import GraphLayer, EntityId, Entity, Statement
+from graph_query_system import GraphQuery, QueryResultType, Hop, PathSearch, PathSearchMode, IndexedKey, Descending
+from graph_paths import Path, shortest_paths, all_paths
+from graph_filters import FilterExpression, by_selectivity, passes
+from graph_temporal import TemporalView
+from graph_patterns import BasicGraphPattern
+from graph_instrumentation import StageStats
+import graph_aggregates
+
+# Fraction of rows an opaque Python filter is assumed to keep
+DEFAULT_FILTER_SELECTIVITY = 0.5
+# Repetitions assumed for an unbounded hop when estimating its size
+UNBOUNDED_HOP_ESTIMATE = 3
+
+@dataclass
+class ExecutionContext:
+    """
+    Mutable state shared by the operators of a plan while it runs.
+    Traversal and materialization count the index lookups that found entries
+    and the statements they read.
+    """
+    graph: GraphLayer
+    total_matches: int = 0
+    candidates: Set[EntityId] = field(default_factory=set)  # Entities the filter step examined
+    index_hits: int = 0
+    statements_scanned: int = 0
+
+def entity_key(entity_id: EntityId) -> tuple:
+    """Total order over entity IDs, used for keyset pagination."""
+    return (entity_id.node_id, entity_id.local_id, entity_id.id_type.value)
+
+def result_identity(result: Any) -> tuple:
+    """A sort key that tells any two distinct query results apart."""
+    if isinstance(result, Entity):
+        return entity_key(result.id)
+    if isinstance(result, dict):  # Pattern bindings
+        return tuple((name, entity_key(value) if isinstance(value, EntityId) else (value,))
+                     for name, value in sorted(result.items()))
+    if isinstance(result, Statement):
+        return (result.id,)
+    if isinstance(result, Path):
+        return (entity_key(result.start), tuple(s.id for s in result.statements()))
+    raise TypeError(f"No keyset identity for {type(result).__name__} results")
+
+def outgoing(graph: GraphLayer, subject: EntityId, predicate: EntityId,
+             view: Optional[TemporalView] = None) -> Iterable[Statement]:
+    """
+    The `predicate` statements about `subject`, from the SPO index or, for a
+    temporal view, from the time-partitioned index.
+    """
+    if view is not None:
+        return view.statements(graph, subject, predicate)
+    return graph.index.spo.get(subject, {}).get(predicate, ())
+
+def successors(graph: GraphLayer, predicate: EntityId, entities: Iterable[EntityId],
+               view: Optional[TemporalView] = None,
+               ctx: Optional[ExecutionContext] = None) -> Set[EntityId]:
+    """
+    Entity objects of the `predicate` statements about `entities`, counting
+    lookups and statements read into ctx if given.
+    """
+    next_entities = set()
+    hits = scanned = 0
+    for entity_id in entities:
+        statements = outgoing(graph, entity_id, predicate, view)
+        if statements:
+            hits += 1
+            scanned += len(statements)
+        for statement in statements:
+            if isinstance(statement.object, EntityId):
+                next_entities.add(statement.object)
+    if ctx is not None:
+        ctx.index_hits += hits
+        ctx.statements_scanned += scanned
+    return next_entities
+
+def incoming(graph: GraphLayer, object_: EntityId, predicate: EntityId,
+             view: Optional[TemporalView] = None) -> Iterable[Statement]:
+    """
+    The `predicate` statements whose object is `object_`, from the POS index.
+    With a temporal view, only those visible in it are kept.
+    """
+    statements = graph.index.pos.get(predicate, {}).get(object_, ())
+    if view is None or not statements:
+        return statements
+    return [s for s in statements
+            if any(v.id == s.id for v in view.statements(graph, s.subject, predicate))]
+
+def predecessors(graph: GraphLayer, predicate: EntityId, entities: Iterable[EntityId],
+                 view: Optional[TemporalView] = None,
+                 ctx: Optional[ExecutionContext] = None) -> Set[EntityId]:
+    """
+    Subjects of the `predicate` statements whose objects are `entities`,
+    counting lookups and statements read into ctx if given.
+    """
+    previous_entities = set()
+    hits = scanned = 0
+    for entity_id in entities:
+        statements = incoming(graph, entity_id, predicate, view)
+        if statements:
+            hits += 1
+            scanned += len(statements)
+        for statement in statements:
+            previous_entities.add(statement.subject)
+    if ctx is not None:
+        ctx.index_hits += hits
+        ctx.statements_scanned += scanned
+    return previous_entities
+
+def _via(view: Optional[TemporalView]) -> str:
+    return f"temporal index, {view}" if view is not None else "SPO index"
+
+@dataclass
+class PlanStep:
+    """
+    A single physical operator in a query plan.
+    Each step consumes the rows produced by the previous one. The planner fills
+    in estimated_rows; actual_rows is recorded when the plan runs.
+    """
+    estimated_rows: float = field(default=0.0, init=False)
+    actual_rows: Optional[int] = field(default=None, init=False)
+    elapsed_ms: Optional[float] = field(default=None, init=False)
+
+    @property
+    def operator(self) -> str:
+        return type(self).__name__
+
+    def describe(self) -> str:
+        """Returns the operator arguments shown in EXPLAIN output."""
+        return ""
+
+    def run(self, rows: Any, ctx: ExecutionContext) -> Any:
+        raise NotImplementedError
+
+    def stream(self, rows: Iterable[Any], ctx: ExecutionContext) -> Iterable[Any]:
+        """
+        Lazy counterpart of run for streaming execution. Operators that need
+        all of their input, such as traversals and sorts, run eagerly.
+        """
+        return self.run(rows, ctx)
+
+@dataclass
+class StartLookup(PlanStep):
+    """
+    Seeds the plan with the query's start entities, text index search
+    results and the entities a graph pattern's selected variable takes.
+    """
+    entities: Set[EntityId]
+    searches: List[FilterExpression] = field(default_factory=list)
+    pattern: Optional[BasicGraphPattern] = None
+
+    def describe(self) -> str:
+        detail = f"{len(self.entities)} entities"
+        for search in self.searches:
+            detail += f", {search} via text index"
+        if self.pattern is not None:
+            detail += f", {self.pattern.selected()} of {self.pattern} via pattern join"
+        return detail
+
+    def run(self, rows: Any, ctx: ExecutionContext) -> Set[EntityId]:
+        entities = set(self.entities)
+        for search in self.searches:
+            entities |= search.lookup(ctx.graph)
+        if self.pattern is not None:
+            entities |= self.pattern.entities(ctx.graph)
+        return entities
+
+@dataclass
+class MatchPatterns(PlanStep):
+    """Produces the solutions of a graph pattern as binding dicts."""
+    pattern: BasicGraphPattern
+
+    def describe(self) -> str:
+        return f"{self.pattern} via pattern join"
+
+    def run(self, rows: Any, ctx: ExecutionContext) -> List[Dict[str, Any]]:
+        solutions = list(self.pattern.solutions(ctx.graph))
+        ctx.total_matches = len(solutions)
+        return solutions
+
+    def stream(self, rows: Any, ctx: ExecutionContext) -> Iterator[Dict[str, Any]]:
+        for solution in self.pattern.solutions(ctx.graph):
+            ctx.total_matches += 1
+            yield solution
+
+@dataclass
+class ExpandForward(PlanStep):
+    """
+    Follows a predicate from each frontier entity through the SPO index, or
+    through the temporal index when the query has a temporal view.
+    """
+    predicate: EntityId
+    view: Optional[TemporalView] = None
+
+    def describe(self) -> str:
+        return f"{self.predicate} via {_via(self.view)}"
+
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        return successors(ctx.graph, self.predicate, rows, self.view, ctx)
+
+@dataclass
+class ExpandInverse(PlanStep):
+    """
+    Follows a predicate backwards, from each frontier entity to the subjects
+    of the statements pointing at it, through the POS index.
+    """
+    predicate: EntityId
+    view: Optional[TemporalView] = None
+
+    def describe(self) -> str:
+        detail = f"^{self.predicate} via POS index"
+        return detail + f", {self.view}" if self.view is not None else detail
+
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        return predecessors(ctx.graph, self.predicate, rows, self.view, ctx)
+
+@dataclass
+class ExpandReverse(PlanStep):
+    """
+    Follows a predicate by scanning its POS index entries and keeping those
+    whose subject is in the frontier. Cheaper than forward expansion when the
+    predicate has fewer statements than the frontier has entities.
+    """
+    predicate: EntityId
+
+    def describe(self) -> str:
+        return f"{self.predicate} via POS index scan"
+
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        next_entities = set()
+        by_object = ctx.graph.index.pos.get(self.predicate, {})
+        if by_object:
+            ctx.index_hits += 1
+            ctx.statements_scanned += ctx.graph.predicate_stats(self.predicate).statement_count
+        for object_, statements in by_object.items():
+            if not isinstance(object_, EntityId):
+                continue
+            if any(statement.subject in rows for statement in statements):
+                next_entities.add(object_)
+        return next_entities
+
+@dataclass
+class ExpandRepeated(PlanStep):
+    """
+    Follows a predicate a variable number of times through the SPO index.
+    Levels are expanded as sets. Once min_hops is reached only newly
+    discovered entities are expanded further, so cycles terminate even
+    without an upper bound.
+    """
+    hop: Hop
+    view: Optional[TemporalView] = None
+
+    def describe(self) -> str:
+        upper = self.hop.max_hops if self.hop.max_hops is not None else "*"
+        return f"{self.hop} {self.hop.min_hops}..{upper} via {_via(self.view)}"
+
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        neighbours = predecessors if self.hop.inverse else successors
+        return self.expand(rows, lambda level: neighbours(ctx.graph, self.hop.predicate, level, self.view, ctx))
+
+    def expand(self, rows: Set[EntityId],
+               step: Callable[[Set[EntityId]], Set[EntityId]]) -> Set[EntityId]:
+        """Runs the repetition, computing each level's successors with `step`."""
+        min_hops, max_hops = self.hop.min_hops, self.hop.max_hops
+        level = set(rows)
+        reached = set(level) if min_hops == 0 else set()
+        depth = 0
+        while level and (max_hops is None or depth < max_hops):
+            depth += 1
+            next_level = step(level)
+            if depth >= min_hops:
+                next_level -= reached
+                reached |= next_level
+            level = next_level
+        return reached
+
+@dataclass
+class StartPaths(StartLookup):
+    """Seeds a path query with a zero-length path per start entity."""
+
+    def run(self, rows: Any, ctx: ExecutionContext) -> List[Path]:
+        return [Path(entity_id) for entity_id in StartLookup.run(self, rows, ctx)]
+
+@dataclass
+class ExpandPaths(PlanStep):
+    """
+    Extends every path along a hop through the SPO index.
+    Variable-length hops never revisit an entity already on the path.
+    """
+    hop: Hop
+    view: Optional[TemporalView] = None
+
+    def describe(self) -> str:
+        upper = self.hop.max_hops if self.hop.max_hops is not None else "*"
+        return f"{self.hop} {self.hop.min_hops}..{upper} via {_via(self.view)}"
+
+    def run(self, rows: List[Path], ctx: ExecutionContext) -> List[Path]:
+        graph, view = ctx.graph, self.view
+        predicate, min_hops, max_hops = self.hop.predicate, self.hop.min_hops, self.hop.max_hops
+        inverse = self.hop.inverse
+        check_cycles = not self.hop.is_single
+        paths = list(rows) if min_hops == 0 else []
+        level = rows
+        depth = 0
+        while level and (max_hops is None or depth < max_hops):
+            depth += 1
+            next_level = []
+            for path in level:
+                if inverse:
+                    statements = incoming(graph, path.entity, predicate, view)
+                else:
+                    statements = outgoing(graph, path.entity, predicate, view)
+                if statements:
+                    ctx.index_hits += 1
+                    ctx.statements_scanned += len(statements)
+                for statement in statements:
+                    if not isinstance(statement.object, EntityId):
+                        continue
+                    if check_cycles and path.visits(statement.subject if inverse else statement.object):
+                        continue
+                    next_level.append(path.extend(statement, inverse))
+            if depth >= min_hops:
+                paths.extend(next_level)
+            level = next_level
+        return paths
+
+@dataclass
+class SearchPaths(PlanStep):
+    """
+    Searches for paths from the ends of the incoming paths to the target
+    entities and grafts each result onto the incoming path it starts from.
+    Shortest-path searches run bidirectionally.
+    """
+    search: PathSearch
+    targets: Set[EntityId]
+
+    def describe(self) -> str:
+        via = "any property" if self.search.predicates is None else f"{len(self.search.predicates)} properties"
+        return f"{self.search.mode.value} to {len(self.targets)} entities via {via}, max_depth={self.search.max_depth}"
+
+    def run(self, rows: List[Path], ctx: ExecutionContext) -> List[Path]:
+        prefixes: Dict[EntityId, List[Path]] = {}
+        for path in rows:
+            prefixes.setdefault(path.entity, []).append(path)
+        search = shortest_paths if self.search.mode == PathSearchMode.SHORTEST else all_paths
+        found = search(ctx.graph, prefixes.keys(), self.targets,
+                       set(self.search.predicates) if self.search.predicates is not None else None,
+                       self.search.max_depth)
+        paths = []
+        for path in found:
+            statements = path.statements()
+            for prefix in prefixes[path.start]:
+                if len(prefix) == 0:
+                    paths.append(path)
+                    continue
+                for statement in statements:
+                    prefix = prefix.extend(statement)
+                paths.append(prefix)
+        return paths
+
+@dataclass
+class Filter(PlanStep):
+    """
+    Keeps entities that exist in the graph, are among the end entities if
+    any were given, and pass every filter. Path rows are tested on their last
+    entity. Its output size is the query's total match count.
+    Filter expressions come first, in the order the planner chose, and
+    filter the candidate set as a whole; opaque callables then run on each
+    remaining entity. With a temporal view, entities must also be visible
+    in it, and expressions read statements and labels as the view shows them.
+    """
+    filters: List[Any]
+    end_entities: Optional[Set[EntityId]] = None
+    view: Optional[TemporalView] = None
+
+    def describe(self) -> str:
+        expressions = [str(f) for f in self.filters if isinstance(f, FilterExpression)]
+        callables = len(self.filters) - len(expressions)
+        parts = expressions + ([f"{callables} predicate(s)"] if callables else [])
+        detail = ", ".join(parts) if parts else "entity exists"
+        if self.end_entities is not None:
+            detail += f", ending at {len(self.end_entities)} entities"
+        if self.view is not None:
+            detail += f", {self.view}"
+        return detail
+
+    def _exists(self, graph: GraphLayer, entity_id: EntityId) -> bool:
+        if self.view is not None:
+            return self.view.visible(graph, entity_id)
+        return entity_id in graph.entities
+
+    def _matches(self, entity_id: EntityId, ctx: ExecutionContext) -> bool:
+        if self.end_entities is not None and entity_id not in self.end_entities:
+            return False
+        return self._exists(ctx.graph, entity_id) and passes(ctx.graph, entity_id, self.filters, self.view)
+
+    def run(self, rows: Any, ctx: ExecutionContext) -> Any:
+        if isinstance(rows, list):
+            ctx.candidates = {path.entity for path in rows}
+            filtered = [path for path in rows if self._matches(path.entity, ctx)]
+        else:
+            ctx.candidates = rows
+            filtered = self._filter_set(rows, ctx)
+        ctx.total_matches = len(filtered)
+        return filtered
+
+    def _filter_set(self, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        graph = ctx.graph
+        ids = rows & self.end_entities if self.end_entities is not None else rows
+        ids = {entity_id for entity_id in ids if self._exists(graph, entity_id)}
+        callables = []
+        for f in self.filters:
+            if isinstance(f, FilterExpression):
+                ids = f.evaluate(graph, ids, self.view)
+            else:
+                callables.append(f)
+        if callables:
+            entities = graph.entities
+            ids = {entity_id for entity_id in ids if all(f(entities[entity_id]) for f in callables)}
+        return ids
+
+    def stream(self, rows: Iterable[Any], ctx: ExecutionContext) -> Iterator[Any]:
+        for row in rows:
+            if self._matches(row.entity if isinstance(row, Path) else row, ctx):
+                ctx.total_matches += 1
+                yield row
+
+@dataclass
+class Materialize(PlanStep):
+    """
+    Turns matched entity IDs into result objects.
+    When pagination has been pushed into this step, statement results stop
+    being produced once `stop` rows exist. With a temporal view, statements
+    and labels are the ones visible in it.
+    """
+    result_type: QueryResultType
+    stop: Optional[int] = None
+    view: Optional[TemporalView] = None
+
+    def describe(self) -> str:
+        detail = self.result_type.value
+        if self.stop is not None:
+            detail += f", stop after {self.stop}"
+        if self.view is not None:
+            detail += f", {self.view}"
+        return detail
+
+    def _statements(self, graph: GraphLayer, entity_id: EntityId) -> Iterable[Statement]:
+        if self.view is not None:
+            return self.view.statements(graph, entity_id)
+        return graph.find_statements(subject=entity_id)
+
+    def _value(self, graph: GraphLayer, entity_id: EntityId) -> Optional[str]:
+        if self.view is not None:
+            return self.view.label(graph, entity_id)
+        return graph.get_latest_label(entity_id)
+
+    def run(self, rows: Iterable[EntityId], ctx: ExecutionContext) -> List[Any]:
+        graph = ctx.graph
+        if self.result_type == QueryResultType.ENTITIES:
+            return [graph.entities[eid] for eid in rows]
+        if self.result_type == QueryResultType.STATEMENTS:
+            statements = list(islice((s for eid in rows for s in self._statements(graph, eid)), self.stop))
+            ctx.statements_scanned += len(statements)
+            return statements
+        if self.result_type == QueryResultType.VALUES:
+            return [self._value(graph, eid) for eid in rows]
+        return list(rows)  # Paths are already materialized by traversal
+
+    def stream(self, rows: Iterable[EntityId], ctx: ExecutionContext) -> Iterator[Any]:
+        graph = ctx.graph
+        if self.result_type == QueryResultType.ENTITIES:
+            results = (graph.entities[eid] for eid in rows)
+        elif self.result_type == QueryResultType.STATEMENTS:
+            results = (s for eid in rows for s in self._statements(graph, eid))
+        elif self.result_type == QueryResultType.VALUES:
+            results = (self._value(graph, eid) for eid in rows)
+        else:
+            results = iter(rows)
+        return islice(results, self.stop)
+
+@dataclass
+class Sort(PlanStep):
+    """
+    Sorts results by one composite key built from every order key, most
+    significant first. When only the first `keep` rows are needed they are
+    selected with a bounded heap in O(n log k) instead of a full sort.
+    """
+    keys: List[Callable]
+    keep: Optional[int] = None
+
+    def describe(self) -> str:
+        detail = f"{len(self.keys)} key(s)"
+        if self.keep is not None:
+            detail += f", top {self.keep}"
+        return detail
+
+    def run(self, rows: Iterable[Any], ctx: ExecutionContext) -> List[Any]:
+        keys = self.keys
+        if len(keys) == 1:
+            composite = keys[0]
+        else:
+            composite = lambda row: tuple(key(row) for key in keys)
+        if self.keep is not None:
+            return heapq.nsmallest(self.keep, rows, key=composite)
+        return sorted(rows, key=composite)
+
+@dataclass
+class IndexScan(PlanStep):
+    """
+    Produces ordered results by walking a sorted index and keeping entries
+    that belong to the matched entities (or whose subject does, for
+    statements), stopping once `keep` results are found. Replaces
+    materialization and sorting for limited queries on an IndexedKey.
+    """
+    key: IndexedKey
+    descending: bool
+    keep: int
+
+    def describe(self) -> str:
+        direction = "descending" if self.descending else "ascending"
+        return f"{self.key.field} {direction}, stop after {self.keep}"
+
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> List[Any]:
+        index = ctx.graph.sorted_index(self.key)
+        ctx.index_hits += 1
+        items = index.descending() if self.descending else index.ascending()
+        if self.key.indexes_statements:
+            matches = (statement for statement in items if statement.subject in rows)
+        else:
+            entities = ctx.graph.entities
+            matches = (entities[entity_id] for entity_id in items if entity_id in rows)
+        return list(islice(matches, self.keep))
+
+@dataclass
+class Paginate(PlanStep):
+    """Applies offset and limit to the rows that reach it."""
+    offset: Optional[int]
+    limit: Optional[int]
+
+    def describe(self) -> str:
+        return f"offset={self.offset or 0}, limit={self.limit}"
+
+    def run(self, rows: Iterable[Any], ctx: ExecutionContext) -> List[Any]:
+        start = self.offset or 0
+        stop = start + self.limit if self.limit is not None else None
+        return list(islice(rows, start, stop))
+
+    def stream(self, rows: Iterable[Any], ctx: ExecutionContext) -> Iterator[Any]:
+        start = self.offset or 0
+        return islice(rows, start, start + self.limit if self.limit is not None else None)
+
+@dataclass
+class Seek(PlanStep):
+    """
+    Orders rows by a total sort key for keyset pagination, dropping rows at
+    or before the continuation key. When only the first `keep` rows are
+    needed they are selected with a bounded heap instead of a full sort.
+    """
+    key: Callable
+    after: Optional[tuple] = None
+    keep: Optional[int] = None
+
+    def describe(self) -> str:
+        start = "after token" if self.after is not None else "from start"
+        return f"{start}, keep={self.keep}"
+
+    def run(self, rows: Iterable[Any], ctx: ExecutionContext) -> List[Any]:
+        key, after = self.key, self.after
+        if after is not None:
+            rows = (row for row in rows if key(row) > after)
+        if self.keep is not None:
+            return heapq.nsmallest(self.keep, rows, key=key)
+        return sorted(rows, key=key)
+
+@dataclass
+class Aggregate(PlanStep):
+    """
+    Folds aggregates over the matched entities, or their statements, in
+    place of materializing results. Rows out are the groups.
+    """
+    aggregates: Dict[str, graph_aggregates.Aggregate]
+    group_by: Union[EntityId, str, None] = None
+    statements: bool = False
+    view: Optional[TemporalView] = None
+
+    def describe(self) -> str:
+        detail = ", ".join(f"{name}={spec}" for name, spec in self.aggregates.items())
+        if self.group_by is not None:
+            detail += f" by {self.group_by}"
+        if self.statements:
+            detail += ", over statements"
+        if self.view is not None:
+            detail += f", {self.view}"
+        return detail
+
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> Dict[Any, Dict[str, Any]]:
+        return graph_aggregates.aggregate(ctx.graph, rows, self.aggregates, self.group_by,
+                                          self.view, self.statements)
+
+@dataclass
+class QueryPlan:
+    """
+    An ordered pipeline of physical operators built from a GraphQuery.
+    Printing the plan gives EXPLAIN output with estimated and, once the plan
+    has run, actual row counts.
+    """
+    steps: List[PlanStep]
+    executed: bool = False
+    result_key: Optional[Callable] = None  # Keyset sort key of a result, for keyset plans
+    context: Optional[ExecutionContext] = None  # State of the last execution
+
+    def execute(self, graph: GraphLayer,
+                run_step: Optional[Callable[[PlanStep, Any, ExecutionContext], Any]] = None
+                ) -> tuple[List[Any], int]:
+        """
+        Runs every step in order and returns (results, total_matches),
+        recording each step's output rows and elapsed time.
+        An executor can pass run_step to take over running individual steps.
+        """
+        ctx = ExecutionContext(graph=graph)
+        rows: Any = None
+        clock = time.perf_counter_ns
+        for step in self.steps:
+            started = clock()
+            rows = run_step(step, rows, ctx) if run_step is not None else step.run(rows, ctx)
+            step.elapsed_ms = (clock() - started) / 1_000_000
+            step.actual_rows = len(rows)
+        self.executed = True
+        self.context = ctx
+        return rows, ctx.total_matches
+
+    def stream(self, graph: GraphLayer) -> Iterator[Any]:
+        """Runs the plan as a generator pipeline, yielding results as they are produced."""
+        ctx = ExecutionContext(graph=graph)
+        rows: Any = None
+        for step in self.steps:
+            rows = step.stream(rows, ctx)
+        yield from rows
+
+    def stages(self) -> List[StageStats]:
+        """Per-step rows and timings of the last execution."""
+        return [StageStats(step.operator, step.describe(), step.actual_rows, step.elapsed_ms)
+                for step in self.steps if step.actual_rows is not None]
+
+    def __str__(self) -> str:
+        lines = []
+        for number, step in enumerate(self.steps, 1):
+            actual = step.actual_rows if step.actual_rows is not None else "-"
+            line = f"{number}. {step.operator}({step.describe()}) est={step.estimated_rows:.0f} actual={actual}"
+            if step.elapsed_ms is not None:
+                line += f" time={step.elapsed_ms:.3f}ms"
+            lines.append(line)
+        return "\n".join(lines)
+
+class QueryPlanner:
+    """
+    Turns the builder state of a GraphQuery into a physical QueryPlan.
+    Decisions are cost-based, using the predicate cardinality statistics the
+    GraphLayer keeps up to date as statements are added.
+    """
+    def __init__(self, graph: GraphLayer):
+        self.graph = graph
+
+    def plan(self, query: GraphQuery, keyset: bool = False) -> QueryPlan:
+        """
+        Builds the plan for a query. Keyset plans (after() was called, or
+        keyset is set) replace sorting with a Seek over a total order.
+        Temporal queries (as_of or current) expand forward through the
+        temporal index and never use sorted index scans.
+        """
+        steps, view = self._plan_matches(query)
+        rows = steps[-1].estimated_rows
+
+        offset, limit = query._offset, query._limit
+        paginated = offset is not None or limit is not None
+        materialize = Materialize(query.result_type, view=view)
+
+        if keyset or query._keyset:
+            steps.extend(self._plan_keyset(query, rows, materialize))
+            return QueryPlan(steps, result_key=self._result_key(query))
+
+        if query._order_by or not paginated:
+            keep = (offset or 0) + limit if limit is not None else None
+            materialized_rows = self._materialized_rows(query.result_type, rows)
+            index_scan = self._plan_index_scan(query, materialized_rows, keep) if view is None else None
+            if index_scan is not None:
+                steps.append(index_scan)
+                rows = index_scan.estimated_rows
+            else:
+                steps.append(self._estimated(materialize, materialized_rows))
+                rows = materialize.estimated_rows
+                if query._order_by:
+                    steps.append(self._estimated(Sort(query._order_by, keep), min(rows, keep or rows)))
+            if paginated:
+                steps.append(self._estimated(Paginate(offset, limit), self._page_rows(rows, offset, limit)))
+        elif query.result_type == QueryResultType.STATEMENTS:
+            # Statements fan out from entities, so stop producing them once the page is full
+            if limit is not None:
+                materialize.stop = (offset or 0) + limit
+            rows = self._materialized_rows(query.result_type, rows)
+            steps.append(self._estimated(materialize, min(rows, materialize.stop or rows)))
+            steps.append(self._estimated(Paginate(offset, limit), self._page_rows(rows, offset, limit)))
+        else:
+            # Without ordering, only the entities on the requested page need materializing
+            rows = self._page_rows(rows, offset, limit)
+            steps.append(self._estimated(Paginate(offset, limit), rows))
+            steps.append(self._estimated(materialize, rows))
+
+        return QueryPlan(steps)
+
+    def _plan_matches(self, query: GraphQuery) -> Tuple[List[PlanStep], Optional[TemporalView]]:
+        """
+        Plans the steps that find a query's matches: the start lookup, hops,
+        path search and filter. Returns them with the query's temporal view.
+        """
+        steps: List[PlanStep] = []
+        tracks_paths = query.result_type == QueryResultType.PATHS
+        view = None
+        if query._as_of is not None or query._current:
+            view = TemporalView(query._as_of, query._current)
+        pattern = BasicGraphPattern(tuple(query.patterns), query._select) if query.patterns else None
+        if pattern is not None and view is not None:
+            raise ValueError("Graph patterns do not support as_of or current queries")
+
+        if query.result_type == QueryResultType.BINDINGS:
+            if pattern is None:
+                raise ValueError("Binding results need where() patterns")
+            if query.start_entities or query.start_searches or query.property_chains or \
+                    query.filters or query.path_search is not None or query.end_entities is not None:
+                raise ValueError("Binding results only combine with ordering and pagination")
+            steps.append(self._estimated(MatchPatterns(pattern), pattern.estimate(self.graph)))
+            return steps, view
+
+        start_type = StartPaths if tracks_paths else StartLookup
+        searched = sum(search.selectivity(self.graph) for search in query.start_searches) \
+            * len(self.graph.entities)
+        matched = pattern.estimate(self.graph) if pattern is not None else 0.0
+        steps.append(self._estimated(start_type(query.start_entities, list(query.start_searches), pattern),
+                                     len(query.start_entities) + searched + matched))
+        rows = steps[-1].estimated_rows
+
+        for chain in query.property_chains:
+            for hop in chain:
+                if tracks_paths:
+                    step = self._estimated(ExpandPaths(hop, view), self._hop_rows(hop, rows))
+                elif hop.is_single and hop.inverse:
+                    step = self._estimated(ExpandInverse(hop.predicate, view), self._hop_rows(hop, rows))
+                elif hop.is_single:
+                    step = self._plan_hop(hop.predicate, rows, view)
+                else:
+                    step = self._estimated(ExpandRepeated(hop, view), self._hop_rows(hop, rows))
+                steps.append(step)
+                rows = step.estimated_rows
+
+        if query.path_search is not None:
+            if not tracks_paths:
+                raise ValueError("Path search requires a PATHS result type")
+            if query.end_entities is None:
+                raise ValueError("Path search requires end entities; call ending_at()")
+            if view is not None:
+                raise ValueError("Path search does not support as_of or current queries")
+            step = SearchPaths(query.path_search, query.end_entities)
+            steps.append(self._estimated(step, len(query.end_entities)))
+            rows = step.estimated_rows
+
+        steps.append(self._plan_filter(query, rows, view))
+        return steps, view
+
+    def plan_aggregate(self, query: GraphQuery, aggregates: Dict[str, graph_aggregates.Aggregate]) -> QueryPlan:
+        """
+        Builds a plan that folds aggregates over the query's matches in place
+        of materialization, ordering and pagination, which do not change them.
+        Statement queries aggregate over the matched entities' statements.
+        """
+        if query.result_type in (QueryResultType.PATHS, QueryResultType.BINDINGS):
+            raise ValueError(f"Aggregates are not supported on {query.result_type.name} queries")
+        steps, view = self._plan_matches(query)
+        group_by, rows = query._group_by, steps[-1].estimated_rows
+        if group_by is None:
+            groups = 1.0
+        elif isinstance(group_by, EntityId):
+            groups = min(rows, max(self.graph.predicate_stats(group_by).distinct_objects, 1))
+        else:
+            groups = self._materialized_rows(QueryResultType.STATEMENTS, rows)
+        statements = query.result_type == QueryResultType.STATEMENTS
+        steps.append(self._estimated(Aggregate(aggregates, group_by, statements, view), groups))
+        return QueryPlan(steps)
+
+    def _plan_filter(self, query: GraphQuery, rows: float,
+                     view: Optional[TemporalView] = None) -> Filter:
+        """
+        Orders filter expressions by estimated selectivity, most selective
+        first, ahead of opaque callables, which are assumed to keep
+        DEFAULT_FILTER_SELECTIVITY of their input.
+        """
+        expressions = by_selectivity(self.graph, (f for f in query.filters if isinstance(f, FilterExpression)))
+        callables = [f for f in query.filters if not isinstance(f, FilterExpression)]
+        for expression in expressions:
+            rows *= expression.selectivity(self.graph)
+        rows *= DEFAULT_FILTER_SELECTIVITY ** len(callables)
+        return self._estimated(Filter(expressions + callables, query.end_entities, view), rows)
+
+    def _plan_index_scan(self, query: GraphQuery, rows: float,
+                         keep: Optional[int]) -> Optional[IndexScan]:
+        """
+        Chooses a sorted index scan for a limited query ordered on a single
+        IndexedKey. Matches are assumed to be spread evenly through the index,
+        so the scan reads about keep * index size / matches entries; it is
+        used when that is less than the matches a top-k sort would process.
+        """
+        if keep is None or len(query._order_by) != 1:
+            return None
+        key, descending = query._order_by[0], False
+        if isinstance(key, Descending):
+            key, descending = key.key, True
+        if not isinstance(key, IndexedKey):
+            return None
+        if key.indexes_statements:
+            if query.result_type != QueryResultType.STATEMENTS:
+                return None
+            indexed = len(self.graph.statements)
+        else:
+            if query.result_type != QueryResultType.ENTITIES:
+                return None
+            indexed = len(self.graph.entities)
+        scanned = keep * indexed / max(rows, 1.0)
+        if scanned >= rows:
+            return None
+        return self._estimated(IndexScan(key, descending, keep), min(rows, keep))
+
+    def _plan_keyset(self, query: GraphQuery, rows: float, materialize: Materialize) -> List[PlanStep]:
+        """
+        Orders results by the query's sort keys followed by result identity.
+        Unordered entity queries seek on entity IDs, so only the page is
+        materialized.
+        """
+        if query.result_type == QueryResultType.VALUES:
+            raise ValueError("Keyset pagination needs entity, statement or path results")
+        offset, limit = query._offset, query._limit
+        keep = (offset or 0) + limit if limit is not None else None
+        steps: List[PlanStep] = []
+        if query.result_type == QueryResultType.ENTITIES and not query._order_by:
+            seek = Seek(entity_key, query._after, keep)
+            steps.append(self._estimated(seek, min(rows, keep if keep is not None else rows)))
+            rows = self._page_rows(rows, offset, limit)
+            steps.append(self._estimated(Paginate(offset, limit), rows))
+            steps.append(self._estimated(materialize, rows))
+            return steps
+        rows = self._materialized_rows(query.result_type, rows)
+        steps.append(self._estimated(materialize, rows))
+        seek = Seek(self._result_key(query), query._after, keep)
+        steps.append(self._estimated(seek, min(rows, keep if keep is not None else rows)))
+        steps.append(self._estimated(Paginate(offset, limit), self._page_rows(rows, offset, limit)))
+        return steps
+
+    @staticmethod
+    def _result_key(query: GraphQuery) -> Callable[[Any], tuple]:
+        order_by = list(query._order_by)
+        if not order_by:
+            return result_identity
+        return lambda result: tuple(key(result) for key in order_by) + result_identity(result)
+
+    def _plan_hop(self, predicate: EntityId, frontier_rows: float,
+                  view: Optional[TemporalView] = None) -> PlanStep:
+        """
+        Chooses the traversal direction for one hop.
+        Forward expansion costs one index lookup per frontier entity; reverse
+        expansion costs one pass over the predicate's statements. Temporal
+        views always expand forward, through the temporal index.
+        """
+        stats = self.graph.predicate_stats(predicate)
+        estimated = min(frontier_rows * stats.forward_fanout, stats.distinct_objects)
+        if view is not None:
+            step = ExpandForward(predicate, view)
+        elif stats.statement_count < frontier_rows:
+            step = ExpandReverse(predicate)
+        else:
+            step = ExpandForward(predicate)
+        return self._estimated(step, estimated)
+
+    def _hop_rows(self, hop: Hop, frontier_rows: float) -> float:
+        """Estimates the entities reached by a possibly repeated hop."""
+        stats = self.graph.predicate_stats(hop.predicate)
+        upper = hop.max_hops if hop.max_hops is not None else hop.min_hops + UNBOUNDED_HOP_ESTIMATE
+        rows = frontier_rows if hop.min_hops == 0 else 0.0
+        level = frontier_rows
+        fanout = stats.reverse_fanout if hop.inverse else stats.forward_fanout
+        for depth in range(1, upper + 1):
+            level *= fanout
+            if depth >= hop.min_hops:
+                rows += level
+        if hop.is_single:
+            return min(rows, stats.distinct_subjects if hop.inverse else stats.distinct_objects)
+        return rows
+
+    def _materialized_rows(self, result_type: QueryResultType, rows: float) -> float:
+        if result_type == QueryResultType.STATEMENTS:
+            subjects = len(self.graph.index.spo)
+            average_out_degree = len(self.graph.statements) / subjects if subjects else 0.0
+            return rows * average_out_degree
+        return rows
+
+    @staticmethod
+    def _page_rows(rows: float, offset: Optional[int], limit: Optional[int]) -> float:
+        rows = max(rows - (offset or 0), 0.0)
+        return min(rows, limit) if limit is not None else rows
+
+    @staticmethod
+    def _estimated(step: PlanStep, rows: float) -> PlanStep:
+        step.estimated_rows = rows
+        return step
@@ -1,16 +1,120 @@
-from typing import List, Set, Dict, Any, Optional, Callable, TypeVar, Generic, Union
-from dataclasses import dataclass
+from typing import List, Set, Dict, Any, Optional, Callable, TypeVar, Generic, Union, Iterator
+from dataclasses import dataclass, field
 from enum import Enum
-from graph_layer_core import GraphLayer, EntityId, Statement
+from itertools import islice
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime
+from graph_layer_core import GraphLayer, EntityId, Entity, Statement
 
 T = TypeVar('T')
 
+@dataclass(frozen=True)
+class Hop:
+    """
+    One step of a property chain: follow `predicate` at least `min_hops` and at
+    most `max_hops` times. A max_hops of None follows the predicate until no new
+    entities are reached. Inverse hops go from objects to subjects.
+    """
+    predicate: EntityId
+    min_hops: int = 1
+    max_hops: Optional[int] = 1
+    inverse: bool = False
+
+    def __post_init__(self):
+        if self.min_hops < 0:
+            raise ValueError("min_hops must not be negative")
+        if self.max_hops is not None and self.max_hops < self.min_hops:
+            raise ValueError("max_hops must be at least min_hops")
+
+    @property
+    def is_single(self) -> bool:
+        return self.min_hops == 1 and self.max_hops == 1
+
+    def __str__(self) -> str:
+        return f"^{self.predicate}" if self.inverse else str(self.predicate)
+
+class PathSearchMode(Enum):
+    """Defines how paths between the start and end entities are searched"""
+    SHORTEST = "shortest"
+    ALL = "all"
+
+@dataclass(frozen=True)
+class PathSearch:
+    """Path search between the query frontier and its end entities."""
+    mode: PathSearchMode
+    predicates: Optional[frozenset] = None  # None allows any predicate
+    max_depth: Optional[int] = None
+
+@dataclass(frozen=True)
+class IndexedKey:
+    """
+    An order_by key backed by a sorted index. It works as a plain key function,
+    and also lets the planner read the first results of a limited query in
+    index order instead of sorting every match.
+    Fields: "created_at" and "label" (latest label in `language`, "" when
+    missing) order entities; "timestamp" orders statements.
+    """
+    field: str
+    language: str = "en"
+
+    def __post_init__(self):
+        if self.field not in ("created_at", "label", "timestamp"):
+            raise ValueError(f"No sorted index for {self.field!r}")
+
+    @property
+    def indexes_statements(self) -> bool:
+        return self.field == "timestamp"
+
+    def __call__(self, result: Union[Entity, Statement]) -> Any:
+        if self.field == "label":
+            latest = result.latest("labels", self.language)
+            return latest[0] if latest else ""
+        return getattr(result, self.field)
+
+CREATED_AT = IndexedKey("created_at")
+STATEMENT_TIMESTAMP = IndexedKey("timestamp")
+
+def latest_label(language: str = "en") -> IndexedKey:
+    """Order key on an entity's latest label in a language."""
+    return IndexedKey("label", language)
+
+class _Reversed:
+    """Wraps a sort key value so that it orders in reverse."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __lt__(self, other: '_Reversed') -> bool:
+        return other.value < self.value
+
+    def __gt__(self, other: '_Reversed') -> bool:
+        return self.value < other.value
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _Reversed) and self.value == other.value
+
+    def __hash__(self) -> int:
+        return hash(("desc", self.value))
+
+@dataclass(frozen=True)
+class Descending:
+    """An order_by key applied in descending order."""
+    key: Callable
+
+    def __call__(self, result: Any) -> _Reversed:
+        return _Reversed(self.key(result))
+
 class QueryResultType(Enum):
     """Defines what kind of results a query should return"""
     ENTITIES = "entities"
     STATEMENTS = "statements"
     VALUES = "values"
     PATHS = "paths"
+    BINDINGS = "bindings"
 
 @dataclass
 class QueryResult(Generic[T]):
@@ -21,10 +125,80 @@ class QueryResult(Generic[T]):
     results: List[T]
     total_matches: int
     execution_time_ms: float
+    continuation_token: Optional[str] = None  # Set for keyset-paginated queries
+    cache_hits: int = 0  # Query cache counters at the time of this result
+    cache_misses: int = 0
+    stages: List['StageStats'] = field(default_factory=list)  # Per plan step; empty for cached results
+    index_hits: int = 0  # Index lookups that found entries
+    statements_scanned: int = 0
     
     def __iter__(self):
         return iter(self.results)
 
+def _encode_key_value(value: Any) -> Any:
+    if isinstance(value, _Reversed):
+        return {"$desc": value.value}
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(type(value).__name__)
+
+def _decode_key_value(value: Dict[str, Any]) -> Any:
+    if "$desc" in value:
+        return _Reversed(value["$desc"])
+    if "$datetime" in value:
+        return datetime.fromisoformat(value["$datetime"])
+    return value
+
+def _encode_token(key: tuple) -> str:
+    """Encodes a keyset sort key as an opaque, URL-safe continuation token."""
+    try:
+        payload = json.dumps(key, separators=(",", ":"), default=_encode_key_value)
+    except TypeError:
+        raise ValueError("order_by keys must return JSON-serializable values to paginate by keyset") from None
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def _decode_token(token: str) -> tuple:
+    def as_tuple(value):
+        return tuple(as_tuple(v) for v in value) if isinstance(value, list) else value
+    try:
+        payload = base64.urlsafe_b64decode(token.encode("ascii"))
+        return as_tuple(json.loads(payload, object_hook=_decode_key_value))
+    except ValueError:
+        raise ValueError(f"Invalid continuation token: {token!r}") from None
+
+class QueryCursor:
+    """
+    Pages lazily through a query's results in keyset order.
+    The query runs once and pages are pulled from its result stream as they
+    are fetched. After each page, `token` identifies the last row returned;
+    passing it to GraphQuery.after() resumes from that row in a new query,
+    for example when serving the next page of a web request.
+    """
+    def __init__(self, query: 'GraphQuery', page_size: int):
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        plan = query.plan(keyset=True)
+        self.page_size = page_size
+        self.token: Optional[str] = None
+        self.exhausted = False
+        self._key = plan.result_key
+        self._rows = plan.stream(query.graph)
+
+    def fetch(self) -> List[Any]:
+        """Returns the next page, which is shorter than page_size once results run out."""
+        page = list(islice(self._rows, self.page_size))
+        if page:
+            self.token = _encode_token(self._key(page[-1]))
+        if len(page) < self.page_size:
+            self.exhausted = True
+        return page
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        while not self.exhausted:
+            page = self.fetch()
+            if page:
+                yield page
+
 class GraphQuery:
     """
     Query builder for the graph layer. Provides a fluent interface for constructing
@@ -33,12 +207,22 @@ class GraphQuery:
     def __init__(self, graph: GraphLayer):
         self.graph = graph
         self.start_entities: Set[EntityId] = set()
-        self.property_chains: List[List[EntityId]] = []
+        self.start_searches: List['TextMatches'] = []
+        self.end_entities: Optional[Set[EntityId]] = None
+        self.property_chains: List[List[Hop]] = []
+        self.path_search: Optional[PathSearch] = None
         self.filters: List[Callable] = []
         self.result_type = QueryResultType.ENTITIES
-        self.limit: Optional[int] = None
-        self.offset: Optional[int] = None
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
         self._order_by: List[Callable] = []
+        self._keyset = False
+        self._after: Optional[tuple] = None
+        self._as_of: Optional[datetime] = None
+        self._current = False
+        self._group_by: Union[EntityId, str, None] = None
+        self.patterns: List['TriplePattern'] = []
+        self._select: Optional['Variable'] = None
         
     def starting_from(self, entity_ids: Union[EntityId, List[EntityId]]) -> 'GraphQuery':
         """Define the starting point(s) for the query."""
@@ -48,34 +232,167 @@ class GraphQuery:
             self.start_entities.update(entity_ids)
         return self
     
-    def follow(self, property_id: EntityId) -> 'GraphQuery':
-        """Add a property to follow in the graph traversal."""
-        self.property_chains.append([property_id])
+    def starting_from_search(self, text: str, prefix: bool = False, language: Optional[str] = "en",
+                             fields: Optional[List[str]] = None,
+                             case_sensitive: bool = False) -> 'GraphQuery':
+        """
+        Start from the entities whose latest label or description in
+        `language`, or literal statement objects, contain every word of
+        `text`, looked up in the graph's text index when the query runs.
+        With prefix set, the last word may be the start of a longer one.
+        """
+        from graph_filters import text_matches  # Import here to avoid circular imports
+        from graph_text_index import TEXT_FIELDS
+        self.start_searches.append(text_matches(
+            text, fields if fields is not None else TEXT_FIELDS, language, prefix, case_sensitive))
+        return self
+    
+    def ending_at(self, entity_ids: Union[EntityId, List[EntityId]]) -> 'GraphQuery':
+        """Restrict the entities (or path ends) the query may finish on."""
+        if self.end_entities is None:
+            self.end_entities = set()
+        if isinstance(entity_ids, EntityId):
+            self.end_entities.add(entity_ids)
+        else:
+            self.end_entities.update(entity_ids)
+        return self
+    
+    def follow(self, property_id: EntityId, min_hops: int = 1,
+               max_hops: Optional[int] = 1) -> 'GraphQuery':
+        """
+        Add a property to follow in the graph traversal.
+        Pass min_hops/max_hops to follow it a variable number of times, for
+        example follow(tagged_with, 1, 5); max_hops=None has no upper bound.
+        """
+        self.property_chains.append([Hop(property_id, min_hops, max_hops)])
+        return self
+    
+    def follow_inverse(self, property_id: EntityId, min_hops: int = 1,
+                       max_hops: Optional[int] = 1) -> 'GraphQuery':
+        """
+        Follow a property backwards, from objects to the subjects of its
+        statements, e.g. from a tag to the documents tagged with it.
+        min_hops/max_hops work as in follow().
+        """
+        self.property_chains.append([Hop(property_id, min_hops, max_hops, inverse=True)])
+        return self
+    
+    def where(self, subject: Any, predicate: Any, object_: Any) -> 'GraphQuery':
+        """
+        Add a triple pattern; any term may be a graph_patterns.Variable. All
+        patterns must match at once, sharing variable bindings, e.g.
+        where(doc, tagged, alpha).where(doc, name, "X") with doc = var("doc").
+        The entities the selected variable takes (see select) are added to the
+        start entities, or with return_bindings() every solution is returned.
+        """
+        from graph_patterns import TriplePattern  # Import here to avoid circular imports
+        self.patterns.append(TriplePattern(subject, predicate, object_))
+        return self
+    
+    def select(self, variable: 'Variable') -> 'GraphQuery':
+        """Choose the pattern variable whose entities start the traversal (default: the first)."""
+        self._select = variable
+        return self
+    
+    def follow_chain(self, property_ids: List[Union[EntityId, Hop]]) -> 'GraphQuery':
+        """Follow a chain of properties (or Hops) in sequence."""
+        self.property_chains.append([
+            p if isinstance(p, Hop) else Hop(p) for p in property_ids
+        ])
         return self
     
-    def follow_chain(self, property_ids: List[EntityId]) -> 'GraphQuery':
-        """Follow a chain of properties in sequence."""
-        self.property_chains.append(property_ids)
+    def shortest_paths(self, via: Optional[List[EntityId]] = None,
+                       max_depth: Optional[int] = None) -> 'GraphQuery':
+        """
+        Return the shortest paths from the query frontier to the end entities
+        set with ending_at(), optionally only along the `via` properties.
+        """
+        return self._search_paths(PathSearchMode.SHORTEST, via, max_depth)
+    
+    def all_paths(self, via: Optional[List[EntityId]] = None,
+                  max_depth: Optional[int] = None) -> 'GraphQuery':
+        """
+        Return every path without repeated entities from the query frontier to
+        the end entities set with ending_at(), up to max_depth statements long.
+        """
+        return self._search_paths(PathSearchMode.ALL, via, max_depth)
+    
+    def _search_paths(self, mode: PathSearchMode, via: Optional[List[EntityId]],
+                      max_depth: Optional[int]) -> 'GraphQuery':
+        self.path_search = PathSearch(
+            mode=mode,
+            predicates=frozenset(via) if via is not None else None,
+            max_depth=max_depth
+        )
+        self.result_type = QueryResultType.PATHS
         return self
         
-    def filter(self, predicate: Callable) -> 'GraphQuery':
-        """Add a filter function to the query."""
+    def filter(self, predicate: Union[Callable, 'FilterExpression']) -> 'GraphQuery':
+        """
+        Add a filter to the query: a declarative expression from graph_filters,
+        such as has(prop, value) & (certainty(prop) >= 0.8), which the planner
+        can evaluate against indexes and reorder, or a function of an Entity.
+        """
         self.filters.append(predicate)
         return self
     
-    def order_by(self, key_func: Callable) -> 'GraphQuery':
-        """Define sort order for results."""
-        self._order_by.append(key_func)
+    def order_by(self, key_func: Callable, descending: bool = False) -> 'GraphQuery':
+        """
+        Define sort order for results; each call adds a less significant key.
+        Ordering on an IndexedKey such as CREATED_AT, latest_label() or
+        STATEMENT_TIMESTAMP lets limited queries read from a sorted index.
+        """
+        self._order_by.append(Descending(key_func) if descending else key_func)
         return self
     
     def limit(self, n: int) -> 'GraphQuery':
         """Limit the number of results returned."""
-        self.limit = n
+        self._limit = n
         return self
     
     def offset(self, n: int) -> 'GraphQuery':
         """Skip the first n results."""
-        self.offset = n
+        self._offset = n
+        return self
+    
+    def after(self, token: Optional[str] = None) -> 'GraphQuery':
+        """
+        Paginate by keyset: results come in a stable order (order_by keys, then
+        identity) and start after the row the continuation token identifies.
+        Without a token the first page is returned. The token for the next
+        page is on QueryResult.continuation_token.
+        """
+        self._keyset = True
+        self._after = _decode_token(token) if token is not None else None
+        return self
+    
+    def as_of(self, timestamp: datetime) -> 'GraphQuery':
+        """
+        Query the graph as it was at `timestamp`: statements stamped later,
+        entities created later and entities deleted by then are not seen.
+        """
+        self._as_of = timestamp
+        return self
+    
+    def current(self) -> 'GraphQuery':
+        """
+        Query the current view: only the latest statement per (subject,
+        predicate) is followed or returned, and tombstoned entities are
+        hidden. Combines with as_of() to see the current view at that time.
+        """
+        self._current = True
+        return self
+    
+    def group_by(self, key: Union[EntityId, str]) -> 'GraphQuery':
+        """
+        Group aggregates by the objects of a property (an entity counts in
+        each group it has a statement for), or by "predicate" or "object" to
+        group the matched entities' statements.
+        """
+        from graph_aggregates import STATEMENT_GROUPS  # Import here to avoid circular imports
+        if not isinstance(key, EntityId) and key not in STATEMENT_GROUPS:
+            raise ValueError(f"group_by takes a property or one of {STATEMENT_GROUPS}")
+        self._group_by = key
         return self
     
     def return_entities(self) -> 'GraphQuery':
@@ -97,66 +414,171 @@ class GraphQuery:
         """Set query to return entire paths that matched."""
         self.result_type = QueryResultType.PATHS
         return self
+    
+    def return_bindings(self) -> 'GraphQuery':
+        """Set query to return the where() pattern solutions, as {variable name: value} dicts."""
+        self.result_type = QueryResultType.BINDINGS
+        return self
+
+    def fingerprint(self) -> tuple:
+        """
+        Canonical, hashable form of the builder state, used as the query cache
+        key. Filters and order keys take part by identity.
+        """
+        return (
+            frozenset(self.start_entities),
+            tuple(self.start_searches),
+            frozenset(self.end_entities) if self.end_entities is not None else None,
+            tuple(tuple(chain) for chain in self.property_chains),
+            self.path_search,
+            tuple(self.filters),
+            self.result_type,
+            self._limit,
+            self._offset,
+            tuple(self._order_by),
+            self._keyset,
+            self._after,
+            self._as_of,
+            self._current,
+            self._group_by,
+            tuple(self.patterns),
+            self._select
+        )
+
+    def plan(self, keyset: bool = False) -> 'QueryPlan':
+        """
+        Build the physical plan this query would run, without running it.
+        With keyset set, results are ordered for keyset pagination even if
+        after() was not called.
+        """
+        from graph_query_planner import QueryPlanner  # Import here to avoid circular imports
+        return QueryPlanner(self.graph).plan(self, keyset=keyset)
+
+    def explain(self, analyze: bool = True) -> 'QueryPlan':
+        """
+        Return the physical plan for this query.
+        With analyze set, the plan is executed so every step reports its actual
+        row count next to the planner's estimate.
+        """
+        plan = self.plan()
+        if analyze:
+            plan.execute(self.graph)
+        return plan
+
+    def iterate(self) -> Iterator[Any]:
+        """
+        Yield results lazily instead of building the full result list.
+        Filtering, materialization and pagination run as a generator pipeline,
+        so an unordered query with a limit stops once the page is full and a
+        caller can stop consuming at any point. Ordering still needs every
+        match before the first result.
+        """
+        return self.plan().stream(self.graph)
+
+    def cursor(self, page_size: int) -> QueryCursor:
+        """Page through the results in keyset order, page_size rows at a time."""
+        return QueryCursor(self, page_size)
 
-    def execute(self) -> QueryResult:
+    def aggregate(self, **aggregates: 'Aggregate') -> 'AggregateResult':
+        """
+        Compute aggregates over the matches instead of returning them, e.g.
+        query.group_by(tag).aggregate(docs=count(), certainty=average("certainty")).
+        Values are folded per group while the index is read, so no results
+        are materialized; ordering and pagination are ignored. Statement
+        queries aggregate over the matched entities' statements.
+        """
+        from graph_query_planner import QueryPlanner  # Import here to avoid circular imports
+        from graph_aggregates import AggregateResult
+        if not aggregates:
+            raise ValueError("aggregate() needs at least one named aggregate")
+        start_time = time.perf_counter_ns()
+        plan = QueryPlanner(self.graph).plan_aggregate(self, aggregates)
+        groups, total_matches = plan.execute(self.graph)
+        return AggregateResult(groups, total_matches, (time.perf_counter_ns() - start_time) / 1_000_000)
+
+    def count(self) -> int:
+        """Count the matches (statements, for statement queries) without materializing them."""
+        from graph_aggregates import count  # Import here to avoid circular imports
+        return self.aggregate(count=count())["count"]
+
+    async def execute_async(self) -> QueryResult:
+        """
+        Execute the query from asyncio code. It yields to the event loop once
+        and then runs the whole query on the loop thread without further
+        awaits, so concurrent writers on the same loop cannot interleave with
+        it, but every other task waits until it finishes. Run heavy queries
+        with AsyncGraph.execute(on_snapshot=True) to keep them off the loop
+        (see graph_async).
+        """
+        await asyncio.sleep(0)
+        return self.execute()
+
+    def execute(self, executor: Optional['ParallelExecutor'] = None) -> QueryResult:
         """
         Execute the query and return results.
-        The execution follows these steps:
-        1. Start with the initial entities
-        2. For each property chain, follow the relationships
-        3. Apply filters at each step
-        4. Transform results based on return type
-        5. Apply sorting and pagination
-        """
-        import time
+        If the graph has a query cache, an identical earlier query's results
+        are returned while nothing they depend on has changed. Pass a
+        graph_parallel.ParallelExecutor to spread wide hops and filters over
+        a process pool.
+        The query is turned into a physical plan which:
+        1. Starts with the initial entities
+        2. Follows each property chain, forward or reverse by predicate statistics
+        3. Applies filters
+        4. Transforms results based on return type
+        5. Applies sorting and pagination, paginating before materialization
+           when there is no ordering
+        The result reports each step's rows and time in `stages`. A tracer
+        installed with GraphLayer.set_tracer sees a "graph.query.execute" span.
+        """
+        tracer = self.graph.tracer
+        if tracer is not None:
+            with tracer.start_span("graph.query.execute", {"result_type": self.result_type.value}) as span:
+                result = self._execute(executor)
+                span.set_attribute("total_matches", result.total_matches)
+                span.set_attribute("statements_scanned", result.statements_scanned)
+                span.set_attribute("index_hits", result.index_hits)
+                return result
+        return self._execute(executor)
+
+    def _execute(self, executor: Optional['ParallelExecutor']) -> QueryResult:
         start_time = time.perf_counter_ns()  # Using nanosecond precision
         
-        # Start with our initial entity set
-        current_entities = self.start_entities
-        
-        # Follow each property chain
-        for chain in self.property_chains:
-            next_entities = set()
-            for entity_id in current_entities:
-                # Find statements matching the current entity and property
-                for statement in self.graph.statements:
-                    if statement.subject == entity_id and statement.predicate == chain[0]:
-                        if isinstance(statement.object, EntityId):
-                            next_entities.add(statement.object)
-            current_entities = next_entities
-        
-        # Apply filters
-        filtered_entities = set()
-        for entity_id in current_entities:
-            entity = self.graph.entities.get(entity_id)
-            if entity and all(f(entity) for f in self.filters):
-                filtered_entities.add(entity_id)
-        
-        # Transform results based on return type
-        if self.result_type == QueryResultType.ENTITIES:
-            results = [self.graph.entities[eid] for eid in filtered_entities]
-        elif self.result_type == QueryResultType.STATEMENTS:
-            results = [s for s in self.graph.statements 
-                      if s.subject in filtered_entities]
-        elif self.result_type == QueryResultType.VALUES:
-            results = [self.graph.get_latest_label(eid) for eid in filtered_entities]
-        else:  # PATHS
-            results = []  # Path finding to be implemented
-        
-        # Apply sorting
-        for key_func in reversed(self._order_by):
-            results.sort(key=key_func)
+        cache = self.graph.query_cache
+        if cache is not None:
+            key = self.fingerprint()
+            cached = cache.lookup(key)
+            if cached is not None:
+                return QueryResult(
+                    results=list(cached.results),
+                    total_matches=cached.total_matches,
+                    execution_time_ms=(time.perf_counter_ns() - start_time) / 1_000_000,
+                    continuation_token=cached.continuation_token,
+                    cache_hits=cache.hits,
+                    cache_misses=cache.misses
+                )
         
-        # Apply pagination
-        if self.offset:
-            results = results[self.offset:]
-        if self.limit:
-            results = results[:self.limit]
+        plan = self.plan()
+        results, total_matches = plan.execute(
+            self.graph, executor.run_step if executor is not None else None)
         
         execution_time = (time.perf_counter_ns() - start_time) / 1_000_000  # Convert nanoseconds to milliseconds
         
-        return QueryResult(
+        token = None
+        if plan.result_key is not None and results:
+            token = _encode_token(plan.result_key(results[-1]))
+        result = QueryResult(
             results=results,
-            total_matches=len(filtered_entities),
-            execution_time_ms=execution_time
-        )
\ No newline at end of file
+            total_matches=total_matches,
+            execution_time_ms=execution_time,
+            continuation_token=token,
+            stages=plan.stages(),
+            index_hits=plan.context.index_hits,
+            statements_scanned=plan.context.statements_scanned
+        )
+        if self.graph.slow_query_log is not None:
+            self.graph.slow_query_log.observe(plan, execution_time, total_matches, result.stages)
+        if cache is not None:
+            cache.store(key, self, plan.context.candidates, QueryResult(
+                list(results), total_matches, execution_time, token))
+            result.cache_hits, result.cache_misses = cache.hits, cache.misses
+        return result
@@ -0,0 +1,529 @@
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import List, Set, Dict, Any, Optional, Iterable, Union
+import uuid
+import zlib
+from graph_layer_core import (
+    GraphLayer, Entity, EntityId, EntityType, Statement, StatementBatch, PredicateStats, Delta,
+    EntityCreated, LabelAdded, BULK_CHUNK_SIZE, operation_origin
+)
+from graph_query_system import GraphQuery, QueryResultType
+from graph_query_planner import (
+    QueryPlanner, QueryPlan, PlanStep, ExecutionContext, StartLookup, ExpandRepeated, Filter,
+    Sort, Paginate, DEFAULT_FILTER_SELECTIVITY, entity_key
+)
+from graph_filters import FilterExpression
+
+# Per-worker command handlers; each takes the shard graph and the message arguments
+
+def _apply(graph: GraphLayer, operations: List[Any]) -> None:
+    for operation in operations:
+        graph._apply_operation(operation)
+        graph._append_log(operation_origin(operation), operation)
+
+def _annotate(graph: GraphLayer, entity_id: EntityId, kind: str, text: Optional[str], language: str) -> None:
+    if kind == "labels":
+        graph.add_label(entity_id, text, language)
+    elif kind == "descriptions":
+        graph.add_description(entity_id, text, language)
+    else:
+        graph.delete_entity(entity_id)
+
+def _expand(graph: GraphLayer, predicate: EntityId, entities: List[EntityId]) -> tuple:
+    spo = graph.index.spo
+    found: Set[EntityId] = set()
+    hits = scanned = 0
+    for entity_id in entities:
+        statements = spo.get(entity_id, {}).get(predicate, ())
+        if statements:
+            hits += 1
+            scanned += len(statements)
+        for statement in statements:
+            if isinstance(statement.object, EntityId):
+                found.add(statement.object)
+    return found, hits, scanned
+
+def _expand_inverse(graph: GraphLayer, predicate: EntityId, entities: List[EntityId]) -> tuple:
+    by_object = graph.index.pos.get(predicate, {})
+    found: Set[EntityId] = set()
+    hits = scanned = 0
+    for entity_id in entities:
+        statements = by_object.get(entity_id, ())
+        if statements:
+            hits += 1
+            scanned += len(statements)
+        found.update(statement.subject for statement in statements)
+    return found, hits, scanned
+
+def _filter(graph: GraphLayer, expressions: List[FilterExpression], entities: List[EntityId]) -> Set[EntityId]:
+    return Filter(expressions)._filter_set(set(entities), ExecutionContext(graph=graph))
+
+def _fetch(graph: GraphLayer, result_type: str, entities: List[EntityId], language: str) -> List[Any]:
+    if result_type == QueryResultType.ENTITIES.value:
+        return [graph.entities.get(entity_id) for entity_id in entities]
+    if result_type == QueryResultType.STATEMENTS.value:
+        return [list(graph.find_statements(subject=entity_id)) for entity_id in entities]
+    if result_type == "descriptions":
+        return [graph.get_latest_description(entity_id, language) for entity_id in entities]
+    return [graph.get_latest_label(entity_id, language) for entity_id in entities]
+
+def _stats(graph: GraphLayer, predicate: EntityId) -> tuple:
+    stats = graph.predicate_stats(predicate)
+    return stats.statement_count, stats.distinct_subjects, stats.distinct_objects
+
+def _sizes(graph: GraphLayer) -> tuple:
+    return len(graph.entities), len(graph.statements), len(graph.index.spo)
+
+_COMMANDS = {
+    "apply": _apply, "annotate": _annotate, "expand": _expand, "expand_inverse": _expand_inverse,
+    "filter": _filter,
+    "fetch": _fetch, "stats": _stats, "sizes": _sizes,
+}
+
+def _serve(connection: Connection, node_id: str, compact: bool) -> None:
+    """Worker process loop: owns one shard and answers commands until told to stop."""
+    graph = GraphLayer(node_id=node_id, compact=compact)
+    while True:
+        message = connection.recv()
+        if message is None:
+            connection.close()
+            return
+        command, arguments = message
+        try:
+            reply = (True, _COMMANDS[command](graph, *arguments))
+        except Exception as error:
+            reply = (False, error)
+        connection.send(reply)
+
+class ShardedGraph:
+    """
+    A graph partitioned across worker processes, each owning a GraphLayer
+    shard, with the GraphLayer API for writes, merges and queries.
+
+    An entity, its labels and the statements it is the subject of live on
+    the shard chosen by a stable hash of its ID, so hops and subject-centric
+    filters can run where the data is. Entity IDs are issued here so the
+    owning shard is known before the entity exists. Workers talk to this
+    coordinator over pipes.
+
+    Queries run as scatter-gather plans. Each hop level sends one batch per
+    shard holding part of the frontier (every shard, for inverse hops), all
+    shards work at once, and the results are gathered into the next frontier,
+    so cross-shard traffic is one round trip per hop level rather than per
+    edge. Filter expressions
+    run on the shards (they must only read the filtered entity's own
+    statements and labels, as the built-in ones do); callables run here on
+    gathered entities. Ordering and pagination run here. Text search starts,
+    graph patterns, path search, as_of/current, keyset pagination and
+    aggregates are not supported.
+
+    Replication is inbound only: merge, sync_from and apply_delta take
+    operations from GraphLayer replicas, tracked by version_vector.
+    """
+    def __init__(self, node_id: str, shards: int = 4, compact: bool = False):
+        if shards < 1:
+            raise ValueError("shards must be positive")
+        self.node_id = node_id
+        self._local_id_counter = 0
+        self._version: Dict[str, int] = {}
+        self._connections: List[Connection] = []
+        self._workers: List[Process] = []
+        for _ in range(shards):
+            parent, child = Pipe()
+            worker = Process(target=_serve, args=(child, node_id, compact), daemon=True)
+            worker.start()
+            child.close()
+            self._connections.append(parent)
+            self._workers.append(worker)
+        # GraphQuery execution looks for these; sharded graphs have none
+        self.query_cache = None
+        self.tracer = None
+        self.slow_query_log = None
+
+    @property
+    def shards(self) -> int:
+        return len(self._connections)
+
+    def shard_for(self, entity_id: EntityId) -> int:
+        """The shard that owns an entity and the statements about it."""
+        return zlib.crc32(str(entity_id).encode("utf-8")) % len(self._connections)
+
+    def partition(self, entities: Iterable[EntityId]) -> Dict[int, List[EntityId]]:
+        """Splits entity IDs by owning shard."""
+        parts: Dict[int, List[EntityId]] = {}
+        for entity_id in entities:
+            parts.setdefault(self.shard_for(entity_id), []).append(entity_id)
+        return parts
+
+    def scatter(self, requests: Dict[int, tuple]) -> Dict[int, Any]:
+        """
+        Sends one (command, arguments) request per shard, then gathers the
+        replies, so the shards work concurrently. Re-raises a shard's error.
+        """
+        if not self._connections:
+            raise ValueError("Sharded graph is closed")
+        for shard, request in requests.items():
+            self._connections[shard].send(request)
+        replies, error = {}, None
+        for shard in requests:
+            ok, value = self._connections[shard].recv()
+            if ok:
+                replies[shard] = value
+            elif error is None:
+                error = value
+        if error is not None:
+            raise error
+        return replies
+
+    def _broadcast(self, command: str, *arguments: Any) -> List[Any]:
+        return list(self.scatter({shard: (command, arguments) for shard in range(self.shards)}).values())
+
+    def _route(self, operations: Iterable[Any]) -> None:
+        """Sends operations to their owning shards, one batch per shard."""
+        batches: Dict[int, List[Any]] = {}
+        for operation in operations:
+            owner = operation.subject if isinstance(operation, Statement) else operation.entity_id
+            batches.setdefault(self.shard_for(owner), []).append(operation)
+        self.scatter({shard: ("apply", (batch,)) for shard, batch in batches.items()})
+
+    def _annotate(self, entity_id: EntityId, kind: str, text: Optional[str], language: str) -> None:
+        shard = self.shard_for(entity_id)
+        self.scatter({shard: ("annotate", (entity_id, kind, text, language))})
+        self._count_local(1)
+
+    def _count_local(self, operations: int) -> None:
+        self._version[self.node_id] = self._version.get(self.node_id, 0) + operations
+
+    def create_entity(self, entity_type: EntityType = EntityType.STANDARD) -> Entity:
+        """Creates a new entity with a unique ID on its owning shard."""
+        return self.bulk_create_entities(1, entity_type)[0]
+
+    def bulk_create_entities(self, count: int, entity_type: EntityType = EntityType.STANDARD,
+                             labels: Optional[Iterable[str]] = None,
+                             language: str = "en") -> List[Entity]:
+        """
+        Creates `count` entities sharing one creation timestamp, optionally
+        labelling them in order from `labels`. The returned entities are
+        copies; the shards hold the live ones.
+        """
+        created_at = datetime.now()
+        entities, operations = [], []
+        for _ in range(count):
+            self._local_id_counter += 1
+            entity_id = EntityId(id_type=entity_type, local_id=str(self._local_id_counter),
+                                 node_id=self.node_id)
+            entities.append(Entity(id=entity_id, created_at=created_at))
+            operations.append(EntityCreated(entity_id, created_at))
+        if labels is not None:
+            for entity, label in zip(entities, labels):
+                value = (label, created_at, self.node_id)
+                entity.labels.setdefault(language, set()).add(value)
+                operations.append(LabelAdded(entity.id, language, value))
+        self._route(operations)
+        self._count_local(len(operations))
+        return entities
+
+    def add_label(self, entity_id: EntityId, label: str, language: str = "en") -> None:
+        """Adds a label to an entity in a specific language."""
+        self._annotate(entity_id, "labels", label, language)
+
+    def add_description(self, entity_id: EntityId, description: str, language: str = "en") -> None:
+        """Adds a description to an entity in a specific language."""
+        self._annotate(entity_id, "descriptions", description, language)
+
+    def delete_entity(self, entity_id: EntityId) -> None:
+        """Tombstones an entity on its owning shard."""
+        self._annotate(entity_id, "deleted", None, "")
+
+    def add_statement(self, subject: EntityId, predicate: EntityId,
+                      object_: Union[EntityId, str], certainty: float = 1.0) -> Statement:
+        """Adds a new statement on the shard that owns its subject."""
+        statement = Statement(
+            id=str(uuid.uuid4()),
+            subject=subject,
+            predicate=predicate,
+            object=object_,
+            timestamp=datetime.now(),
+            node_id=self.node_id,
+            certainty=certainty
+        )
+        self._route([statement])
+        self._count_local(1)
+        return statement
+
+    def bulk_add_statements(self, statements: Union[StatementBatch, Iterable[tuple]]) -> int:
+        """
+        Adds many statements at once and returns how many were added. Rows
+        are stamped with one timestamp per chunk and sent to the shards as
+        one batch per shard per chunk.
+        """
+        rows = statements.rows() if isinstance(statements, StatementBatch) else iter(statements)
+        added = 0
+        while True:
+            chunk = [row for _, row in zip(range(BULK_CHUNK_SIZE), rows)]
+            if not chunk:
+                return added
+            timestamp = datetime.now()
+            self._route(Statement(str(uuid.uuid4()), row[0], row[1], row[2], timestamp, self.node_id,
+                                  row[3] if len(row) > 3 else 1.0) for row in chunk)
+            self._count_local(len(chunk))
+            added += len(chunk)
+
+    def get_entity(self, entity_id: EntityId) -> Optional[Entity]:
+        """Returns a copy of an entity from its owning shard, or None."""
+        return self.gather(QueryResultType.ENTITIES.value, [entity_id])[0]
+
+    def get_latest_label(self, entity_id: EntityId, language: str = "en") -> Optional[str]:
+        """Gets the most recent label for an entity in a specific language."""
+        return self.gather("labels", [entity_id], language)[0]
+
+    def get_latest_description(self, entity_id: EntityId, language: str = "en") -> Optional[str]:
+        """Gets the most recent description for an entity in a specific language."""
+        return self.gather("descriptions", [entity_id], language)[0]
+
+    def find_statements(self, subject: EntityId) -> List[Statement]:
+        """Returns the statements about a subject."""
+        return self.gather(QueryResultType.STATEMENTS.value, [subject])[0]
+
+    def successors(self, predicate: EntityId, entities: Iterable[EntityId],
+                   ctx: Optional[ExecutionContext] = None) -> Set[EntityId]:
+        """
+        Entity objects of the `predicate` statements about `entities`, with
+        one request per shard owning part of them.
+        """
+        replies = self.scatter({shard: ("expand", (predicate, part))
+                                for shard, part in self.partition(entities).items()})
+        return self._gather_frontier(replies, ctx)
+
+    def predecessors(self, predicate: EntityId, entities: Iterable[EntityId],
+                     ctx: Optional[ExecutionContext] = None) -> Set[EntityId]:
+        """
+        Subjects of the `predicate` statements whose objects are `entities`.
+        Those statements can be on any shard, so every shard gets the whole
+        frontier in one request.
+        """
+        frontier = list(entities)
+        replies = self.scatter({shard: ("expand_inverse", (predicate, frontier))
+                                for shard in range(self.shards)} if frontier else {})
+        return self._gather_frontier(replies, ctx)
+
+    @staticmethod
+    def _gather_frontier(replies: Dict[int, tuple], ctx: Optional[ExecutionContext]) -> Set[EntityId]:
+        found: Set[EntityId] = set()
+        for objects, hits, scanned in replies.values():
+            found |= objects
+            if ctx is not None:
+                ctx.index_hits += hits
+                ctx.statements_scanned += scanned
+        return found
+
+    def gather(self, kind: str, entities: List[EntityId], language: str = "en") -> List[Any]:
+        """
+        Fetches one value per entity from the owning shards (entities,
+        statement lists, labels or descriptions), in the order given.
+        """
+        parts = self.partition(entities)
+        replies = self.scatter({shard: ("fetch", (kind, part, language)) for shard, part in parts.items()})
+        found = {}
+        for shard, part in parts.items():
+            found.update(zip(part, replies[shard]))
+        return [found[entity_id] for entity_id in entities]
+
+    def predicate_stats(self, predicate: EntityId) -> PredicateStats:
+        """
+        Cardinality statistics for a predicate summed over the shards.
+        Subjects are partitioned, so statement and subject counts are exact;
+        objects can repeat across shards, so distinct_objects is an upper bound.
+        """
+        totals = [sum(values) for values in zip(*self._broadcast("stats", predicate))]
+        return PredicateStats(*totals)
+
+    def sizes(self) -> Dict[str, int]:
+        """Entity, statement and subject counts summed over the shards."""
+        entities, statements, subjects = (sum(values) for values in zip(*self._broadcast("sizes")))
+        return {"entities": entities, "statements": statements, "subjects": subjects}
+
+    def version_vector(self) -> Dict[str, int]:
+        """Returns the number of operations seen from each node."""
+        return dict(self._version)
+
+    def apply_delta(self, delta: Delta) -> int:
+        """
+        Applies a delta from a GraphLayer replica, routing every operation to
+        its owning shard, and returns the number of new operations.
+        Raises ValueError if a delta would leave a gap in a node's log.
+        """
+        pending = []
+        for node, (first, operations) in delta.operations.items():
+            seen = self._version.get(node, 0)
+            if first > seen + 1:
+                raise ValueError(
+                    f"Delta for node {node} starts at operation {first}, but only {seen} have been seen"
+                )
+            pending.append((node, operations[seen + 1 - first:]))
+        self._route(operation for _, operations in pending for operation in operations)
+        for node, operations in pending:
+            if operations:
+                self._version[node] = self._version.get(node, 0) + len(operations)
+        return sum(len(operations) for _, operations in pending)
+
+    def sync_from(self, other_graph: GraphLayer) -> int:
+        """Pulls the operations this graph is missing from a GraphLayer replica."""
+        return self.apply_delta(other_graph.delta_since(self.version_vector()))
+
+    def merge(self, other_graph: GraphLayer) -> None:
+        """Merges a GraphLayer replica into the shards."""
+        self.sync_from(other_graph)
+
+    def query(self) -> 'ShardedQuery':
+        """Creates a query builder that runs scatter-gather plans over the shards."""
+        return ShardedQuery(self)
+
+    def close(self) -> None:
+        """Stops the worker processes; their shards are discarded."""
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for worker in self._workers:
+            worker.join()
+        self._connections, self._workers = [], []
+
+    def __enter__(self) -> 'ShardedGraph':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+@dataclass
+class ScatterExpand(ExpandRepeated):
+    """
+    Follows a hop on the shards. Each level's frontier is split by owning
+    shard and sent as one batch per shard (or whole to every shard, for
+    inverse hops); the entities gathered from all shards form the next level.
+    """
+    def describe(self) -> str:
+        upper = self.hop.max_hops if self.hop.max_hops is not None else "*"
+        indexes = "POS" if self.hop.inverse else "SPO"
+        return f"{self.hop} {self.hop.min_hops}..{upper} via shard {indexes} indexes"
+
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        graph = ctx.graph
+        neighbours = graph.predecessors if self.hop.inverse else graph.successors
+        return self.expand(rows, lambda level: neighbours(self.hop.predicate, level, ctx))
+
+@dataclass
+class ScatterFilter(Filter):
+    """
+    Keeps the entities that exist on their shard and pass the filter
+    expressions there, then applies callables to the survivors here.
+    """
+    def run(self, rows: Set[EntityId], ctx: ExecutionContext) -> Set[EntityId]:
+        graph = ctx.graph
+        ctx.candidates = rows
+        ids = rows & self.end_entities if self.end_entities is not None else rows
+        expressions = [f for f in self.filters if isinstance(f, FilterExpression)]
+        callables = [f for f in self.filters if not isinstance(f, FilterExpression)]
+        replies = graph.scatter({shard: ("filter", (expressions, part))
+                                 for shard, part in graph.partition(ids).items()})
+        ids = set().union(*replies.values())
+        if callables:
+            ordered = list(ids)
+            entities = graph.gather(QueryResultType.ENTITIES.value, ordered)
+            ids = {entity.id for entity in entities if all(f(entity) for f in callables)}
+        ctx.total_matches = len(ids)
+        return ids
+
+    def stream(self, rows: Iterable[Any], ctx: ExecutionContext) -> Set[EntityId]:
+        return self.run(set(rows), ctx)
+
+@dataclass
+class Gather(PlanStep):
+    """
+    Fetches result objects for the matched entities from their shards,
+    with one request per shard. Statement results stop once `stop` exist.
+    """
+    result_type: QueryResultType
+    stop: Optional[int] = None
+
+    def describe(self) -> str:
+        detail = self.result_type.value
+        if self.stop is not None:
+            detail += f", stop after {self.stop}"
+        return detail
+
+    def run(self, rows: Iterable[EntityId], ctx: ExecutionContext) -> List[Any]:
+        ids = sorted(rows, key=entity_key) if isinstance(rows, set) else list(rows)
+        if self.result_type == QueryResultType.ENTITIES:
+            return ctx.graph.gather(self.result_type.value, ids)
+        if self.result_type == QueryResultType.STATEMENTS:
+            statement_lists = ctx.graph.gather(self.result_type.value, ids)
+            statements = list(islice((s for listed in statement_lists for s in listed), self.stop))
+            ctx.statements_scanned += len(statements)
+            return statements
+        return ctx.graph.gather("labels", ids)
+
+class ShardedPlanner(QueryPlanner):
+    """
+    Plans scatter-gather execution of a query over a ShardedGraph, estimating
+    hop sizes from predicate statistics summed over the shards.
+    """
+    def plan(self, query: GraphQuery, keyset: bool = False) -> QueryPlan:
+        if query.result_type == QueryResultType.PATHS or query.path_search is not None:
+            raise ValueError("Path queries are not supported on sharded graphs")
+        if query.start_searches:
+            raise ValueError("Text search starts are not supported on sharded graphs")
+        if query.patterns or query.result_type == QueryResultType.BINDINGS:
+            raise ValueError("Graph patterns are not supported on sharded graphs")
+        if query._as_of is not None or query._current:
+            raise ValueError("as_of and current queries are not supported on sharded graphs")
+        if keyset or query._keyset:
+            raise ValueError("Keyset pagination is not supported on sharded graphs")
+
+        steps: List[PlanStep] = [self._estimated(StartLookup(query.start_entities), len(query.start_entities))]
+        rows = steps[-1].estimated_rows
+        for chain in query.property_chains:
+            for hop in chain:
+                steps.append(self._estimated(ScatterExpand(hop), self._hop_rows(hop, rows)))
+                rows = steps[-1].estimated_rows
+        rows *= DEFAULT_FILTER_SELECTIVITY ** len(query.filters)
+        steps.append(self._estimated(ScatterFilter(list(query.filters), query.end_entities), rows))
+
+        offset, limit = query._offset, query._limit
+        paginated = offset is not None or limit is not None
+        gather = Gather(query.result_type)
+        if query._order_by or not paginated:
+            keep = (offset or 0) + limit if limit is not None else None
+            steps.append(self._estimated(gather, self._materialized_rows(query.result_type, rows)))
+            rows = gather.estimated_rows
+            if query._order_by:
+                steps.append(self._estimated(Sort(query._order_by, keep), min(rows, keep or rows)))
+            if paginated:
+                steps.append(self._estimated(Paginate(offset, limit), self._page_rows(rows, offset, limit)))
+        elif query.result_type == QueryResultType.STATEMENTS:
+            if limit is not None:
+                gather.stop = (offset or 0) + limit
+            rows = self._materialized_rows(query.result_type, rows)
+            steps.append(self._estimated(gather, min(rows, gather.stop or rows)))
+            steps.append(self._estimated(Paginate(offset, limit), self._page_rows(rows, offset, limit)))
+        else:
+            rows = self._page_rows(rows, offset, limit)
+            steps.append(self._estimated(Paginate(offset, limit), rows))
+            steps.append(self._estimated(gather, rows))
+        return QueryPlan(steps)
+
+    def _materialized_rows(self, result_type: QueryResultType, rows: float) -> float:
+        if result_type == QueryResultType.STATEMENTS:
+            sizes = self.graph.sizes()
+            return rows * (sizes["statements"] / sizes["subjects"] if sizes["subjects"] else 0.0)
+        return rows
+
+class ShardedQuery(GraphQuery):
+    """GraphQuery over a ShardedGraph; execute, iterate and explain run scatter-gather plans."""
+    def plan(self, keyset: bool = False) -> QueryPlan:
+        return ShardedPlanner(self.graph).plan(self, keyset=keyset)
+
+    def aggregate(self, **aggregates: Any) -> Any:
+        raise ValueError("Aggregates are not supported on sharded graphs")
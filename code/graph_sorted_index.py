@@ -0,0 +1,169 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Any, Callable, Iterable, Iterator
+from graph_layer_core import GraphLayer, EntityId, Statement, EntityCreated, LabelAdded
+from graph_query_system import IndexedKey
+from graph_storage import to_microseconds
+
+# Entries per chunk of a sorted index; chunks split when they reach twice this
+CHUNK_SIZE = 512
+
+class _SortedChunks:
+    """
+    A sorted sequence of (key, item) pairs split into chunks, each holding
+    its keys and items in parallel columns built by key_column and
+    item_column (typed arrays where the values allow, lists otherwise), with
+    each chunk's largest key kept for bisection. An insert or removal is a bisect over the chunk
+    maxima plus a shift within one chunk, rather than a shift of the whole
+    sequence. Equal keys keep their insertion order.
+    """
+    def __init__(self, keys: List[Any], items: List[Any], key_column: Callable, item_column: Callable):
+        self.key_column = key_column
+        self.item_column = item_column
+        self.keys = [key_column(keys[i:i + CHUNK_SIZE]) for i in range(0, len(keys), CHUNK_SIZE)]
+        self.items = [item_column(items[i:i + CHUNK_SIZE]) for i in range(0, len(items), CHUNK_SIZE)]
+        self.maxes = [chunk[-1] for chunk in self.keys]
+        self.length = len(keys)
+
+    def insert(self, key: Any, item: Any) -> None:
+        if not self.keys:
+            self.keys.append(self.key_column([key]))
+            self.items.append(self.item_column([item]))
+            self.maxes.append(key)
+            self.length = 1
+            return
+        chunk = min(bisect_right(self.maxes, key), len(self.maxes) - 1)
+        keys, items = self.keys[chunk], self.items[chunk]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        items.insert(position, item)
+        self.maxes[chunk] = keys[-1]
+        self.length += 1
+        if len(keys) >= 2 * CHUNK_SIZE:
+            self.keys[chunk:chunk + 1] = [keys[:CHUNK_SIZE], keys[CHUNK_SIZE:]]
+            self.items[chunk:chunk + 1] = [items[:CHUNK_SIZE], items[CHUNK_SIZE:]]
+            self.maxes[chunk:chunk + 1] = [keys[CHUNK_SIZE - 1], keys[-1]]
+
+    def remove(self, key: Any) -> None:
+        """Removes the entry with a key, which must be present and unique."""
+        chunk = bisect_left(self.maxes, key)
+        keys, items = self.keys[chunk], self.items[chunk]
+        position = bisect_left(keys, key)
+        del keys[position]
+        del items[position]
+        self.length -= 1
+        if keys:
+            self.maxes[chunk] = keys[-1]
+        else:
+            del self.keys[chunk], self.items[chunk], self.maxes[chunk]
+
+    def between(self, low: Any, high: Any) -> Iterator[Any]:
+        """Items whose keys are at least `low` and below `high`."""
+        for chunk in range(bisect_left(self.maxes, low), len(self.keys)):
+            keys, items = self.keys[chunk], self.items[chunk]
+            start = bisect_left(keys, low)
+            stop = bisect_left(keys, high)
+            yield from items[start:stop]
+            if stop < len(keys):
+                return
+
+    def ascending(self) -> Iterator[Any]:
+        for items in self.items:
+            yield from items
+
+    def descending(self) -> Iterator[Any]:
+        for items in reversed(self.items):
+            yield from reversed(items)
+
+    def __len__(self) -> int:
+        return self.length
+
+class SortedIndex:
+    """
+    Entities (or statements) kept in the order of an IndexedKey, so ordered
+    queries with a limit can read results in sorted order and stop early
+    instead of sorting every match.
+    Built from the graph on first use and kept current from the operation
+    log: entity keys are updated on EntityCreated and LabelAdded, statement
+    keys on each added statement. Entries live in chunked sorted columns, so
+    keeping the order current costs a shift within one chunk per change.
+    Entity entries are keyed by (value, tiebreak) with a unique tiebreak.
+    Statement entries are keyed by timestamp; on row-based stores (compact
+    or snapshot-backed graphs) both columns are int64 arrays of microseconds
+    and row numbers, and Statement views are built only as results are read.
+    """
+    def __init__(self, graph: GraphLayer, key: IndexedKey):
+        self.graph = graph
+        self.key = key
+        self._values: Dict[EntityId, tuple] = {}  # Current key per entity
+        self._rows = hasattr(graph.statements, "export_rows")
+        if not key.indexes_statements:
+            for entity in graph.entities.values():
+                self._values[entity.id] = self._entity_key(entity.id)
+            ordered = sorted(self._values.items(), key=lambda entry: entry[1])
+            self.entries = _SortedChunks([k for _, k in ordered], [e for e, _ in ordered], list, list)
+        elif self._rows:
+            # Rows as (row, id bytes, nonstandard id, subject, predicate, object, microseconds, ...)
+            stamped = sorted((row[6], row[0]) for row in graph.statements.export_rows())
+            column = lambda values: array('q', values)
+            self.entries = _SortedChunks([t for t, _ in stamped], [r for _, r in stamped], column, column)
+        else:
+            ordered = sorted(graph.statements, key=key)
+            self.entries = _SortedChunks([key(s) for s in ordered], ordered, list, list)
+
+    def _entity_key(self, entity_id: EntityId) -> tuple:
+        return (self.key(self.graph.entities[entity_id]),
+                (entity_id.node_id, entity_id.local_id, entity_id.id_type.value))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _resolve(self, items: Iterable[Any]) -> Iterator[Any]:
+        if self.key.indexes_statements and self._rows:
+            statement = self.graph.statements.statement
+            return (statement(row) for row in items)
+        return iter(items)
+
+    def ascending(self) -> Iterator[Any]:
+        """Yields indexed entity IDs (or statements) from the smallest key up."""
+        return self._resolve(self.entries.ascending())
+
+    def descending(self) -> Iterator[Any]:
+        """Yields indexed entity IDs (or statements) from the largest key down."""
+        return self._resolve(self.entries.descending())
+
+    def between(self, start: Any, end: Any) -> List[Any]:
+        """Indexed entity IDs (or statements) whose key value is in [start, end)."""
+        if self.key.indexes_statements and self._rows:
+            start, end = to_microseconds(start), to_microseconds(end)
+        elif not self.key.indexes_statements:
+            start, end = (start,), (end,)
+        return list(self._resolve(self.entries.between(start, end)))
+
+    def on_operation(self, node: str, sequence: int, operation: Any) -> None:
+        """Operation listener that keeps the index current."""
+        if self.key.indexes_statements:
+            if isinstance(operation, Statement):
+                self._add_statement(operation)
+        elif isinstance(operation, EntityCreated):
+            self._update(operation.entity_id)
+        elif isinstance(operation, LabelAdded):
+            if self.key.field == "label" and operation.kind == "labels" \
+                    and operation.language == self.key.language:
+                self._update(operation.entity_id)
+
+    def _add_statement(self, statement: Statement) -> None:
+        if self._rows:
+            self.entries.insert(to_microseconds(statement.timestamp), self.graph.statements.row_for_id(statement.id))
+        else:
+            self.entries.insert(self.key(statement), statement)
+
+    def _update(self, entity_id: EntityId) -> None:
+        key = self._entity_key(entity_id)
+        old = self._values.get(entity_id)
+        if old == key:
+            return
+        if old is not None:
+            self.entries.remove(old)
+        self._values[entity_id] = key
+        self.entries.insert(key, entity_id)
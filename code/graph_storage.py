@@ -0,0 +1,336 @@
+from array import array
+from collections.abc import Set as AbstractSet, Mapping, Collection
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Callable, Iterator, Union
+import uuid
+from graph_layer_core import EntityId, Statement, TripleIndex, PredicateStats
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+_FIBONACCI = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+def to_microseconds(timestamp: datetime) -> int:
+    """Converts a naive timestamp to integer microseconds since the epoch, exactly."""
+    return (timestamp - EPOCH) // MICROSECOND
+
+def from_microseconds(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+class Interner:
+    """
+    Assigns dense integer codes to hashable values, in first-seen order.
+    Each distinct value is stored once and shared by every row that uses it.
+    """
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        """Returns the code for a value, assigning a new one if needed."""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Any) -> Optional[int]:
+        """Returns the code for a value without assigning one."""
+        return self.codes.get(value)
+
+    def decode(self, code: int) -> Any:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+class CompactStatementStore(AbstractSet):
+    """
+    Column-oriented statement storage.
+    EntityIds and node IDs are interned to dense integers and literal objects go
+    into a separate string pool, so a statement costs a handful of machine
+    words spread across typed arrays instead of a tree of Python objects.
+    Object codes are non-negative for entities and negative for literals.
+
+    The store behaves as a read-only set of Statements; each Statement is a view
+    built from its row on demand. Timestamps are stored as microseconds since
+    the epoch and must be naive datetimes, as produced by the graph layer.
+
+    Statement IDs are found through an open-addressing hash table of row
+    numbers held in an array, probed linearly and compared against the ID
+    column, so lookups cost about two machine words per row rather than a
+    dict entry.
+    """
+    def __init__(self):
+        self.entity_codes = Interner()
+        self.node_codes = Interner()
+        self.literal_pool = Interner()
+        self.subjects = array('q')
+        self.predicates = array('q')
+        self.objects = array('q')
+        self.timestamps = array('q')
+        self.certainties = array('d')
+        self.nodes = array('q')
+        self.ids = bytearray()  # 16 bytes per row
+        self._slots = array('q', [-1]) * 8
+        self._slot_bits = 3
+        self._nonstandard_ids: Dict[int, str] = {}
+
+    # Encoding helpers
+
+    def encode_object(self, object_: Union[EntityId, str]) -> int:
+        if isinstance(object_, EntityId):
+            return self.entity_codes.encode(object_)
+        return -1 - self.literal_pool.encode(object_)
+
+    def lookup_object(self, object_: Union[EntityId, str]) -> Optional[int]:
+        if isinstance(object_, EntityId):
+            return self.entity_codes.lookup(object_)
+        code = self.literal_pool.lookup(object_)
+        return -1 - code if code is not None else None
+
+    def decode_object(self, code: int) -> Union[EntityId, str]:
+        if code >= 0:
+            return self.entity_codes.values[code]
+        return self.literal_pool.values[-1 - code]
+
+    @staticmethod
+    def encode_id(statement_id: str) -> tuple[bytes, bool]:
+        """
+        Packs a statement ID into 16 bytes. Returns the bytes and whether they
+        round-trip to the original string; other IDs get a stable surrogate.
+        """
+        try:
+            packed = uuid.UUID(statement_id)
+            if str(packed) == statement_id:
+                return packed.bytes, True
+        except ValueError:
+            pass
+        return uuid.uuid5(uuid.NAMESPACE_OID, statement_id).bytes, False
+
+    # Row access
+
+    def append(self, id_bytes: bytes, subject: int, predicate: int, object_: int,
+               timestamp: int, node: int, certainty: float) -> int:
+        """Appends an encoded row and returns its number. The caller checks for duplicates."""
+        row = len(self.subjects)
+        self.subjects.append(subject)
+        self.predicates.append(predicate)
+        self.objects.append(object_)
+        self.timestamps.append(timestamp)
+        self.nodes.append(node)
+        self.certainties.append(certainty)
+        self.ids += id_bytes
+        if (row + 1) * 3 > len(self._slots) * 2:
+            self._grow()
+        self._slots[self._probe(id_bytes)[0]] = row
+        return row
+
+    # ID lookup table
+
+    def _probe(self, id_bytes: bytes) -> tuple[int, int]:
+        """
+        Finds an ID in the lookup table. Returns (slot, row), where row is -1
+        and slot is the empty slot the ID would take if it is not present.
+        """
+        slots, ids, mask = self._slots, self.ids, len(self._slots) - 1
+        key = int.from_bytes(id_bytes, "big")
+        slot = (((key ^ (key >> 64)) * _FIBONACCI) & _MASK64) >> (64 - self._slot_bits)
+        while True:
+            row = slots[slot]
+            if row < 0 or ids[row * 16:row * 16 + 16] == id_bytes:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        """Doubles the lookup table and reinserts the stored rows."""
+        self._slot_bits += 1
+        self._slots = array('q', [-1]) * (1 << self._slot_bits)
+        ids = self.ids
+        for row in range(len(ids) // 16 - 1):
+            self._slots[self._probe(bytes(ids[row * 16:row * 16 + 16]))[0]] = row
+
+    def add(self, statement: Statement) -> int:
+        """Encodes and appends a statement, returning its row."""
+        id_bytes, standard = self.encode_id(statement.id)
+        row = self.append(
+            id_bytes,
+            self.entity_codes.encode(statement.subject),
+            self.entity_codes.encode(statement.predicate),
+            self.encode_object(statement.object),
+            to_microseconds(statement.timestamp),
+            self.node_codes.encode(statement.node_id),
+            statement.certainty
+        )
+        if not standard:
+            self._nonstandard_ids[row] = statement.id
+        return row
+
+    def row_for_id(self, statement_id: str) -> Optional[int]:
+        """Returns the row of the statement with an ID, or None."""
+        row = self._probe(self.encode_id(statement_id)[0])[1]
+        return row if row >= 0 else None
+
+    def row_of(self, statement: Statement) -> Optional[int]:
+        """Returns the row holding a statement, or None."""
+        row = self.row_for_id(statement.id)
+        if row is None or self.statement(row) != statement:
+            return None
+        return row
+
+    def statement_id(self, row: int) -> str:
+        nonstandard = self._nonstandard_ids.get(row)
+        if nonstandard is not None:
+            return nonstandard
+        return str(uuid.UUID(bytes=bytes(self.ids[row * 16:row * 16 + 16])))
+
+    def statement(self, row: int) -> Statement:
+        """Builds the Statement view for a row."""
+        return Statement(
+            id=self.statement_id(row),
+            subject=self.entity_codes.values[self.subjects[row]],
+            predicate=self.entity_codes.values[self.predicates[row]],
+            object=self.decode_object(self.objects[row]),
+            timestamp=from_microseconds(self.timestamps[row]),
+            node_id=self.node_codes.values[self.nodes[row]],
+            certainty=self.certainties[row]
+        )
+
+    def export_rows(self) -> Iterator[tuple]:
+        """
+        Yields every row as (row, id bytes, nonstandard id or None, subject,
+        predicate, object, timestamp in microseconds, node_id, certainty)
+        without building Statement objects.
+        """
+        entities, nodes, decode_object = self.entity_codes.values, self.node_codes.values, self.decode_object
+        for row in range(len(self.subjects)):
+            yield (row, bytes(self.ids[row * 16:row * 16 + 16]), self._nonstandard_ids.get(row),
+                   entities[self.subjects[row]], entities[self.predicates[row]],
+                   decode_object(self.objects[row]), self.timestamps[row],
+                   nodes[self.nodes[row]], self.certainties[row])
+
+    def nbytes(self) -> int:
+        """Bytes held by the statement columns, excluding interned values."""
+        columns = (self.subjects, self.predicates, self.objects,
+                   self.timestamps, self.certainties, self.nodes)
+        return sum(c.itemsize * len(c) for c in columns) + len(self.ids)
+
+    # Set protocol
+
+    def __contains__(self, statement: object) -> bool:
+        return isinstance(statement, Statement) and self.row_of(statement) is not None
+
+    def __iter__(self) -> Iterator[Statement]:
+        return (self.statement(row) for row in range(len(self.subjects)))
+
+    def __len__(self) -> int:
+        return len(self.subjects)
+
+    __hash__ = None
+
+class _RowsView(Collection):
+    """Read-only collection of the Statements stored at a list of rows."""
+    __slots__ = ("store", "rows")
+
+    def __init__(self, store: CompactStatementStore, rows: array):
+        self.store = store
+        self.rows = rows
+
+    def __iter__(self) -> Iterator[Statement]:
+        statement = self.store.statement
+        return (statement(row) for row in self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, statement: object) -> bool:
+        if not isinstance(statement, Statement):
+            return False
+        row = self.store.row_of(statement)
+        return row is not None and row in self.rows
+
+class _CodedMapping(Mapping):
+    """
+    Read-only view of an integer-keyed index level with decoded keys.
+    Lookups of values the store has never seen raise KeyError without
+    interning anything.
+    """
+    __slots__ = ("data", "lookup", "decode", "wrap")
+
+    def __init__(self, data: Dict[int, Any], lookup: Callable[[Any], Optional[int]],
+                 decode: Callable[[int], Any], wrap: Callable[[Any], Any]):
+        self.data = data
+        self.lookup = lookup
+        self.decode = decode
+        self.wrap = wrap
+
+    def __getitem__(self, key: Any) -> Any:
+        code = self.lookup(key)
+        if code is None or code not in self.data:
+            raise KeyError(key)
+        return self.wrap(self.data[code])
+
+    def __contains__(self, key: object) -> bool:
+        code = self.lookup(key)
+        return code is not None and code in self.data
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self.decode(code) for code in self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+class CompactTripleIndex(TripleIndex):
+    """
+    Triple indexes over a CompactStatementStore.
+    The indexes hold integer codes and row numbers; spo, pos and osp expose
+    them with the same nested mapping shape as TripleIndex, yielding
+    Statement views, so query operators work unchanged on either backend.
+    """
+    def __init__(self, store: CompactStatementStore):
+        self.store = store
+        self.spo_codes: Dict[int, Dict[int, array]] = {}
+        self.pos_codes: Dict[int, Dict[int, array]] = {}
+        self.osp_codes: Dict[int, Dict[int, array]] = {}
+        self.predicate_stats: Dict[EntityId, PredicateStats] = {}
+
+        entity_lookup = store.entity_codes.lookup
+        entity_decode = store.entity_codes.decode
+        rows = lambda data: _RowsView(store, data)
+        self.spo = _CodedMapping(self.spo_codes, entity_lookup, entity_decode,
+                                 lambda data: _CodedMapping(data, entity_lookup, entity_decode, rows))
+        self.pos = _CodedMapping(self.pos_codes, entity_lookup, entity_decode,
+                                 lambda data: _CodedMapping(data, store.lookup_object, store.decode_object, rows))
+        self.osp = _CodedMapping(self.osp_codes, store.lookup_object, store.decode_object,
+                                 lambda data: _CodedMapping(data, entity_lookup, entity_decode, rows))
+
+    def add(self, statement: Statement) -> None:
+        """Indexes a statement already appended to the store."""
+        self.add_row(self.store.row_for_id(statement.id))
+
+    def add_row(self, row: int) -> None:
+        """Indexes a stored row by its codes."""
+        store = self.store
+        subject, predicate, object_ = store.subjects[row], store.predicates[row], store.objects[row]
+
+        predicate_id = store.entity_codes.values[predicate]
+        stats = self.predicate_stats.get(predicate_id)
+        if stats is None:
+            stats = self.predicate_stats[predicate_id] = PredicateStats()
+        stats.statement_count += 1
+
+        by_predicate = self.spo_codes.setdefault(subject, {})
+        if predicate not in by_predicate:
+            by_predicate[predicate] = array('q')
+            stats.distinct_subjects += 1
+        by_predicate[predicate].append(row)
+
+        by_object = self.pos_codes.setdefault(predicate, {})
+        if object_ not in by_object:
+            by_object[object_] = array('q')
+            stats.distinct_objects += 1
+        by_object[object_].append(row)
+
+        self.osp_codes.setdefault(object_, {}).setdefault(subject, array('q')).append(row)
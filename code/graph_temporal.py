@@ -0,0 +1,150 @@
+"""
+Time-travel support: a time-partitioned statement index and the temporal
+views (as_of a timestamp, or current) queries read through it.
+"""
+from bisect import bisect_right, insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator
+from graph_layer_core import GraphLayer, EntityId, Statement, EntityDeleted, lww_key
+
+# Sorts after every statement ID, so (as_of, _LAST_ID) bounds all statements stamped as_of
+_LAST_ID = "\U0010ffff"
+
+@dataclass
+class _Run:
+    """Statements for one (subject, predicate), in (timestamp, id) order."""
+    keys: List[tuple] = field(default_factory=list)
+    statements: List[Statement] = field(default_factory=list)
+
+    def add(self, statement: Statement) -> None:
+        key = (statement.timestamp, statement.id)
+        position = bisect_right(self.keys, key)
+        if position and self.keys[position - 1] == key:
+            return
+        self.keys.insert(position, key)
+        self.statements.insert(position, statement)
+
+    def end(self, as_of: Optional[datetime]) -> int:
+        """Number of statements stamped at or before as_of (all of them for None)."""
+        if as_of is None:
+            return len(self.keys)
+        return bisect_right(self.keys, (as_of, _LAST_ID))
+
+class TemporalIndex:
+    """
+    Statements partitioned by subject and predicate, each partition kept in
+    timestamp order, plus the time each tombstoned entity was deleted.
+    A historical lookup is a bisect into one partition, so reading the graph
+    as of any time costs about the same as reading it now, and the latest
+    statement per (subject, predicate) is the last one before the bisect point.
+    Built from the graph on first use and kept current from the operation log.
+    """
+    def __init__(self, graph: GraphLayer):
+        self.graph = graph
+        self.runs: Dict[EntityId, Dict[EntityId, _Run]] = {}
+        self.deleted_at: Dict[EntityId, datetime] = {}
+        for statement in graph.statements:
+            self._add(statement)
+        for operations in graph._op_log.values():
+            for entry in operations:
+                if isinstance(entry, EntityDeleted):
+                    self._delete(entry)
+
+    def _add(self, statement: Statement) -> None:
+        predicates = self.runs.setdefault(statement.subject, {})
+        run = predicates.get(statement.predicate)
+        if run is None:
+            run = predicates[statement.predicate] = _Run()
+        run.add(statement)
+
+    def _delete(self, operation: EntityDeleted) -> None:
+        # Replicas may tombstone the same entity; the earliest deletion wins
+        previous = self.deleted_at.get(operation.entity_id)
+        if previous is None or operation.deleted_at < previous:
+            self.deleted_at[operation.entity_id] = operation.deleted_at
+
+    def on_operation(self, node: str, sequence: int, operation: Any) -> None:
+        """Operation listener that keeps the index current."""
+        if isinstance(operation, Statement):
+            self._add(operation)
+        elif isinstance(operation, EntityDeleted):
+            self._delete(operation)
+
+    def statements(self, subject: EntityId, predicate: EntityId,
+                   as_of: Optional[datetime] = None, latest: bool = False) -> List[Statement]:
+        """
+        Statements about subject with predicate stamped at or before as_of,
+        oldest first; with latest set, only the newest of them.
+        """
+        run = self.runs.get(subject, {}).get(predicate)
+        if run is None:
+            return []
+        end = run.end(as_of)
+        if latest:
+            return run.statements[end - 1:end]
+        return run.statements[:end]
+
+    def predicates(self, subject: EntityId) -> Iterator[EntityId]:
+        """Predicates of the statements about subject."""
+        return iter(self.runs.get(subject, ()))
+
+@dataclass(frozen=True)
+class TemporalView:
+    """
+    How a time-travel query sees the graph: as it was at `as_of` (or now,
+    if None), and with `current` set, only through the latest statement per
+    (subject, predicate). Entities are hidden once deleted, and before they
+    were created; statements are hidden along with their subject or object.
+    """
+    as_of: Optional[datetime] = None
+    current: bool = False
+
+    def __str__(self) -> str:
+        parts = [f"as of {self.as_of.isoformat()}"] if self.as_of is not None else []
+        if self.current:
+            parts.append("current")
+        return " ".join(parts)
+
+    def visible(self, graph: GraphLayer, entity_id: EntityId) -> bool:
+        """Whether an entity exists in this view."""
+        entity = graph.entities.get(entity_id)
+        if entity is None:
+            return False
+        if self.as_of is None:
+            return not entity.tombstone
+        if entity.created_at > self.as_of:
+            return False
+        deleted_at = graph.temporal_index().deleted_at.get(entity_id)
+        return deleted_at is None or deleted_at > self.as_of
+
+    def statements(self, graph: GraphLayer, subject: EntityId,
+                   predicate: Optional[EntityId] = None) -> List[Statement]:
+        """The statements about subject (with predicate, if given) this view shows."""
+        if not self.visible(graph, subject):
+            return []
+        index = graph.temporal_index()
+        predicates = [predicate] if predicate is not None else index.predicates(subject)
+        return [
+            statement
+            for p in predicates
+            for statement in index.statements(subject, p, self.as_of, self.current)
+            if not isinstance(statement.object, EntityId) or self.visible(graph, statement.object)
+        ]
+
+    def label(self, graph: GraphLayer, entity_id: EntityId, language: str = "en",
+              kind: str = "labels") -> Optional[str]:
+        """
+        The label (or description, for kind "descriptions") that was winning
+        at as_of. Values pruned by compact_labels are no longer available to
+        historical lookups.
+        """
+        entity = graph.entities.get(entity_id)
+        if entity is None:
+            return None
+        if self.as_of is None:
+            latest = entity.latest(kind, language)
+        else:
+            values = [v for v in getattr(entity, kind).get(language, ()) if v[1] <= self.as_of]
+            latest = max(values, key=lww_key) if values else None
+        return latest[0] if latest else None
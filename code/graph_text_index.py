@@ -0,0 +1,184 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Set, Any, Optional, Iterable, Iterator
+import re
+from graph_layer_core import GraphLayer, EntityId, Statement, LabelAdded
+
+TEXT_FIELDS = ("labels", "descriptions", "literals")
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text: str, case_sensitive: bool = False) -> List[str]:
+    """Splits text into word tokens, case-folded unless case_sensitive is set."""
+    return _TOKEN.findall(text if case_sensitive else text.casefold())
+
+class TextIndex:
+    """
+    Inverted index from case-folded word tokens to the entities whose text
+    contains them. Text is indexed per field: the latest label and the latest
+    description in each language, and the literal string objects of the
+    statements an entity is the subject of. Each field also keeps its tokens
+    in sorted order, so a prefix lookup is a bisect and a scan of the run of
+    tokens sharing the prefix.
+    Built from the graph on first use and kept current from the operation
+    log; when a newer label wins, the tokens of the one it replaced are
+    dropped.
+    """
+    def __init__(self, graph: GraphLayer):
+        self.graph = graph
+        # Field key ("labels" | "descriptions", language) or ("literals", None)
+        self.postings: Dict[tuple, Dict[str, Set[EntityId]]] = {}
+        self.tokens: Dict[tuple, List[str]] = {}
+        self._indexed: Dict[tuple, str] = {}  # (entity, kind, language) -> indexed text
+        for entity in graph.entities.values():
+            for kind in ("labels", "descriptions"):
+                for language in getattr(entity, kind):
+                    self._update_label(entity.id, kind, language)
+        for statement in graph.statements:
+            if isinstance(statement.object, str):
+                self._add(("literals", None), statement.subject, statement.object)
+
+    def _add(self, field: tuple, entity_id: EntityId, text: str) -> None:
+        postings = self.postings.setdefault(field, {})
+        for token in tokenize(text):
+            entities = postings.get(token)
+            if entities is None:
+                entities = postings[token] = set()
+                insort(self.tokens.setdefault(field, []), token)
+            entities.add(entity_id)
+
+    def _remove(self, field: tuple, entity_id: EntityId, text: str) -> None:
+        postings = self.postings[field]
+        for token in set(tokenize(text)):
+            entities = postings[token]
+            entities.discard(entity_id)
+            if not entities:
+                del postings[token]
+                tokens = self.tokens[field]
+                del tokens[bisect_left(tokens, token)]
+
+    def _update_label(self, entity_id: EntityId, kind: str, language: str) -> None:
+        latest = self.graph.entities[entity_id].latest(kind, language)
+        text = latest[0] if latest else None
+        key = (entity_id, kind, language)
+        old = self._indexed.get(key)
+        if old == text:
+            return
+        if old is not None:
+            self._remove((kind, language), entity_id, old)
+        if text is not None:
+            self._indexed[key] = text
+            self._add((kind, language), entity_id, text)
+
+    def on_operation(self, node: str, sequence: int, operation: Any) -> None:
+        """Operation listener that keeps the index current."""
+        if isinstance(operation, LabelAdded):
+            if operation.entity_id in self.graph.entities:
+                self._update_label(operation.entity_id, operation.kind, operation.language)
+        elif isinstance(operation, Statement) and isinstance(operation.object, str):
+            self._add(("literals", None), operation.subject, operation.object)
+
+    def _fields(self, fields: Iterable[str], language: Optional[str]) -> Iterator[tuple]:
+        for field in self.postings:
+            if field[0] in fields and (field[0] == "literals" or language is None or field[1] == language):
+                yield field
+
+    def _token_matches(self, field: tuple, token: str, prefix: bool) -> Set[EntityId]:
+        postings = self.postings[field]
+        if not prefix:
+            return postings.get(token, set())
+        tokens = self.tokens[field]
+        matched: Set[EntityId] = set()
+        for position in range(bisect_left(tokens, token), len(tokens)):
+            if not tokens[position].startswith(token):
+                break
+            matched |= postings[tokens[position]]
+        return matched
+
+    def search(self, text: str, fields: Iterable[str] = TEXT_FIELDS, language: Optional[str] = "en",
+               prefix: bool = False, case_sensitive: bool = False) -> Set[EntityId]:
+        """
+        Entities having every token of `text` in one of the fields (labels and
+        descriptions in `language`, or any language for None). With prefix
+        set, the last token matches any token it starts. Case-sensitive
+        searches are answered from the index and then checked against the
+        original text.
+        """
+        query = tokenize(text)
+        if not query:
+            return set()
+        fields = tuple(fields)
+        found: Set[EntityId] = set()
+        for field in self._fields(fields, language):
+            matched: Optional[Set[EntityId]] = None
+            for position, token in enumerate(query):
+                entities = self._token_matches(field, token, prefix and position == len(query) - 1)
+                matched = entities if matched is None else matched & entities
+                if not matched:
+                    break
+            if matched:
+                found |= matched
+        if case_sensitive:
+            found = {entity_id for entity_id in found
+                     if self.matches(entity_id, text, fields, language, prefix, case_sensitive)}
+        return found
+
+    def estimate(self, text: str, fields: Iterable[str] = TEXT_FIELDS,
+                 language: Optional[str] = "en", prefix: bool = False) -> int:
+        """
+        Upper bound on the number of search results, from the sizes of the
+        postings of the rarest whole token in each field.
+        """
+        query = tokenize(text)
+        if not query:
+            return 0
+        whole = query[:-1] if prefix else query
+        fields = tuple(fields)
+        total = 0
+        for field in self._fields(fields, language):
+            postings = self.postings[field]
+            if whole:
+                total += min(len(postings.get(token, ())) for token in whole)
+            else:
+                total += len(self._token_matches(field, query[-1], True))
+        return total
+
+    def matches(self, entity_id: EntityId, text: str, fields: Iterable[str] = TEXT_FIELDS,
+                language: Optional[str] = "en", prefix: bool = False,
+                case_sensitive: bool = False, view: Optional['TemporalView'] = None) -> bool:
+        """
+        Tests one entity's current text directly, without the index; with a
+        temporal view, the text that view shows.
+        """
+        query = tokenize(text, case_sensitive)
+        if not query:
+            return False
+        for texts in self._field_texts(entity_id, tuple(fields), language, view):
+            tokens = {token for text in texts for token in tokenize(text, case_sensitive)}
+            if all(token in tokens for token in query[:-1]) and (
+                    query[-1] in tokens if not prefix
+                    else any(t.startswith(query[-1]) for t in tokens)):
+                return True
+        return False
+
+    def _field_texts(self, entity_id: EntityId, fields: tuple, language: Optional[str],
+                     view: Optional['TemporalView'] = None) -> Iterator[List[str]]:
+        """The entity's text in each matching field, as the index (or the view) sees it."""
+        graph = self.graph
+        entity = graph.entities.get(entity_id)
+        if entity is None:
+            return
+        for kind in ("labels", "descriptions"):
+            if kind not in fields:
+                continue
+            languages = getattr(entity, kind) if language is None else (language,)
+            for lang in languages:
+                if view is not None:
+                    text = view.label(graph, entity_id, lang, kind)
+                else:
+                    latest = entity.latest(kind, lang)
+                    text = latest[0] if latest else None
+                if text is not None:
+                    yield [text]
+        if "literals" in fields:
+            statements = (view.statements(graph, entity_id) if view is not None
+                          else graph.find_statements(subject=entity_id))
+            yield [s.object for s in statements if isinstance(s.object, str)]
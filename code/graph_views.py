@@ -0,0 +1,225 @@
+from bisect import bisect_left, insort
+from itertools import islice, chain
+from typing import List, Set, Dict, Any, Optional, Iterable, Iterator
+import sys
+from graph_layer_core import GraphLayer, EntityId, Statement, EntityCreated, LabelAdded, EntityDeleted
+from graph_query_system import GraphQuery, QueryResultType, Hop
+from graph_filters import FilterExpression, passes
+
+class MaterializedView:
+    """
+    A registered GraphQuery whose results are kept up to date as operations
+    reach the graph, so reading it costs O(result) instead of a query run.
+    
+    The entities reached after each hop are kept as one set per level. Since
+    statements are only ever added, a new statement can only grow these sets:
+    it is pushed through the levels it connects, and only the newly reached
+    entities are expanded further. Filters and order keys are re-evaluated
+    for an entity when it is created or labelled (or, for filter expressions,
+    gains a statement on a predicate they test), so callables must depend
+    only on the entity they are given.
+    
+    Queries outside that shape (path results, hops with a bounded repeat
+    count above one, ordered non-entity results, as_of and current queries,
+    whose statements can be superseded, inverse hops, and queries starting
+    from a text search or a graph pattern) are not maintained
+    incrementally; they are recomputed on the first read after a statement
+    with one of their predicates (any predicate, for path searches without
+    `via`), a statement about a subject whose statements they return, or
+    any entity change, arrives.
+    """
+    def __init__(self, graph: GraphLayer, name: str, query: GraphQuery):
+        self.graph = graph
+        self.name = name
+        self.query = query
+        self.hops: List[Hop] = [hop for chain_ in query.property_chains for hop in chain_]
+        self.predicates = {hop.predicate for hop in self.hops}
+        self.path_any_predicate = False
+        if query.path_search is not None:
+            if query.path_search.predicates is None:
+                self.path_any_predicate = True
+            else:
+                self.predicates |= query.path_search.predicates
+        self.filter_predicates = set().union(*(
+            f.predicates() for f in query.filters if isinstance(f, FilterExpression)))
+        # Text filters over literal objects depend on statements of every predicate
+        self.filter_any_predicate = any(
+            f.any_predicate() for f in query.filters if isinstance(f, FilterExpression))
+        self.search_any_predicate = any(search.any_predicate() for search in query.start_searches)
+        self.pattern_predicates: Set[EntityId] = set()
+        self.pattern_any_predicate = False
+        if query.patterns:
+            from graph_patterns import BasicGraphPattern  # Import here to avoid circular imports
+            pattern = BasicGraphPattern(tuple(query.patterns))
+            self.pattern_predicates = pattern.predicates()
+            self.pattern_any_predicate = pattern.any_predicate()
+        self.incremental = self._supports_incremental(query, self.hops)
+        self.rebuild()
+
+    @staticmethod
+    def _supports_incremental(query: GraphQuery, hops: List[Hop]) -> bool:
+        if query.path_search is not None or query.result_type == QueryResultType.PATHS:
+            return False
+        if query._as_of is not None or query._current or query.start_searches or query.patterns:
+            return False
+        if any(hop.inverse for hop in hops):
+            return False
+        if query._order_by and query.result_type != QueryResultType.ENTITIES:
+            return False
+        return all(hop.is_single or (hop.min_hops <= 1 and hop.max_hops is None) for hop in hops)
+
+    def rebuild(self) -> None:
+        """Recomputes the view from the current graph."""
+        self._stale = False
+        self.subjects: Set[EntityId] = set()  # Subjects whose statements a recomputed view returns
+        if not self.incremental:
+            self.levels: List[Set[EntityId]] = []
+            self.matched: Dict[EntityId, None] = {}
+            self.entries: List[tuple] = []
+            plan = self.query.plan()
+            self._results, _ = plan.execute(self.graph)
+            if self.query.result_type == QueryResultType.STATEMENTS:
+                self.subjects = set(plan.context.candidates)
+            return
+        self.levels = [set(self.query.start_entities)]
+        for hop in self.hops:
+            self.levels.append(self._expand(hop, self.levels[-1]))
+        self.matched = {}
+        self.entries = []
+        self._keys: Dict[EntityId, tuple] = {}
+        for entity_id in self.levels[-1]:
+            self._refresh(entity_id)
+
+    def _expand(self, hop: Hop, entities: Iterable[EntityId]) -> Set[EntityId]:
+        """Entities reached from `entities` along one hop."""
+        spo, predicate = self.graph.index.spo, hop.predicate
+        def step(sources: Iterable[EntityId]) -> Set[EntityId]:
+            return {s.object for e in sources for s in spo.get(e, {}).get(predicate, ())
+                    if isinstance(s.object, EntityId)}
+        if hop.is_single:
+            return step(entities)
+        reached = set(entities) if hop.min_hops == 0 else set()
+        level = step(entities)
+        while level:
+            level -= reached
+            reached |= level
+            level = step(level)
+        return reached
+
+    def _matches(self, entity_id: EntityId) -> bool:
+        end_entities = self.query.end_entities
+        if end_entities is not None and entity_id not in end_entities:
+            return False
+        return entity_id in self.graph.entities and passes(self.graph, entity_id, self.query.filters)
+
+    def _refresh(self, entity_id: EntityId) -> None:
+        """Re-evaluates one entity of the last level against the filters and order keys."""
+        old_key = self._keys.pop(entity_id, None)
+        if old_key is not None:
+            del self.entries[bisect_left(self.entries, old_key)]
+        if not self._matches(entity_id):
+            self.matched.pop(entity_id, None)
+            return
+        self.matched[entity_id] = None
+        if self.query._order_by:
+            entity = self.graph.entities[entity_id]
+            key = (tuple(key(entity) for key in self.query._order_by),
+                   (entity_id.node_id, entity_id.local_id, entity_id.id_type.value), entity_id)
+            self._keys[entity_id] = key
+            insort(self.entries, key)
+
+    def _add(self, depth: int, entities: Set[EntityId]) -> None:
+        """Adds entities to a level and pushes the new ones through the following hops."""
+        while entities:
+            entities = entities - self.levels[depth]
+            self.levels[depth] |= entities
+            if depth == len(self.hops):
+                for entity_id in entities:
+                    self._refresh(entity_id)
+                return
+            entities = self._expand(self.hops[depth], entities)
+            depth += 1
+
+    def on_operation(self, node: str, sequence: int, operation: Any) -> None:
+        """Operation listener that keeps the view current."""
+        if isinstance(operation, Statement):
+            if self.path_any_predicate or operation.subject in self.subjects:
+                self._stale = True
+                return
+            if self.search_any_predicate and isinstance(operation.object, str):
+                self._stale = True
+                return
+            if self.pattern_any_predicate or operation.predicate in self.pattern_predicates:
+                self._stale = True
+                return
+            if operation.predicate in self.filter_predicates or self.filter_any_predicate:
+                if not self.incremental:
+                    self._stale = True
+                    return
+                if operation.subject in self.levels[-1]:
+                    self._refresh(operation.subject)
+            if operation.predicate in self.predicates and isinstance(operation.object, EntityId):
+                if not self.incremental:
+                    self._stale = True
+                    return
+                self._on_statement(operation)
+        elif isinstance(operation, (EntityCreated, LabelAdded, EntityDeleted)):
+            if not self.incremental:
+                self._stale = True
+            elif operation.entity_id in self.levels[-1]:
+                self._refresh(operation.entity_id)
+
+    def _on_statement(self, statement: Statement) -> None:
+        for depth, hop in enumerate(self.hops):
+            if hop.predicate != statement.predicate:
+                continue
+            if hop.is_single:
+                if statement.subject in self.levels[depth]:
+                    self._add(depth + 1, {statement.object})
+            elif statement.subject in self.levels[depth] or statement.subject in self.levels[depth + 1]:
+                self._add(depth + 1, {statement.object} | self._expand(hop, [statement.object]))
+
+    def _ordered_ids(self) -> Iterator[EntityId]:
+        if self.query._order_by:
+            return (entry[2] for entry in self.entries)
+        return iter(self.matched)
+
+    def results(self) -> List[Any]:
+        """Returns the view's current results, paginated like the query."""
+        if not self.incremental:
+            if self._stale:
+                self.rebuild()
+            return list(self._results)
+        graph, result_type = self.graph, self.query.result_type
+        start = self.query._offset or 0
+        stop = start + self.query._limit if self.query._limit is not None else None
+        ids = self._ordered_ids()
+        if result_type == QueryResultType.STATEMENTS:
+            statements = chain.from_iterable(graph.find_statements(subject=eid) for eid in ids)
+            return list(islice(statements, start, stop))
+        ids = islice(ids, start, stop)
+        if result_type == QueryResultType.VALUES:
+            return [graph.get_latest_label(eid) for eid in ids]
+        return [graph.entities[eid] for eid in ids]
+
+    def __len__(self) -> int:
+        """Number of matched entities, or results for recomputed views."""
+        if not self.incremental:
+            if self._stale:
+                self.rebuild()
+            return len(self._results)
+        return len(self.matched)
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the view's own structures. Entities and
+        statements are shared with the graph and are not counted.
+        """
+        size = sum(sys.getsizeof(level) for level in self.levels) + sys.getsizeof(self.subjects)
+        size += sys.getsizeof(self.matched) + sys.getsizeof(self.entries)
+        size += sum(sys.getsizeof(entry) + sys.getsizeof(entry[0]) for entry in self.entries)
+        if self.incremental:
+            size += sys.getsizeof(self._keys)
+        else:
+            size += sys.getsizeof(self._results)
+        return size
@@ -0,0 +1,394 @@
+"""
+Compact, versioned binary wire format for shipping operations between
+replicas, as an alternative to passing live GraphLayer objects to merge.
+
+A stream is a header followed by checksummed blocks, each holding a run of
+one node's operations (entities, labels and descriptions, deletions and
+statements), and an empty end block. Entity IDs, node IDs and languages are
+dictionary-coded: each is written in full the first time it appears and by
+a varint code afterwards. Timestamps are varint microsecond deltas from the
+previous one, statement UUIDs are 16 raw bytes and a certainty of 1.0 costs
+nothing. Blocks are optionally compressed with zlib or, if the zstandard
+package is installed, zstd.
+
+Encoding reads the operation log a block at a time and decoding applies one
+block at a time, so neither side ever holds a second full copy of the graph.
+"""
+from typing import Dict, List, Any, Optional, Iterator, BinaryIO, Hashable
+import struct
+import uuid
+import zlib
+from graph_layer_core import (
+    GraphLayer, EntityId, EntityType, Statement, Delta,
+    EntityCreated, LabelAdded, EntityDeleted
+)
+from graph_storage import to_microseconds, from_microseconds
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+WIRE_MAGIC = b"YGWIRE"
+WIRE_VERSION = 1
+DEFAULT_BLOCK_OPERATIONS = 4096
+COMPRESSIONS = ("none", "zlib", "zstd")
+
+_HEADER = struct.Struct("<6sBB")  # magic, version, compression
+_FRAME = struct.Struct("<III")  # stored length, raw length, crc32 of the raw block
+_F64 = struct.Struct("<d")
+
+_ENTITY_CREATED, _LABEL_ADDED, _STATEMENT, _ENTITY_DELETED = 1, 2, 3, 4
+_LABEL_KINDS = ("labels", "descriptions")
+# Statement flag bits
+_BINARY_ID, _FULL_CERTAINTY, _ENTITY_OBJECT = 1, 2, 4
+# Entity flag bits
+_PROPERTY, _NUMERIC_LOCAL_ID = 1, 2
+
+def _default_compression() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+def _compressor(compression: str):
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor().compress
+    if compression == "zlib":
+        return zlib.compress
+    if compression == "none":
+        return bytes
+    raise ValueError(f"Unknown compression {compression!r}; expected one of {COMPRESSIONS}")
+
+def _decompressor(compression: str):
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Stream is zstd-compressed but the zstandard package is not installed")
+        decompressor = zstandard.ZstdDecompressor()
+        return lambda data, size: decompressor.decompress(data, max_output_size=size)
+    if compression == "zlib":
+        return lambda data, size: zlib.decompress(data)
+    return lambda data, size: data
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+class _BlockWriter:
+    """Encodes operations into a block, sharing dictionaries across the stream."""
+    def __init__(self):
+        self.buffer = bytearray()
+        self.codes: Dict[Hashable, int] = {}
+        self.last_timestamp = 0
+
+    def varint(self, value: int) -> None:
+        buffer = self.buffer
+        while value > 0x7F:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    def string(self, value: str) -> None:
+        data = value.encode("utf-8")
+        self.varint(len(data))
+        self.buffer += data
+
+    def _code(self, key: Hashable) -> bool:
+        """Writes the dictionary code of key; returns True if its definition must follow."""
+        code = self.codes.get(key)
+        if code is not None:
+            self.varint(code)
+            return False
+        code = self.codes[key] = len(self.codes)
+        self.varint(code)
+        return True
+
+    def node(self, node_id: str) -> None:
+        if self._code(("node", node_id)):
+            self.string(node_id)
+
+    def language(self, language: str) -> None:
+        if self._code(("language", language)):
+            self.string(language)
+
+    def entity(self, entity_id: EntityId) -> None:
+        if not self._code(entity_id):
+            return
+        local_id = entity_id.local_id
+        numeric = local_id.isdigit() and local_id.isascii() and str(int(local_id)) == local_id
+        flags = (_PROPERTY if entity_id.id_type == EntityType.PROPERTY else 0) | \
+                (_NUMERIC_LOCAL_ID if numeric else 0)
+        self.buffer.append(flags)
+        if numeric:
+            self.varint(int(local_id))
+        else:
+            self.string(local_id)
+        self.node(entity_id.node_id)
+
+    def timestamp(self, value) -> None:
+        micros = to_microseconds(value)
+        self.varint(_zigzag(micros - self.last_timestamp))
+        self.last_timestamp = micros
+
+    def operation(self, operation: Any) -> None:
+        buffer = self.buffer
+        if isinstance(operation, EntityCreated):
+            buffer.append(_ENTITY_CREATED)
+            self.entity(operation.entity_id)
+            self.timestamp(operation.created_at)
+        elif isinstance(operation, LabelAdded):
+            text, timestamp, node_id = operation.value
+            buffer.append(_LABEL_ADDED)
+            buffer.append(_LABEL_KINDS.index(operation.kind))
+            self.entity(operation.entity_id)
+            self.language(operation.language)
+            self.string(text)
+            self.timestamp(timestamp)
+            self.node(node_id)
+        elif isinstance(operation, EntityDeleted):
+            buffer.append(_ENTITY_DELETED)
+            self.entity(operation.entity_id)
+            self.timestamp(operation.deleted_at)
+            self.node(operation.node_id)
+        else:
+            self.statement(operation)
+
+    def statement(self, statement: Statement) -> None:
+        try:
+            id_bytes = uuid.UUID(statement.id).bytes
+            binary = str(uuid.UUID(bytes=id_bytes)) == statement.id
+        except ValueError:
+            binary = False
+        object_ = statement.object
+        if not isinstance(object_, (EntityId, str)):
+            raise TypeError(f"Cannot encode literal of type {type(object_).__name__}")
+        flags = (_BINARY_ID if binary else 0) | \
+                (_FULL_CERTAINTY if statement.certainty == 1.0 else 0) | \
+                (_ENTITY_OBJECT if isinstance(object_, EntityId) else 0)
+        self.buffer.append(_STATEMENT)
+        self.buffer.append(flags)
+        if binary:
+            self.buffer += id_bytes
+        else:
+            self.string(statement.id)
+        self.entity(statement.subject)
+        self.entity(statement.predicate)
+        if isinstance(object_, EntityId):
+            self.entity(object_)
+        else:
+            self.string(object_)
+        self.timestamp(statement.timestamp)
+        self.node(statement.node_id)
+        if statement.certainty != 1.0:
+            self.buffer += _F64.pack(statement.certainty)
+
+class _BlockReader:
+    """Decodes blocks written by _BlockWriter, keeping its dictionaries."""
+    def __init__(self):
+        self.values: List[Any] = []
+        self.last_timestamp = 0
+        self.data = b""
+        self.pos = 0
+
+    def varint(self) -> int:
+        data, pos = self.data, self.pos
+        result = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.pos = pos
+                return result
+            shift += 7
+
+    def byte(self) -> int:
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def string(self) -> str:
+        length = self.varint()
+        start = self.pos
+        self.pos += length
+        return bytes(self.data[start:self.pos]).decode("utf-8")
+
+    def _coded(self, define) -> Any:
+        code = self.varint()
+        if code < len(self.values):
+            return self.values[code]
+        if code != len(self.values):
+            raise ValueError(f"Dictionary code {code} used before it was defined")
+        self.values.append(None)  # Reserve the code; definitions may nest
+        value = self.values[code] = define()
+        return value
+
+    def node(self) -> str:
+        return self._coded(self.string)
+
+    language = node
+
+    def entity(self) -> EntityId:
+        def define() -> EntityId:
+            flags = self.byte()
+            local_id = str(self.varint()) if flags & _NUMERIC_LOCAL_ID else self.string()
+            id_type = EntityType.PROPERTY if flags & _PROPERTY else EntityType.STANDARD
+            return EntityId(id_type=id_type, local_id=local_id, node_id=self.node())
+        return self._coded(define)
+
+    def timestamp(self):
+        self.last_timestamp += _unzigzag(self.varint())
+        return from_microseconds(self.last_timestamp)
+
+    def operation(self) -> Any:
+        kind = self.byte()
+        if kind == _ENTITY_CREATED:
+            return EntityCreated(self.entity(), self.timestamp())
+        if kind == _LABEL_ADDED:
+            label_kind = _LABEL_KINDS[self.byte()]
+            entity_id, language, text = self.entity(), self.language(), self.string()
+            return LabelAdded(entity_id, language, (text, self.timestamp(), self.node()), label_kind)
+        if kind == _ENTITY_DELETED:
+            return EntityDeleted(self.entity(), self.timestamp(), self.node())
+        if kind == _STATEMENT:
+            return self.statement()
+        raise ValueError(f"Unknown operation kind {kind}")
+
+    def statement(self) -> Statement:
+        flags = self.byte()
+        if flags & _BINARY_ID:
+            statement_id = str(uuid.UUID(bytes=bytes(self.data[self.pos:self.pos + 16])))
+            self.pos += 16
+        else:
+            statement_id = self.string()
+        subject, predicate = self.entity(), self.entity()
+        object_ = self.entity() if flags & _ENTITY_OBJECT else self.string()
+        timestamp, node_id = self.timestamp(), self.node()
+        certainty = 1.0
+        if not flags & _FULL_CERTAINTY:
+            certainty = _F64.unpack_from(self.data, self.pos)[0]
+            self.pos += 8
+        return Statement(id=statement_id, subject=subject, predicate=predicate, object=object_,
+                         timestamp=timestamp, node_id=node_id, certainty=certainty)
+
+class WireWriter:
+    """
+    Writes operations to a binary stream in the wire format, one block per
+    run of at most block_operations operations from a single node.
+    Call close() (or use it as a context manager) to write the end block;
+    the underlying stream is left open.
+    """
+    def __init__(self, stream: BinaryIO, compression: Optional[str] = None,
+                 block_operations: int = DEFAULT_BLOCK_OPERATIONS):
+        self.stream = stream
+        self.compression = compression or _default_compression()
+        self._compress = _compressor(self.compression)
+        self.block_operations = block_operations
+        self._encoder = _BlockWriter()
+        self.bytes_written = _HEADER.size
+        stream.write(_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, COMPRESSIONS.index(self.compression)))
+
+    def write_operations(self, node: str, first: int, operations: Iterator[Any]) -> None:
+        """Writes a contiguous run of a node's log starting at sequence number `first`."""
+        block: List[Any] = []
+        for operation in operations:
+            block.append(operation)
+            if len(block) >= self.block_operations:
+                self._write_block(node, first, block)
+                first += len(block)
+                block = []
+        if block:
+            self._write_block(node, first, block)
+
+    def write_delta(self, delta: Delta) -> None:
+        """Writes every run of a Delta."""
+        for node, (first, operations) in delta.operations.items():
+            self.write_operations(node, first, iter(operations))
+
+    def _write_block(self, node: str, first: int, operations: List[Any]) -> None:
+        encoder = self._encoder
+        encoder.buffer = bytearray()
+        encoder.node(node)
+        encoder.varint(first)
+        encoder.varint(len(operations))
+        for operation in operations:
+            encoder.operation(operation)
+        raw = bytes(encoder.buffer)
+        stored = self._compress(raw)
+        frame = _FRAME.pack(len(stored), len(raw), zlib.crc32(raw))
+        self.stream.write(frame)
+        self.stream.write(stored)
+        self.bytes_written += len(frame) + len(stored)
+
+    def close(self) -> None:
+        """Writes the end block."""
+        self.stream.write(_FRAME.pack(0, 0, 0))
+        self.bytes_written += _FRAME.size
+
+    def __enter__(self) -> 'WireWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+
+def read_deltas(stream: BinaryIO) -> Iterator[Delta]:
+    """
+    Decodes a wire stream block by block, yielding each as a single-node
+    Delta. Raises ValueError on a bad header, a corrupt block or a stream
+    that ends without its end block.
+    """
+    header = stream.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise ValueError("Not a wire stream: header is truncated")
+    magic, version, compression = _HEADER.unpack(header)
+    if magic != WIRE_MAGIC:
+        raise ValueError("Not a wire stream: bad magic")
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire format version {version}")
+    if compression >= len(COMPRESSIONS):
+        raise ValueError(f"Unknown compression code {compression}")
+    decompress = _decompressor(COMPRESSIONS[compression])
+    decoder = _BlockReader()
+    while True:
+        frame = stream.read(_FRAME.size)
+        if len(frame) != _FRAME.size:
+            raise ValueError("Wire stream ended without an end block")
+        stored_length, raw_length, checksum = _FRAME.unpack(frame)
+        if stored_length == 0:
+            return
+        stored = stream.read(stored_length)
+        if len(stored) != stored_length:
+            raise ValueError("Wire stream ended inside a block")
+        raw = decompress(stored, raw_length)
+        if len(raw) != raw_length or zlib.crc32(raw) != checksum:
+            raise ValueError("Corrupt block in wire stream")
+        decoder.data, decoder.pos = raw, 0
+        node, first, count = decoder.node(), decoder.varint(), decoder.varint()
+        yield Delta({node: (first, [decoder.operation() for _ in range(count)])})
+
+def write_graph(graph: GraphLayer, stream: BinaryIO, since: Optional[Dict[str, int]] = None,
+                compression: Optional[str] = None,
+                block_operations: int = DEFAULT_BLOCK_OPERATIONS) -> int:
+    """
+    Streams the operations a peer at version vector `since` is missing (the
+    whole graph by default) and returns the number of bytes written.
+    Compression defaults to zstd when available and zlib otherwise.
+    """
+    since = since or {}
+    with WireWriter(stream, compression, block_operations) as writer:
+        for node, entries in graph._op_log.items():
+            seen = since.get(node, 0)
+            if seen < len(entries):
+                writer.write_operations(node, seen + 1, graph._operations_from(node, seen))
+    return writer.bytes_written
+
+def read_into(graph: GraphLayer, stream: BinaryIO) -> int:
+    """Applies a wire stream to a graph block by block; returns the new operations applied."""
+    return sum(graph.apply_delta(delta) for delta in read_deltas(stream))
+
+def read_graph(stream: BinaryIO, node_id: str, compact: bool = False) -> GraphLayer:
+    """Builds a new replica from a wire stream."""
+    graph = GraphLayer(node_id=node_id, compact=compact)
+    read_into(graph, stream)
+    return graph
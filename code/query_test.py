@@ -126,6 +126,22 @@ class TestGraphQuery(unittest.TestCase):
         self.assertEqual(result_labels, {"Document 1", "Document 2"})
         print("✓ Test passed: Successfully filtered and found all documents")
 
+    def test_return_statements(self):
+        """Tests returning the statements about the matched entities."""
+        print("\n=== Testing Statement Results ===")
+        print("Retrieving all statements about Document 1...")
+        
+        result = self.graph.query()\
+            .starting_from(self.doc1.id)\
+            .return_statements()\
+            .execute()
+        
+        print(f"Query returned {len(result.results)} statements")
+        
+        self.assertEqual(len(result.results), 3)
+        self.assertTrue(all(s.subject == self.doc1.id for s in result.results))
+        print("✓ Test passed: Retrieved every statement about the document")
+
     def test_query_metadata(self):
         """Tests that query results include proper metadata."""
         print("\n=== Testing Query Metadata ===")
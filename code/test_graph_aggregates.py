@@ -0,0 +1,79 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_aggregates import Aggregate, count, count_distinct, minimum, maximum, average
+from graph_query_planner import QueryPlanner
+
+class TestAggregates(unittest.TestCase):
+    def build(self, compact: bool = False) -> GraphLayer:
+        """Creates documents tagged with topics, each with a scored statement."""
+        graph = GraphLayer(node_id="test_node", compact=compact)
+        self.tag = graph.create_entity(EntityType.PROPERTY)
+        self.score = graph.create_entity(EntityType.PROPERTY)
+        self.topics = [graph.create_entity() for _ in range(3)]
+        self.docs = [graph.create_entity() for _ in range(9)]
+        for i, doc in enumerate(self.docs):
+            graph.add_statement(doc.id, self.tag.id, self.topics[i % 3].id)
+            graph.add_statement(doc.id, self.score.id, f"score {i % 4}", certainty=0.1 * (i + 1))
+        graph.add_statement(self.docs[0].id, self.tag.id, self.topics[1].id)
+        return graph
+
+    def query(self, graph: GraphLayer):
+        return graph.query().starting_from([d.id for d in self.docs])
+
+    def check(self, graph: GraphLayer):
+        self.assertEqual(self.query(graph).count(), 9)
+        self.assertEqual(self.query(graph).return_statements().count(), 19)
+        self.assertEqual(self.query(graph).limit(2).count(), 9)
+
+        by_topic = self.query(graph).group_by(self.tag.id).aggregate(docs=count())
+        self.assertEqual(by_topic.total_matches, 9)
+        self.assertEqual({topic: values["docs"] for topic, values in by_topic.groups.items()},
+                         {self.topics[0].id: 3, self.topics[1].id: 4, self.topics[2].id: 3})
+
+        result = self.query(graph).aggregate(
+            certainty=average("certainty", self.score.id),
+            first=minimum("timestamp", self.score.id),
+            last=maximum("timestamp", self.score.id),
+            scores=count_distinct("object", self.score.id),
+            scored=count(self.score.id))
+        self.assertAlmostEqual(result["certainty"], 0.5)
+        stamps = [s.timestamp for s in graph.find_statements(predicate=self.score.id)]
+        self.assertEqual(result["first"], min(stamps))
+        self.assertEqual(result["last"], max(stamps))
+        self.assertEqual(result["scores"], 4)
+        self.assertEqual(result["scored"], 9)
+
+        statements_by_topic = self.query(graph).return_statements().group_by(self.tag.id)\
+            .aggregate(n=count(), scored=count(self.score.id))
+        self.assertEqual({topic: values["n"] for topic, values in statements_by_topic.groups.items()},
+                         {self.topics[0].id: 7, self.topics[1].id: 9, self.topics[2].id: 6})
+        self.assertEqual(statements_by_topic.groups[self.topics[1].id]["scored"], 4)
+
+        by_predicate = self.query(graph).group_by("predicate").aggregate(n=count(), high=maximum("certainty"))
+        self.assertEqual(by_predicate.groups[self.tag.id]["n"], 10)
+        self.assertAlmostEqual(by_predicate.groups[self.score.id]["high"], 0.9)
+
+    def test_aggregates(self):
+        """Tests counts, grouping and rollups over certainties and timestamps."""
+        self.check(self.build())
+
+    def test_compact_backend(self):
+        """Tests that aggregates read from compact columns give the same values."""
+        self.check(self.build(compact=True))
+
+    def test_plan_and_validation(self):
+        """Tests that the plan aggregates in place of materializing, and bad specs are rejected."""
+        graph = self.build()
+        plan = QueryPlanner(graph).plan_aggregate(self.query(graph).group_by(self.tag.id), {"n": count()})
+        self.assertEqual([step.operator for step in plan.steps], ["StartLookup", "Filter", "Aggregate"])
+        with self.assertRaises(ValueError):
+            average("object")
+        with self.assertRaises(ValueError):
+            Aggregate("median", "certainty")
+        with self.assertRaises(ValueError):
+            self.query(graph).group_by("certainty")
+        with self.assertRaises(ValueError):
+            self.query(graph).return_paths().count()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_async import AsyncGraph, split_delta
+
+class TestAsyncGraph(unittest.TestCase):
+    def setUp(self):
+        """Creates a source replica that tags documents one after another."""
+        self.source = GraphLayer(node_id="source")
+        self.tag_prop = self.source.create_entity(EntityType.PROPERTY)
+        self.tag = self.source.create_entity()
+        self.docs = []
+        for _ in range(40):
+            doc = self.source.create_entity()
+            self.source.add_statement(doc.id, self.tag_prop.id, self.tag.id)
+            self.docs.append(doc)
+        self.replica = AsyncGraph(GraphLayer(node_id="replica"), sync_batch=3)
+
+    def tearDown(self):
+        self.replica.close()
+
+    def tagged(self, result) -> list:
+        return [doc.id for doc in self.docs if doc.id in {s.subject for s in result.results}]
+
+    def test_split_delta(self):
+        """Tests that split deltas cover every operation in log order."""
+        delta = self.source.delta_since({})
+        pieces = split_delta(delta, 7)
+        self.assertEqual(sum(len(piece) for piece in pieces), len(delta))
+        self.assertEqual([piece.operations["source"][0] for piece in pieces[:3]], [1, 8, 15])
+
+    def test_concurrent_queries_during_sync(self):
+        """Tests that queries interleave with a batched sync and each sees a consistent prefix."""
+        async def reader(delay: int):
+            for _ in range(delay):
+                await asyncio.sleep(0)
+            query = self.replica.query()\
+                .starting_from([d.id for d in self.docs])\
+                .return_statements()
+            return self.tagged(await query.execute_async())
+
+        async def scenario():
+            readers = [asyncio.create_task(reader(i % 30)) for i in range(1000)]
+            applied = await self.replica.sync_from(self.source)
+            return applied, await asyncio.gather(*readers)
+
+        applied, seen = asyncio.run(scenario())
+        self.assertEqual(applied, len(self.source.delta_since({})))
+        self.assertGreater(len({len(ids) for ids in seen}), 2)
+        for ids in seen:
+            self.assertEqual(ids, [d.id for d in self.docs[:len(ids)]])
+
+    def test_snapshot_reads(self):
+        """Tests that snapshot reads keep their version while the live graph moves on."""
+        async def scenario():
+            await self.replica.merge(self.source)
+            query = self.replica.query().starting_from([d.id for d in self.docs]).return_statements()
+            before = await self.replica.execute(query, on_snapshot=True)
+            snapshot = self.replica.snapshot()
+
+            self.replica.graph.add_statement(self.docs[0].id, self.tag_prop.id, "extra")
+            live = await self.replica.execute(query)
+            after = await self.replica.execute(query, on_snapshot=True)
+            return before, snapshot, live, after
+
+        before, snapshot, live, after = asyncio.run(scenario())
+        self.assertEqual(len(before.results), 40)
+        self.assertEqual(len(live.results), 41)
+        self.assertEqual(len(after.results), 41)
+        self.assertEqual(len(list(snapshot.find_statements(subject=self.docs[0].id))), 1)
+        self.assertEqual(self.replica._base_count, 1)
+
+    def test_rebase(self):
+        """Tests that a long log tail is folded into a new base off the event loop."""
+        self.replica.rebase_after = 10
+        async def scenario():
+            await self.replica.merge(self.source)
+            query = self.replica.query().starting_from([d.id for d in self.docs]).return_statements()
+            before = await self.replica.execute(query, on_snapshot=True)
+            await self.replica._rebase
+            self.replica.graph.add_statement(self.docs[0].id, self.tag_prop.id, "extra")
+            after = await self.replica.execute(query, on_snapshot=True)
+            return before, after
+
+        before, after = asyncio.run(scenario())
+        self.assertEqual(len(before.results), 40)
+        self.assertEqual(len(after.results), 41)
+        self.assertEqual(self.replica._base_version, self.source.version_vector())
+        self.assertEqual(os.listdir(self.replica._directory), ["base-2.ygs"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from graph_layer_core import GraphLayer, EntityType
+from graph_query_system import CREATED_AT
+from graph_query_planner import Filter
+import graph_filters
+from graph_filters import has, certainty, label_matches, created_between, Has, LabelMatches
+
+class TestFilterExpressions(unittest.TestCase):
+    def build(self, compact: bool) -> GraphLayer:
+        """Creates documents with statuses, reviewed with varying certainty."""
+        graph = GraphLayer(node_id="test_node", compact=compact)
+        self.status = graph.create_entity(EntityType.PROPERTY)
+        self.reviewed = graph.create_entity(EntityType.PROPERTY)
+        self.docs = []
+        base = datetime(2024, 1, 1)
+        for i in range(10):
+            doc = graph.create_entity()
+            doc.created_at = base + timedelta(days=i)
+            graph.add_label(doc.id, f"{'Report' if i % 2 else 'Memo'} {i}")
+            graph.add_statement(doc.id, self.status.id, "draft" if i < 7 else "final")
+            if i % 3 == 0:
+                graph.add_statement(doc.id, self.reviewed.id, "yes", certainty=i / 10)
+            self.docs.append(doc)
+        return graph
+
+    def matching(self, graph: GraphLayer, expression) -> set:
+        result = graph.query().starting_from([d.id for d in self.docs]).filter(expression).execute()
+        return {int(graph.get_latest_label(e.id).split()[1]) for e in result.results}
+
+    def test_expressions_on_both_backends(self):
+        """Tests each expression kind against the regular and compact backends."""
+        for compact in (False, True):
+            graph = self.build(compact)
+            self.assertEqual(self.matching(graph, has(self.status.id, "final")), {7, 8, 9})
+            self.assertEqual(self.matching(graph, has(self.reviewed.id)), {0, 3, 6, 9})
+            self.assertEqual(self.matching(graph, certainty(self.reviewed.id) >= 0.6), {6, 9})
+            self.assertEqual(self.matching(graph, certainty(self.reviewed.id) > 0.6), {9})
+            self.assertEqual(self.matching(graph, certainty(self.reviewed.id) < 0.3), {0})
+            self.assertEqual(self.matching(graph, label_matches(r"^Report")), {1, 3, 5, 7, 9})
+            self.assertEqual(self.matching(graph, has(self.status.id, "final") | ~has(self.reviewed.id)),
+                             {1, 2, 4, 5, 7, 8, 9})
+            self.assertEqual(self.matching(graph, label_matches("Memo") & has(self.reviewed.id)), {0, 6})
+
+    def test_created_between(self):
+        """Tests the creation-time filter with and without the sorted index."""
+        graph = self.build(compact=False)
+        window = created_between(datetime(2024, 1, 3), datetime(2024, 1, 6))
+        self.assertEqual(self.matching(graph, window), {2, 3, 4})
+        self.assertIsNone(graph.sorted_index(CREATED_AT, build=False))
+        graph.sorted_index(CREATED_AT)
+        self.assertLess(window.selectivity(graph), 0.5)
+        self.assertEqual(self.matching(graph, window), {2, 3, 4})
+
+    def test_has_scans_small_inputs(self):
+        """Tests that has() checks entities one by one when the index holds more statements."""
+        graph = self.build(compact=False)
+        for i in range(20):
+            graph.add_statement(self.docs[0].id, self.reviewed.id, f"note {i}")
+        expression = has(self.reviewed.id)
+        few = {d.id for d in self.docs[:6]}
+        with mock.patch.object(graph_filters, "_subjects_with", wraps=graph_filters._subjects_with) as index:
+            self.assertEqual(expression.evaluate(graph, few), {self.docs[0].id, self.docs[3].id})
+            index.assert_not_called()
+            everything = {d.id for d in self.docs} | {graph.create_entity().id for _ in range(20)}
+            self.assertEqual(len(expression.evaluate(graph, everything)), 4)
+            index.assert_called_once()
+
+    def test_reordered_by_selectivity(self):
+        """Tests that expressions run most selective first, ahead of callables."""
+        graph = self.build(compact=False)
+        opaque = lambda e: True
+        query = graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .filter(opaque)\
+            .filter(label_matches("o"))\
+            .filter(has(self.status.id, "final"))
+        step = next(s for s in query.plan().steps if isinstance(s, Filter))
+        self.assertIsInstance(step.filters[0], Has)
+        self.assertIsInstance(step.filters[1], LabelMatches)
+        self.assertIs(step.filters[2], opaque)
+        self.assertAlmostEqual(step.estimated_rows, 10 * (3 / 12) * 0.5 * 0.5)
+        self.assertIn("has(", str(query.explain()))
+
+    def test_cache_and_views_track_filter_predicates(self):
+        """Tests that statements on filtered predicates refresh caches and views."""
+        graph = self.build(compact=False)
+        graph.enable_query_cache()
+        query = lambda: graph.query().starting_from([d.id for d in self.docs]).filter(has(self.status.id, "final"))
+        view = graph.register_view("final", query())
+        self.assertEqual(len(query().execute().results), 3)
+        self.assertEqual(query().execute().cache_hits, 1)
+
+        graph.add_statement(self.docs[0].id, self.status.id, "final")
+        self.assertEqual(len(query().execute().results), 4)
+        self.assertEqual(len(view), 4)
+
+if __name__ == '__main__':
+    unittest.main()
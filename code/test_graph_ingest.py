@@ -0,0 +1,67 @@
+import io
+import json
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_ingest import read_ntriples, read_jsonl, load_ntriples, load_jsonl, RawTriple
+
+NTRIPLES = '''# documents
+<http://ex.org/doc1> <http://ex.org/tagged> <http://ex.org/alpha> .
+<http://ex.org/doc1> <http://ex.org/name> "Project \\"Alpha\\" Proposal"@en .
+<http://ex.org/doc2> <http://ex.org/tagged> <http://ex.org/alpha> .
+_:b1 <http://ex.org/name> "caf\\u00e9"^^<http://www.w3.org/2001/XMLSchema#string> .
+
+'''
+
+class TestGraphIngest(unittest.TestCase):
+    def setUp(self):
+        self.graph = GraphLayer(node_id="test_node")
+
+    def test_read_ntriples(self):
+        """Tests parsing IRIs, blank nodes, escapes, language tags and datatypes."""
+        triples = list(read_ntriples(io.StringIO(NTRIPLES)))
+        self.assertEqual(len(triples), 4)
+        self.assertEqual(triples[0], RawTriple("http://ex.org/doc1", "http://ex.org/tagged",
+                                               "http://ex.org/alpha", True))
+        self.assertEqual(triples[1].object, 'Project "Alpha" Proposal')
+        self.assertFalse(triples[1].object_is_entity)
+        self.assertEqual(triples[3].subject, "_:b1")
+        self.assertEqual(triples[3].object, "café")
+
+        with self.assertRaises(ValueError):
+            list(read_ntriples(["<a> <b> missing-dot"]))
+
+    def test_load_ntriples(self):
+        """Tests that keys become shared entities and predicates become properties."""
+        id_map = {}
+        added = load_ntriples(self.graph, io.StringIO(NTRIPLES), batch_size=2, id_map=id_map)
+
+        self.assertEqual(added, 4)
+        self.assertEqual(len(id_map), 6)
+        self.assertEqual(id_map["http://ex.org/tagged"].id_type, EntityType.PROPERTY)
+        result = self.graph.query()\
+            .starting_from([id_map["http://ex.org/doc1"], id_map["http://ex.org/doc2"]])\
+            .follow(id_map["http://ex.org/tagged"])\
+            .execute()
+        self.assertEqual([e.id for e in result.results], [id_map["http://ex.org/alpha"]])
+
+    def test_load_jsonl(self):
+        """Tests loading JSON Lines triples with certainties, reusing an id map."""
+        id_map = {}
+        load_ntriples(self.graph, io.StringIO(NTRIPLES), id_map=id_map)
+        lines = "\n".join(json.dumps(record) for record in [
+            {"subject": "http://ex.org/doc2", "predicate": "http://ex.org/name", "object": "Notes"},
+            {"subject": "http://ex.org/doc2", "predicate": "http://ex.org/cites",
+             "object_id": "http://ex.org/doc1", "certainty": 0.4},
+        ])
+        self.assertEqual(load_jsonl(self.graph, io.StringIO(lines), id_map=id_map), 2)
+
+        cites = list(self.graph.find_statements(predicate=id_map["http://ex.org/cites"]))
+        self.assertEqual(cites[0].object, id_map["http://ex.org/doc1"])
+        self.assertEqual(cites[0].certainty, 0.4)
+        self.assertEqual(len(id_map), 7)
+
+        with self.assertRaises(ValueError):
+            list(read_jsonl(['{"subject": "a", "predicate": "b"}']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_instrumentation import Tracer, CallbackTracer, NO_OP_SPAN
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        """Creates a small tagged graph."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.tag = self.graph.create_entity(EntityType.PROPERTY)
+        self.topic = self.graph.create_entity()
+        self.docs = [self.graph.create_entity() for _ in range(5)]
+        for doc in self.docs:
+            self.graph.add_statement(doc.id, self.tag.id, self.topic.id)
+
+    def query(self):
+        return self.graph.query().starting_from([d.id for d in self.docs]).follow(self.tag.id)
+
+    def test_stage_statistics(self):
+        """Tests that results report per-stage rows and timings plus scan counters."""
+        result = self.query().execute()
+        self.assertEqual([stage.operator for stage in result.stages],
+                         ["StartLookup", "ExpandForward", "Filter", "Materialize"])
+        self.assertEqual([stage.rows for stage in result.stages], [5, 1, 1, 1])
+        self.assertTrue(all(stage.elapsed_ms >= 0 for stage in result.stages))
+        self.assertEqual(result.index_hits, 5)
+        self.assertEqual(result.statements_scanned, 5)
+
+        statements = self.graph.query().starting_from(self.docs[0].id).return_statements().execute()
+        self.assertEqual(statements.statements_scanned, 1)
+        self.assertIn("time=", str(self.query().explain()))
+
+    def test_default_tracer_is_a_no_op(self):
+        """Tests that the base tracer hands out the shared no-op span."""
+        self.assertIs(Tracer().start_span("anything"), NO_OP_SPAN)
+        self.graph.set_tracer(Tracer())
+        self.assertEqual(len(self.query().execute().results), 1)
+
+    def test_callback_spans(self):
+        """Tests that query execution, statement writes and merges are traced."""
+        started, ended = [], []
+        self.graph.set_tracer(CallbackTracer(
+            on_start=lambda name, attributes: started.append(name),
+            on_end=lambda name, attributes, elapsed: ended.append((name, dict(attributes), elapsed))
+        ))
+        self.query().execute()
+        self.graph.add_statement(self.topic.id, self.tag.id, "literal")
+        other = GraphLayer(node_id="other")
+        other.add_statement(other.create_entity().id, self.tag.id, "remote")
+        self.graph.merge(other)
+
+        self.assertEqual(started, ["graph.query.execute", "graph.add_statement", "graph.merge"])
+        names = [name for name, _, _ in ended]
+        self.assertEqual(names, started)
+        self.assertEqual(ended[0][1]["total_matches"], 1)
+        self.assertEqual(ended[2][1]["statements_added"], 1)
+
+        self.graph.set_tracer(None)
+        self.query().execute()
+        self.assertEqual(len(started), 3)
+
+    def test_slow_query_log(self):
+        """Tests that only queries over the threshold are recorded, with their plans."""
+        log = self.graph.enable_slow_query_log(threshold_ms=0)
+        reported = []
+        log.callback = reported.append
+        self.query().execute()
+        self.assertEqual(len(log), 1)
+        self.assertIn("ExpandForward", log.entries[0].plan)
+        self.assertEqual(reported, list(log.entries))
+
+        log.threshold_ms = float("inf")
+        self.query().execute()
+        self.assertEqual(len(log), 1)
+        self.graph.disable_slow_query_log()
+        self.assertIsNone(self.graph.slow_query_log)
+
+if __name__ == '__main__':
+    unittest.main()
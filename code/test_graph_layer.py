@@ -1,6 +1,6 @@
 import unittest
 from datetime import datetime
-from graph_layer_core import GraphLayer, EntityType, EntityId, Entity, Statement
+from graph_layer_core import GraphLayer, EntityType, EntityId, Entity, Statement, StatementBatch, Delta
 
 class TestGraphLayer(unittest.TestCase):
     def setUp(self):
@@ -96,6 +96,222 @@ class TestGraphLayer(unittest.TestCase):
         self.assertEqual(self.graph.get_latest_label(entity1.id), "Entity 1")
         self.assertEqual(self.graph.get_latest_label(entity2.id), "Entity 2")
 
+    def test_statement_indexes(self):
+        """Tests that statements are reachable through every index."""
+        doc = self.graph.create_entity()
+        tag = self.graph.create_entity()
+        tag_prop = self.graph.create_entity(EntityType.PROPERTY)
+        name_prop = self.graph.create_entity(EntityType.PROPERTY)
+        
+        tagged = self.graph.add_statement(doc.id, tag_prop.id, tag.id)
+        named = self.graph.add_statement(doc.id, name_prop.id, "Report")
+        
+        self.assertEqual(set(self.graph.find_statements(subject=doc.id)), {tagged, named})
+        self.assertEqual(list(self.graph.find_statements(doc.id, tag_prop.id)), [tagged])
+        self.assertEqual(list(self.graph.find_statements(predicate=tag_prop.id, object_=tag.id)), [tagged])
+        self.assertEqual(list(self.graph.find_statements(object_="Report")), [named])
+        self.assertEqual(list(self.graph.find_statements(subject=doc.id, object_=tag.id)), [tagged])
+        self.assertEqual(list(self.graph.find_statements(doc.id, name_prop.id, "Other")), [])
+        self.assertEqual(set(self.graph.find_statements()), self.graph.statements)
+
+    def test_merge_updates_indexes(self):
+        """Tests that merged statements are indexed exactly once."""
+        other_graph = GraphLayer(node_id="other_node")
+        doc = other_graph.create_entity()
+        tag_prop = other_graph.create_entity(EntityType.PROPERTY)
+        statement = other_graph.add_statement(doc.id, tag_prop.id, "alpha")
+        
+        self.graph.merge(other_graph)
+        self.graph.merge(other_graph)
+        
+        self.assertEqual(list(self.graph.find_statements(subject=doc.id)), [statement])
+        self.assertEqual(list(self.graph.find_statements(predicate=tag_prop.id)), [statement])
+
+    def test_merge_copies_entities(self):
+        """Tests that merged entities do not share label sets with the source graph."""
+        other_graph = GraphLayer(node_id="other_node")
+        entity = other_graph.create_entity()
+        other_graph.add_label(entity.id, "Original")
+        
+        self.graph.merge(other_graph)
+        self.graph.add_label(entity.id, "Renamed")
+        
+        self.assertEqual(other_graph.get_latest_label(entity.id), "Original")
+        self.assertEqual(len(other_graph.entities[entity.id].labels["en"]), 1)
+
+    def test_version_vector(self):
+        """Tests that every local operation advances this node's version."""
+        prop = self.graph.create_entity(EntityType.PROPERTY)
+        entity = self.graph.create_entity()
+        self.graph.add_label(entity.id, "Counted")
+        self.graph.add_statement(entity.id, prop.id, "value")
+        
+        self.assertEqual(self.graph.version_vector(), {"test_node": 4})
+
+    def test_delta_contains_only_missing_operations(self):
+        """Tests that a delta holds just what the peer has not seen."""
+        prop = self.graph.create_entity(EntityType.PROPERTY)
+        entity = self.graph.create_entity()
+        replica = GraphLayer(node_id="replica")
+        replica.sync_from(self.graph)
+        
+        for i in range(5):
+            self.graph.add_statement(entity.id, prop.id, f"value {i}")
+        self.graph.add_label(entity.id, "Late label")
+        
+        delta = self.graph.delta_since(replica.version_vector())
+        self.assertEqual(len(delta), 6)
+        self.assertEqual(delta.version_vector(), {"test_node": 8})
+        
+        self.assertEqual(replica.apply_delta(delta), 6)
+        self.assertEqual(replica.apply_delta(delta), 0)
+        self.assertEqual(set(replica.statements), set(self.graph.statements))
+        self.assertEqual(replica.get_latest_label(entity.id), "Late label")
+        self.assertEqual(replica.version_vector(), self.graph.version_vector())
+
+    def test_two_way_delta_sync(self):
+        """Tests that replicas exchanging deltas converge, including relayed operations."""
+        prop = self.graph.create_entity(EntityType.PROPERTY)
+        second = GraphLayer(node_id="second")
+        third = GraphLayer(node_id="third")
+        
+        second.sync_from(self.graph)
+        thing = second.create_entity()
+        second.add_statement(thing.id, prop.id, "from second")
+        third.create_entity()
+        
+        self.graph.sync_from(second)
+        third.sync_from(self.graph)
+        second.sync_from(third)
+        self.graph.sync_from(second)
+        
+        for graph in (self.graph, second):
+            self.assertEqual(set(graph.statements), set(third.statements))
+            self.assertEqual(graph.entities.keys(), third.entities.keys())
+            self.assertEqual(graph.version_vector(), third.version_vector())
+
+    def test_delta_with_gap_is_rejected(self):
+        """Tests that a delta skipping operations the replica never saw is refused."""
+        self.graph.create_entity()
+        self.graph.create_entity()
+        replica = GraphLayer(node_id="replica")
+        
+        with self.assertRaises(ValueError):
+            replica.apply_delta(self.graph.delta_since({"test_node": 1}))
+        self.assertEqual(replica.apply_delta(Delta()), 0)
+
+    def test_merge_keeps_version_vectors(self):
+        """Tests that a full merge also brings the operation logs up to date."""
+        other_graph = GraphLayer(node_id="other_node", compact=True)
+        prop = other_graph.create_entity(EntityType.PROPERTY)
+        entity = other_graph.create_entity()
+        other_graph.add_statement(entity.id, prop.id, "merged")
+        
+        self.graph.merge(other_graph)
+        self.assertEqual(self.graph.version_vector(), {"other_node": 3})
+        
+        other_graph.add_statement(entity.id, prop.id, "after merge")
+        self.assertEqual(len(other_graph.delta_since(self.graph.version_vector())), 1)
+
+    def test_bulk_create_entities(self):
+        """Tests creating labelled entities in one call."""
+        entities = self.graph.bulk_create_entities(3, labels=["a", "b", "c"])
+        
+        self.assertEqual(len({e.id for e in entities}), 3)
+        self.assertEqual(len({e.created_at for e in entities}), 1)
+        self.assertEqual([self.graph.get_latest_label(e.id) for e in entities], ["a", "b", "c"])
+        self.assertEqual(self.graph.create_entity().id.local_id, "4")
+        self.assertEqual(self.graph.version_vector(), {"test_node": 7})
+
+    def test_bulk_add_statements(self):
+        """Tests bulk ingestion from tuples and columnar batches on both backends."""
+        for compact in (False, True):
+            graph = GraphLayer(node_id="bulk", compact=compact)
+            prop = graph.create_entity(EntityType.PROPERTY)
+            docs = graph.bulk_create_entities(4)
+            
+            added = graph.bulk_add_statements((d.id, prop.id, f"doc {i}") for i, d in enumerate(docs))
+            added += graph.bulk_add_statements(StatementBatch(
+                subjects=[docs[0].id, docs[1].id],
+                predicates=[prop.id, prop.id],
+                objects=[docs[2].id, docs[3].id],
+                certainties=[0.5, 0.75]
+            ))
+            
+            self.assertEqual(added, 6)
+            self.assertEqual(len(graph.statements), 6)
+            self.assertEqual(len({s.id for s in graph.statements}), 6)
+            self.assertEqual(len({s.timestamp for s in graph.find_statements(predicate=prop.id)}), 2)
+            linked = next(iter(graph.find_statements(docs[1].id, prop.id, docs[3].id)))
+            self.assertEqual(linked.certainty, 0.75)
+            self.assertEqual(graph.predicate_stats(prop.id).statement_count, 6)
+            
+            replica = GraphLayer(node_id="replica")
+            replica.sync_from(graph)
+            self.assertEqual(set(replica.statements), set(graph.statements))
+
+    def test_bulk_add_validates_predicates(self):
+        """Tests that bulk ingestion rejects non-property predicates."""
+        entity = self.graph.create_entity()
+        with self.assertRaises(ValueError):
+            self.graph.bulk_add_statements([(entity.id, entity.id, "x")])
+        self.assertEqual(len(self.graph.statements), 0)
+
+    def test_label_winner_tie_break(self):
+        """Tests that concurrent labels with equal timestamps resolve the same way everywhere."""
+        entity = self.graph.create_entity()
+        other = GraphLayer(node_id="other_node")
+        other.sync_from(self.graph)
+        
+        timestamp = datetime(2024, 1, 1)
+        self.graph._add_label_value(self.graph.entities[entity.id], "labels", "en", ("Mine", timestamp, "test_node"))
+        other._add_label_value(other.entities[entity.id], "labels", "en", ("Theirs", timestamp, "other_node"))
+        self.assertEqual(self.graph.get_latest_label(entity.id), "Mine")
+        
+        self.graph.merge(other)
+        other.merge(self.graph)
+        self.assertEqual(self.graph.get_latest_label(entity.id), "Mine")
+        self.assertEqual(other.get_latest_label(entity.id), "Mine")
+        
+        self.graph.add_label(entity.id, "Newest")
+        self.assertEqual(self.graph.get_latest_label(entity.id), "Newest")
+
+    def test_descriptions(self):
+        """Tests adding descriptions and syncing them to another replica."""
+        entity = self.graph.create_entity()
+        self.graph.add_description(entity.id, "First draft")
+        self.graph.add_description(entity.id, "Beschreibung", language="de")
+        self.graph.add_description(entity.id, "Final text")
+        
+        replica = GraphLayer(node_id="replica")
+        replica.sync_from(self.graph)
+        self.assertEqual(replica.get_latest_description(entity.id), "Final text")
+        self.assertEqual(replica.get_latest_description(entity.id, "de"), "Beschreibung")
+        self.assertIsNone(replica.get_latest_label(entity.id))
+
+    def test_label_compaction(self):
+        """Tests that superseded labels are pruned only once every known replica saw the winner."""
+        entity = self.graph.create_entity()
+        for i in range(5):
+            self.graph.add_label(entity.id, f"Version {i}")
+        replica = GraphLayer(node_id="replica")
+        replica.sync_from(self.graph)
+        self.graph.observe_peer("replica", {})
+        
+        self.assertEqual(self.graph.compact_labels(), 0)
+        self.graph.sync_from(replica)
+        self.assertEqual(self.graph.compact_labels(), 4)
+        self.assertEqual(self.graph.entities[entity.id].labels["en"], {self.graph.entities[entity.id].latest()})
+        self.assertEqual(self.graph.get_latest_label(entity.id), "Version 4")
+        
+        self.graph.add_label(entity.id, "Version 5")
+        self.assertEqual(self.graph.compact_labels(), 0)
+        
+        late = GraphLayer(node_id="late")
+        late.sync_from(self.graph)
+        self.assertEqual(late.get_latest_label(entity.id), "Version 5")
+        self.assertEqual(len(late.entities[entity.id].labels["en"]), 6)
+
     def test_real_world_scenario(self):
         """Tests a realistic usage scenario."""
         # Create property types we'll need
@@ -0,0 +1,77 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_filters import has
+from graph_parallel import ParallelExecutor
+
+class TestParallelExecutor(unittest.TestCase):
+    def setUp(self):
+        """Creates a two-level tree of documents under topics."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.about = self.graph.create_entity(EntityType.PROPERTY)
+        self.broader = self.graph.create_entity(EntityType.PROPERTY)
+        self.status = self.graph.create_entity(EntityType.PROPERTY)
+        self.topics = [self.graph.create_entity() for _ in range(10)]
+        self.root = self.graph.create_entity()
+        for topic in self.topics:
+            self.graph.add_statement(topic.id, self.broader.id, self.root.id)
+        self.docs = self.graph.bulk_create_entities(200, labels=[f"Doc {i}" for i in range(200)])
+        for i, doc in enumerate(self.docs):
+            self.graph.add_statement(doc.id, self.about.id, self.topics[i % 10].id)
+            self.graph.add_statement(doc.id, self.status.id, "final" if i % 4 == 0 else "draft")
+        self.executor = ParallelExecutor(self.graph, workers=2, min_partition=1)
+
+    def tearDown(self):
+        self.executor.close()
+
+    def test_matches_serial_execution(self):
+        """Tests that parallel hops and filters give the serial results, in order."""
+        queries = [
+            lambda: self.graph.query().starting_from([d.id for d in self.docs]).follow(self.about.id),
+            lambda: self.graph.query().starting_from([d.id for d in self.docs])
+                .follow(self.about.id).follow(self.broader.id, 0, None),
+            lambda: self.graph.query().starting_from([t.id for t in self.topics])
+                .follow_inverse(self.about.id),
+            lambda: self.graph.query().starting_from([d.id for d in self.docs])
+                .filter(has(self.status.id, "final"))
+                .order_by(lambda e: self.graph.get_latest_label(e.id)).limit(5),
+        ]
+        for query in queries:
+            serial = query().execute()
+            parallel = query().execute(executor=self.executor)
+            self.assertEqual(parallel.total_matches, serial.total_matches)
+            self.assertEqual({e.id for e in parallel.results}, {e.id for e in serial.results})
+            self.assertEqual((parallel.index_hits, parallel.statements_scanned),
+                             (serial.index_hits, serial.statements_scanned))
+        self.assertEqual([e.id for e in parallel.results], [e.id for e in serial.results])
+
+    def test_worker_counters(self):
+        """Tests that index hits and statements scanned in the workers are reported."""
+        result = self.graph.query().starting_from([d.id for d in self.docs])\
+            .follow(self.about.id).execute(executor=self.executor)
+        self.assertEqual(result.index_hits, 200)
+        self.assertEqual(result.statements_scanned, 200)
+
+    def test_local_fallback_and_refresh(self):
+        """Tests that unpicklable filters run locally and new statements reach the workers."""
+        query = lambda: self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .follow(self.about.id)\
+            .filter(lambda e: e.id != self.topics[0].id)
+        self.assertEqual(len(query().execute(executor=self.executor).results), 9)
+
+        extra = self.graph.create_entity()
+        self.graph.add_statement(self.docs[0].id, self.about.id, extra.id)
+        result = query().execute(executor=self.executor)
+        self.assertIn(extra.id, {e.id for e in result.results})
+        self.assertEqual(self.executor._generation, 1)
+
+        # A tail longer than rebase_after makes the executor write a new base
+        self.executor.rebase_after = 1
+        later = self.graph.create_entity()
+        self.graph.add_statement(self.docs[1].id, self.about.id, later.id)
+        result = query().execute(executor=self.executor)
+        self.assertTrue({extra.id, later.id} <= {e.id for e in result.results})
+        self.assertEqual(self.executor._generation, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_query_system import Hop
+from graph_paths import Path, shortest_paths, all_paths
+
+class TestGraphPaths(unittest.TestCase):
+    def setUp(self):
+        """
+        Creates a small graph of linked entities:
+        a -> b -> c -> d, a -> e -> d and a cycle c -> b, all via `links`,
+        plus a `cites` edge from d to f.
+        """
+        self.graph = GraphLayer(node_id="test_node")
+        self.links = self.graph.create_entity(EntityType.PROPERTY)
+        self.cites = self.graph.create_entity(EntityType.PROPERTY)
+        self.name = self.graph.create_entity(EntityType.PROPERTY)
+        self.a, self.b, self.c, self.d, self.e, self.f = (
+            self.graph.create_entity().id for _ in range(6)
+        )
+        for subject, object_ in [(self.a, self.b), (self.b, self.c), (self.c, self.d),
+                                 (self.a, self.e), (self.e, self.d), (self.c, self.b)]:
+            self.graph.add_statement(subject, self.links.id, object_)
+        self.graph.add_statement(self.d, self.cites.id, self.f)
+        self.graph.add_statement(self.a, self.name.id, "start")
+
+    def test_path_structure(self):
+        """Tests that paths share prefixes and rebuild their sequences on demand."""
+        root = Path(self.a)
+        first = next(iter(self.graph.find_statements(self.a, self.links.id, self.b)))
+        second = next(iter(self.graph.find_statements(self.b, self.links.id, self.c)))
+        path = root.extend(first).extend(second)
+
+        self.assertEqual(len(path), 2)
+        self.assertEqual(path.start, self.a)
+        self.assertEqual(path.end, self.c)
+        self.assertEqual(path.entities(), [self.a, self.b, self.c])
+        self.assertEqual(path.statements(), [first, second])
+        self.assertIs(path.parent.parent, root)
+        self.assertTrue(path.visits(self.b))
+        self.assertFalse(path.visits(self.d))
+
+    def test_follow_chain_uses_every_property(self):
+        """Tests that chains follow each property in turn."""
+        result = self.graph.query()\
+            .starting_from(self.c)\
+            .follow_chain([self.links.id, self.cites.id])\
+            .execute()
+        self.assertEqual({e.id for e in result.results}, {self.f})
+
+    def test_variable_length_hop(self):
+        """Tests bounded and unbounded repetition of a property, including cycles."""
+        bounded = self.graph.query().starting_from(self.a).follow(self.links.id, 2, 2).execute()
+        self.assertEqual({e.id for e in bounded.results}, {self.c, self.d})
+
+        closure = self.graph.query().starting_from(self.a).follow(self.links.id, 1, None).execute()
+        self.assertEqual({e.id for e in closure.results}, {self.b, self.c, self.d, self.e})
+
+        reflexive = self.graph.query().starting_from(self.a).follow(self.links.id, 0, 1).execute()
+        self.assertEqual({e.id for e in reflexive.results}, {self.a, self.b, self.e})
+
+    def test_invalid_hop(self):
+        """Tests that hop bounds are validated."""
+        with self.assertRaises(ValueError):
+            Hop(self.links.id, 3, 2)
+
+    def test_chain_paths(self):
+        """Tests that PATHS results trace the statements followed by a chain."""
+        result = self.graph.query()\
+            .starting_from(self.a)\
+            .follow_chain([self.links.id, self.links.id])\
+            .return_paths()\
+            .execute()
+        routes = {tuple(p.entities()) for p in result.results}
+        self.assertEqual(routes, {(self.a, self.b, self.c), (self.a, self.e, self.d)})
+        self.assertEqual(result.total_matches, 2)
+
+    def test_variable_length_paths_skip_cycles(self):
+        """Tests that repeated hops never revisit an entity on the path."""
+        result = self.graph.query()\
+            .starting_from(self.b)\
+            .follow(self.links.id, 1, None)\
+            .return_paths()\
+            .execute()
+        routes = {tuple(p.entities()) for p in result.results}
+        self.assertEqual(routes, {(self.b, self.c), (self.b, self.c, self.d)})
+
+    def test_shortest_paths(self):
+        """Tests bidirectional shortest path search between entity sets."""
+        paths = shortest_paths(self.graph, [self.a], [self.d])
+        self.assertEqual([p.entities() for p in paths], [[self.a, self.e, self.d]])
+
+        paths = shortest_paths(self.graph, [self.a], [self.f])
+        self.assertEqual(len(paths[0]), 3)
+        self.assertEqual(paths[0].statements()[-1].predicate, self.cites.id)
+
+        self.assertEqual(shortest_paths(self.graph, [self.a], [self.f], max_depth=2), [])
+        self.assertEqual(shortest_paths(self.graph, [self.a], [self.f], {self.links.id}), [])
+        self.assertEqual(shortest_paths(self.graph, [self.d], [self.a]), [])
+
+    def test_all_paths(self):
+        """Tests enumeration of simple paths within a depth bound."""
+        routes = {tuple(p.entities()) for p in all_paths(self.graph, [self.a], [self.d])}
+        self.assertEqual(routes, {(self.a, self.b, self.c, self.d), (self.a, self.e, self.d)})
+
+        routes = {tuple(p.entities()) for p in all_paths(self.graph, [self.a], [self.d], max_depth=2)}
+        self.assertEqual(routes, {(self.a, self.e, self.d)})
+
+    def test_path_queries(self):
+        """Tests shortest and all path searches through the query builder."""
+        shortest = self.graph.query()\
+            .starting_from(self.a)\
+            .ending_at(self.f)\
+            .shortest_paths()\
+            .execute()
+        self.assertEqual([p.entities() for p in shortest.results], [[self.a, self.e, self.d, self.f]])
+
+        every = self.graph.query()\
+            .starting_from(self.a)\
+            .follow(self.links.id)\
+            .ending_at(self.d)\
+            .all_paths(via=[self.links.id], max_depth=3)\
+            .execute()
+        routes = {tuple(p.entities()) for p in every.results}
+        self.assertEqual(routes, {(self.a, self.b, self.c, self.d), (self.a, self.e, self.d)})
+
+    def test_path_search_requires_end(self):
+        """Tests that path searches must be given target entities."""
+        with self.assertRaises(ValueError):
+            self.graph.query().starting_from(self.a).shortest_paths().execute()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_patterns import BasicGraphPattern, TriplePattern, var
+from graph_query_planner import MatchPatterns
+
+class TestGraphPatterns(unittest.TestCase):
+    def build(self, compact: bool = False) -> GraphLayer:
+        """Creates documents and notes with tags, types and names."""
+        graph = GraphLayer(node_id="test_node", compact=compact)
+        self.tagged, self.type, self.name, self.cites = (
+            graph.create_entity(EntityType.PROPERTY) for _ in range(4))
+        self.alpha, self.beta, self.document, self.note = (graph.create_entity() for _ in range(4))
+        self.items = [graph.create_entity() for _ in range(40)]
+        for i, item in enumerate(self.items):
+            graph.add_statement(item.id, self.tagged.id, self.alpha.id if i % 2 == 0 else self.beta.id)
+            graph.add_statement(item.id, self.type.id, self.document.id if i % 5 else self.note.id)
+            graph.add_statement(item.id, self.name.id, "X" if i % 3 == 0 else f"item {i}")
+            graph.add_statement(item.id, self.cites.id, self.items[(i + 1) % 40].id)
+        return graph
+
+    def expected(self):
+        return {self.items[i].id for i in range(40) if i % 2 == 0 and i % 5 and i % 3 == 0}
+
+    def test_conjunctive_start(self):
+        """Tests that where() patterns seed the traversal with the entities matching all of them."""
+        for compact in (False, True):
+            graph = self.build(compact)
+            doc = var("doc")
+            query = graph.query().where(doc, self.tagged.id, self.alpha.id)\
+                .where(doc, self.type.id, self.document.id).where(doc, self.name.id, "X")
+            self.assertEqual({e.id for e in query.execute().results}, self.expected())
+
+            cited = graph.query().where(doc, self.name.id, "X").where(doc, self.type.id, self.note.id)\
+                .follow(self.cites.id).execute()
+            self.assertEqual({e.id for e in cited.results}, {self.items[i].id for i in (1, 16, 31)})
+
+    def test_bindings(self):
+        """Tests joins on shared variables, variable predicates and ordered, paginated bindings."""
+        graph = self.build()
+        a, b, tag = var("a"), var("b"), var("tag")
+        query = graph.query().where(a, self.cites.id, b).where(a, self.tagged.id, tag)\
+            .where(b, self.tagged.id, tag).return_bindings()
+        self.assertEqual(query.execute().results, [])
+
+        chains = graph.query().where(a, self.cites.id, b).where(b, self.name.id, "X").return_bindings()\
+            .order_by(lambda binding: int(binding["a"].local_id)).limit(3)
+        result = chains.execute()
+        self.assertEqual(result.total_matches, 14)
+        self.assertEqual([binding["b"] for binding in result.results],
+                         [self.items[i].id for i in (3, 6, 9)])
+        self.assertIsInstance(chains.plan().steps[0], MatchPatterns)
+
+        predicate = var("p")
+        links = BasicGraphPattern((TriplePattern(self.items[0].id, predicate, self.items[1].id),))
+        self.assertEqual(list(links.solutions(graph)), [{"p": self.cites.id}])
+        self.assertTrue(links.any_predicate())
+
+        page = graph.query().where(a, self.type.id, self.note.id).return_bindings().cursor(3)
+        seen = [binding["a"] for rows in page for binding in rows]
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+
+    def test_invalid_patterns(self):
+        """Tests that literal subjects, non-property predicates and unsupported combinations are rejected."""
+        graph = self.build()
+        with self.assertRaises(ValueError):
+            graph.query().where("literal", self.name.id, "X")
+        with self.assertRaises(ValueError):
+            graph.query().where(var("a"), self.alpha.id, "X")
+        with self.assertRaises(ValueError):
+            graph.query().return_bindings().execute()
+        with self.assertRaises(ValueError):
+            graph.query().where(var("a"), self.name.id, "X").follow(self.cites.id).return_bindings().execute()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import graph_persistence
+from graph_layer_core import GraphLayer, EntityType, EntityCreated, LabelAdded
+from graph_persistence import (
+    GraphStorage, OperationLog, MappedStatementStore,
+    encode_operation, decode_operation, write_snapshot, load_snapshot
+)
+
+class TestGraphPersistence(unittest.TestCase):
+    def setUp(self):
+        """Creates a scratch directory and a small document graph."""
+        self.directory = tempfile.mkdtemp()
+        self.graph = GraphLayer(node_id="test_node")
+        self.tag_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.name_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.tag = self.graph.create_entity()
+        self.graph.add_label(self.tag.id, "project-alpha")
+        self.docs = []
+        for i in range(4):
+            doc = self.graph.create_entity()
+            self.graph.add_label(doc.id, f"Document {i}")
+            self.graph.add_statement(doc.id, self.name_prop.id, f"Name {i % 2}")
+            self.graph.add_statement(doc.id, self.tag_prop.id, self.tag.id)
+            self.docs.append(doc)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_operation_round_trip(self):
+        """Tests that every operation kind survives encoding."""
+        statement = next(iter(self.graph.statements))
+        entity = self.graph.entities[self.tag.id]
+        label = next(iter(entity.labels["en"]))
+        for operation in (statement, EntityCreated(entity.id, entity.created_at),
+                          LabelAdded(entity.id, "en", label)):
+            self.assertEqual(decode_operation(encode_operation(operation)), operation)
+
+    def test_log_drops_torn_tail(self):
+        """Tests that a partially written record is cut off when the log is reopened."""
+        path = os.path.join(self.directory, "operations.log")
+        log = OperationLog(path, sync_every=1)
+        operations = list(self.graph.statements)[:3]
+        for sequence, operation in enumerate(operations, 1):
+            log.append(sequence, operation)
+        log.close()
+        with open(path, "ab") as file:
+            file.write(b"\x20\x00\x00\x00garbage")
+
+        with mock.patch.object(graph_persistence, "LOG_READ_CHUNK", 16):
+            self.assertEqual([op for _, op in OperationLog.read(path)], operations)
+        OperationLog(path).close()
+        self.assertEqual(len(list(OperationLog.read(path))), 3)
+
+    def test_snapshot_round_trip(self):
+        """Tests that a loaded snapshot holds the same entities, statements and logs."""
+        path = os.path.join(self.directory, "snapshot.ygs")
+        write_snapshot(self.graph, path)
+        loaded = load_snapshot(path, verify=True)
+
+        self.assertIsInstance(loaded.statements, MappedStatementStore)
+        self.assertEqual(set(loaded.statements), set(self.graph.statements))
+        self.assertEqual(loaded.entities.keys(), self.graph.entities.keys())
+        self.assertEqual(loaded.get_latest_label(self.docs[2].id), "Document 2")
+        self.assertEqual(loaded.version_vector(), self.graph.version_vector())
+        self.assertEqual(loaded.predicate_stats(self.tag_prop.id), self.graph.predicate_stats(self.tag_prop.id))
+
+    def test_snapshot_decodes_lazily(self):
+        """Tests that loading decodes no entities or logged operations until they are read."""
+        path = os.path.join(self.directory, "snapshot.ygs")
+        write_snapshot(self.graph, path)
+        loaded = load_snapshot(path)
+        self.assertEqual(loaded.entities.loaded, {})
+        self.assertEqual(len(loaded.entities), len(self.graph.entities))
+
+        self.assertEqual(loaded.get_latest_label(self.tag.id), "project-alpha")
+        self.assertEqual(list(loaded.entities.loaded), [self.tag.id])
+        self.assertNotIn(loaded.create_entity().id, self.graph.entities)
+        self.assertEqual(len(loaded.entities), len(self.graph.entities) + 1)
+
+        log = loaded._op_log["test_node"]
+        self.assertEqual([loaded._resolve_operation(entry) for entry in log[:-1]],
+                         [self.graph._resolve_operation(entry) for entry in self.graph._op_log["test_node"]])
+
+    def test_snapshot_indexes(self):
+        """Tests that every index pattern is answered from the mapped snapshot."""
+        path = os.path.join(self.directory, "snapshot.ygs")
+        write_snapshot(self.graph, path)
+        loaded = load_snapshot(path)
+
+        patterns = [
+            {"subject": self.docs[0].id},
+            {"subject": self.docs[0].id, "predicate": self.tag_prop.id},
+            {"predicate": self.name_prop.id, "object_": "Name 1"},
+            {"predicate": self.tag_prop.id},
+            {"object_": self.tag.id},
+            {"object_": "Name 0"},
+            {"subject": self.docs[1].id, "object_": "Name 1"},
+            {"object_": "missing"},
+        ]
+        for pattern in patterns:
+            self.assertEqual(set(loaded.find_statements(**pattern)),
+                             set(self.graph.find_statements(**pattern)), pattern)
+
+        result = loaded.query()\
+            .starting_from([d.id for d in self.docs])\
+            .follow(self.tag_prop.id)\
+            .execute()
+        self.assertEqual([e.id for e in result.results], [self.tag.id])
+
+    def test_writes_after_loading(self):
+        """Tests that statements added to a loaded snapshot are stored and indexed."""
+        path = os.path.join(self.directory, "snapshot.ygs")
+        write_snapshot(self.graph, path)
+        loaded = load_snapshot(path)
+
+        doc = loaded.create_entity()
+        statement = loaded.add_statement(doc.id, self.tag_prop.id, self.tag.id)
+        loaded.add_statement(self.docs[0].id, self.name_prop.id, "Name 0")
+
+        self.assertIn(statement, loaded.statements)
+        self.assertEqual(len(list(loaded.find_statements(object_=self.tag.id))), 5)
+        self.assertEqual(len(list(loaded.find_statements(self.docs[0].id, self.name_prop.id))), 2)
+        self.assertEqual(loaded.predicate_stats(self.tag_prop.id).distinct_subjects, 5)
+        self.assertNotIn(doc.id, self.graph.entities)
+        self.assertEqual(len(self.graph.delta_since({})), len(loaded.delta_since({})) - 3)
+
+    def test_storage_recovers_from_log(self):
+        """Tests that reopening storage replays operations logged after the snapshot."""
+        storage = GraphStorage(self.directory, sync_every=4)
+        graph = storage.open("test_node")
+        graph.merge(self.graph)
+        storage.snapshot()
+        extra = graph.create_entity()
+        graph.add_statement(extra.id, self.tag_prop.id, self.tag.id)
+        graph.add_label(extra.id, "Late document")
+        storage.close()
+
+        reopened_storage = GraphStorage(self.directory)
+        reopened = reopened_storage.open("test_node")
+        self.assertEqual(set(reopened.statements), set(graph.statements))
+        self.assertEqual(reopened.get_latest_label(extra.id), "Late document")
+        self.assertEqual(reopened.version_vector(), graph.version_vector())
+        self.assertNotEqual(reopened.create_entity().id, extra.id)
+        reopened_storage.close()
+
+        with self.assertRaises(ValueError):
+            GraphStorage(self.directory).open("other_node")
+
+    def test_automatic_snapshots(self):
+        """Tests that snapshots are taken after the configured number of operations."""
+        storage = GraphStorage(self.directory, snapshot_every=10)
+        graph = storage.open("test_node")
+        graph.sync_from(self.graph)
+        storage.close()
+
+        self.assertTrue(os.path.exists(storage.snapshot_path))
+        reopened_storage = GraphStorage(self.directory)
+        reopened = reopened_storage.open("test_node")
+        self.assertEqual(len(reopened.statements), len(self.graph.statements))
+        reopened_storage.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        """Creates tagged documents and enables the cache."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.tag_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.other_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.tag = self.graph.create_entity()
+        self.graph.add_label(self.tag.id, "alpha")
+        self.docs = [self.graph.create_entity() for _ in range(3)]
+        for doc in self.docs:
+            self.graph.add_statement(doc.id, self.tag_prop.id, self.tag.id)
+        self.cache = self.graph.enable_query_cache(max_entries=4)
+
+    def tags_query(self):
+        return self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .follow(self.tag_prop.id)\
+            .return_values()
+
+    def test_hits_and_misses(self):
+        """Tests that identical query shapes are served from the cache."""
+        first = self.tags_query().execute()
+        second = self.tags_query().execute()
+        self.assertEqual((first.cache_hits, first.cache_misses), (0, 1))
+        self.assertEqual((second.cache_hits, second.cache_misses), (1, 1))
+        self.assertEqual(second.results, ["alpha"])
+
+        self.tags_query().limit(1).execute()
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_precise_invalidation(self):
+        """Tests that only operations touching a dependency invalidate an entry."""
+        self.tags_query().execute()
+        self.graph.add_statement(self.docs[0].id, self.other_prop.id, "unrelated")
+        self.graph.add_label(self.docs[0].id, "not a candidate")
+        self.assertEqual(self.tags_query().execute().cache_hits, 1)
+
+        self.graph.add_label(self.tag.id, "beta")
+        result = self.tags_query().execute()
+        self.assertEqual(result.results, ["beta"])
+        self.assertEqual(self.cache.invalidations, 1)
+
+        new_tag = self.graph.create_entity()
+        self.graph.add_statement(self.docs[1].id, self.tag_prop.id, new_tag.id)
+        self.assertEqual(len(self.tags_query().execute().results), 2)
+
+    def test_statement_results_and_merge(self):
+        """Tests that merged statements about result subjects invalidate statement queries."""
+        query = lambda: self.graph.query().starting_from(self.docs[0].id).return_statements()
+        self.assertEqual(len(query().execute().results), 1)
+
+        other = GraphLayer(node_id="other_node")
+        other.sync_from(self.graph)
+        other.add_statement(self.docs[0].id, self.other_prop.id, "from elsewhere")
+        self.graph.merge(other)
+        self.assertEqual(len(query().execute().results), 2)
+
+    def test_bounded_size(self):
+        """Tests LRU eviction by entry count and by size."""
+        for i in range(6):
+            self.graph.query().starting_from(self.docs[0].id).limit(i + 1).execute()
+        self.assertEqual(len(self.cache), 4)
+        self.assertEqual(self.cache.evictions, 2)
+
+        small = self.graph.enable_query_cache(max_bytes=1)
+        self.tags_query().execute()
+        self.assertEqual(len(small), 0)
+        self.graph.disable_query_cache()
+        self.assertEqual(self.tags_query().execute().cache_misses, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_query_system import CREATED_AT, STATEMENT_TIMESTAMP, latest_label
+from graph_query_planner import (
+    QueryPlanner, ExecutionContext, ExpandForward, ExpandReverse, ExpandInverse, Filter, Materialize, Paginate, Sort,
+    Seek, IndexScan
+)
+
+class TestQueryPlanner(unittest.TestCase):
+    def setUp(self):
+        """Creates many documents, most tagged with a common tag and one with a rare tag."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.tag_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.rare_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.common_tag = self.graph.create_entity()
+        self.rare_tag = self.graph.create_entity()
+
+        self.docs = []
+        for i in range(20):
+            doc = self.graph.create_entity()
+            self.graph.add_label(doc.id, f"Document {i}")
+            self.graph.add_statement(doc.id, self.tag_prop.id, self.common_tag.id)
+            self.docs.append(doc)
+        self.graph.add_statement(self.docs[0].id, self.rare_prop.id, self.rare_tag.id)
+
+    def test_predicate_statistics(self):
+        """Tests that predicate cardinalities track added statements."""
+        stats = self.graph.predicate_stats(self.tag_prop.id)
+        self.assertEqual(stats.statement_count, 20)
+        self.assertEqual(stats.distinct_subjects, 20)
+        self.assertEqual(stats.distinct_objects, 1)
+        self.assertEqual(self.graph.predicate_stats(self.common_tag.id).statement_count, 0)
+
+    def test_traversal_direction(self):
+        """Tests that rare predicates over wide frontiers are expanded in reverse."""
+        wide = self.graph.query().starting_from([d.id for d in self.docs])
+        rare_plan = QueryPlanner(self.graph).plan(wide.follow(self.rare_prop.id))
+        self.assertIsInstance(rare_plan.steps[1], ExpandReverse)
+
+        narrow = self.graph.query().starting_from(self.docs[0].id).follow(self.tag_prop.id)
+        self.assertIsInstance(QueryPlanner(self.graph).plan(narrow).steps[1], ExpandForward)
+
+    def test_reverse_expansion_matches_forward(self):
+        """Tests that both traversal directions produce the same entities."""
+        frontier = {d.id for d in self.docs[:5]}
+        forward = ExpandForward(self.rare_prop.id)
+        reverse = ExpandReverse(self.rare_prop.id)
+        ctx = ExecutionContext(graph=self.graph)
+        self.assertEqual(forward.run(frontier, ctx), reverse.run(frontier, ctx))
+        self.assertEqual(reverse.run(frontier, ctx), {self.rare_tag.id})
+
+    def test_pagination_pushdown(self):
+        """Tests that unordered queries paginate before materializing results."""
+        query = self.graph.query().starting_from([d.id for d in self.docs])
+        query.limit(5)
+        operators = [type(step) for step in query.plan().steps]
+        self.assertLess(operators.index(Paginate), operators.index(Materialize))
+
+        query.order_by(lambda e: e.created_at)
+        operators = [type(step) for step in query.plan().steps]
+        self.assertLess(operators.index(Materialize), operators.index(Sort))
+        self.assertLess(operators.index(Sort), operators.index(Paginate))
+
+    def test_explain_reports_actual_rows(self):
+        """Tests that EXPLAIN records estimated and actual row counts."""
+        plan = self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .follow(self.tag_prop.id)\
+            .explain()
+
+        self.assertEqual([step.actual_rows for step in plan.steps], [20, 1, 1, 1])
+        self.assertEqual(plan.steps[1].estimated_rows, 1)
+        self.assertIsInstance(plan.steps[2], Filter)
+        self.assertIn("est=", str(plan))
+        self.assertIn("actual=1", str(plan))
+
+    def test_explain_without_analyze(self):
+        """Tests that the plan can be inspected without running it."""
+        plan = self.graph.query().starting_from(self.docs[0].id).explain(analyze=False)
+        self.assertFalse(plan.executed)
+        self.assertTrue(all(step.actual_rows is None for step in plan.steps))
+
+    def test_paginated_statements(self):
+        """Tests that statement results stop once the page is full."""
+        result = self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .return_statements()\
+            .offset(2)\
+            .limit(3)\
+            .execute()
+        self.assertEqual(len(result.results), 3)
+        self.assertEqual(result.total_matches, 20)
+
+    def test_iterate_stops_early(self):
+        """Tests that streaming a limited, unordered query only filters what it needs."""
+        checked = []
+        def counting(entity):
+            checked.append(entity.id)
+            return True
+        query = self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .filter(counting)\
+            .limit(3)
+        
+        results = list(query.iterate())
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(checked), 3)
+        self.assertEqual(len(query.execute().results), 3)
+        self.assertEqual(len(checked), 23)
+
+    def test_cursor_pages(self):
+        """Tests that a cursor pages through every result once, in keyset order."""
+        doc_ids = [d.id for d in self.docs]
+        cursor = self.graph.query().starting_from(doc_ids).cursor(page_size=6)
+        pages = list(cursor)
+        
+        self.assertEqual([len(page) for page in pages], [6, 6, 6, 2])
+        seen = [entity.id for page in pages for entity in page]
+        self.assertEqual(set(seen), set(doc_ids))
+        self.assertEqual(len(seen), len(doc_ids))
+        self.assertTrue(cursor.exhausted)
+
+    def test_continuation_tokens(self):
+        """Tests that a token resumes a fresh query where the previous page ended."""
+        doc_ids = [d.id for d in self.docs]
+        first = self.graph.query().starting_from(doc_ids).after().limit(8).execute()
+        second = self.graph.query().starting_from(doc_ids).after(first.continuation_token).limit(8).execute()
+        
+        cursor = self.graph.query().starting_from(doc_ids).cursor(page_size=8)
+        self.assertEqual(first.results, cursor.fetch())
+        self.assertEqual(second.results, cursor.fetch())
+        self.assertEqual(second.continuation_token, cursor.token)
+        
+        plan = self.graph.query().starting_from(doc_ids).after(first.continuation_token).limit(8).plan()
+        operators = [type(step) for step in plan.steps]
+        self.assertLess(operators.index(Seek), operators.index(Materialize))
+
+    def test_ordered_keyset_pagination(self):
+        """Tests keyset pages over order_by keys, including tied keys."""
+        def by_label(entity):
+            return self.graph.get_latest_label(entity.id)[-1]
+        query = lambda: self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .order_by(by_label)
+        
+        expected = query().execute().results
+        pages, token = [], None
+        while True:
+            result = query().after(token).limit(7).execute()
+            if not result.results:
+                break
+            pages.extend(result.results)
+            token = result.continuation_token
+        self.assertEqual([by_label(e) for e in pages], [by_label(e) for e in expected])
+        self.assertEqual({e.id for e in pages}, {e.id for e in expected})
+        self.assertEqual(len(pages), len(expected))
+        
+        with self.assertRaises(ValueError):
+            self.graph.query().starting_from(self.docs[0].id).return_values().cursor(5)
+        with self.assertRaises(ValueError):
+            self.graph.query().after("not a token")
+
+    def test_top_k_sort(self):
+        """Tests that limited ordered queries select a bounded top-k with one composite key."""
+        def label_number(entity):
+            return int(self.graph.get_latest_label(entity.id).split()[1])
+        query = self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .order_by(lambda e: label_number(e) % 2)\
+            .order_by(label_number, descending=True)\
+            .offset(1)\
+            .limit(3)
+        sort = next(step for step in query.plan().steps if isinstance(step, Sort))
+        self.assertEqual(sort.keep, 4)
+        self.assertEqual([label_number(e) for e in query.execute().results], [16, 14, 12])
+
+    def test_index_scan_for_newest_tagged(self):
+        """Tests reading the newest tagged documents from the sorted index."""
+        query = self.graph.query()\
+            .starting_from([d.id for d in self.docs])\
+            .order_by(CREATED_AT, descending=True)\
+            .limit(3)
+        operators = [type(step) for step in query.plan().steps]
+        self.assertIn(IndexScan, operators)
+        self.assertNotIn(Sort, operators)
+        self.assertEqual([e.id for e in query.execute().results], [d.id for d in self.docs[:-4:-1]])
+        
+        newer = self.graph.create_entity()
+        self.assertEqual(query.execute().results[0].id, self.docs[-1].id)
+        query.starting_from(newer.id)
+        self.assertEqual(query.execute().results[0].id, newer.id)
+
+    def test_index_scan_matches_sort(self):
+        """Tests that index scans and sorts agree for labels and statement timestamps."""
+        doc_ids = [d.id for d in self.docs]
+        for key, result_type in ((latest_label(), "return_entities"), (STATEMENT_TIMESTAMP, "return_statements")):
+            scanned = getattr(self.graph.query().starting_from(doc_ids), result_type)()\
+                .order_by(key).limit(4)
+            sorted_ = getattr(self.graph.query().starting_from(doc_ids), result_type)()\
+                .order_by(lambda r: key(r)).limit(4)
+            self.assertIn(IndexScan, [type(step) for step in scanned.plan().steps])
+            self.assertEqual([key(r) for r in scanned.execute().results],
+                             [key(r) for r in sorted_.execute().results])
+        
+        narrow = self.graph.query().starting_from(doc_ids[:2]).order_by(CREATED_AT).limit(1)
+        self.assertIn(Sort, [type(step) for step in narrow.plan().steps])
+
+    def test_inverse_traversal(self):
+        """Tests following predicates from objects back to subjects, singly, repeated and as paths."""
+        query = self.graph.query().starting_from(self.common_tag.id).follow_inverse(self.tag_prop.id)
+        self.assertIsInstance(query.plan().steps[1], ExpandInverse)
+        result = query.execute()
+        self.assertEqual({e.id for e in result.results}, {d.id for d in self.docs})
+        self.assertEqual(result.index_hits, 1)
+
+        round_trip = self.graph.query().starting_from(self.rare_tag.id)\
+            .follow_inverse(self.rare_prop.id).follow(self.tag_prop.id).follow_inverse(self.tag_prop.id, 0, None)
+        self.assertEqual(len(round_trip.execute().results), 21)
+
+        paths = self.graph.query().starting_from(self.rare_tag.id).follow_inverse(self.rare_prop.id)\
+            .return_paths().execute().results
+        self.assertEqual([path.entities() for path in paths], [[self.rare_tag.id, self.docs[0].id]])
+        self.assertIn(f"^{self.tag_prop.id}", str(round_trip.explain()))
+
+if __name__ == '__main__':
+    unittest.main()
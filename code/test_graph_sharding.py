@@ -0,0 +1,83 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_filters import has
+from graph_sharding import ShardedGraph
+
+class TestShardedGraph(unittest.TestCase):
+    def setUp(self):
+        """Creates the same tree of documents under topics in a sharded and a plain graph."""
+        self.sharded = ShardedGraph(node_id="sharded", shards=3)
+        self.about, self.broader, self.status = (
+            self.sharded.create_entity(EntityType.PROPERTY) for _ in range(3))
+        self.root = self.sharded.create_entity()
+        self.topics = self.sharded.bulk_create_entities(6, labels=[f"Topic {i}" for i in range(6)])
+        self.docs = self.sharded.bulk_create_entities(60)
+        for topic in self.topics:
+            self.sharded.add_statement(topic.id, self.broader.id, self.root.id)
+        self.sharded.bulk_add_statements(
+            [(doc.id, self.about.id, self.topics[i % 6].id) for i, doc in enumerate(self.docs)]
+            + [(doc.id, self.status.id, "final" if i % 4 == 0 else "draft") for i, doc in enumerate(self.docs)])
+
+        self.plain = GraphLayer(node_id="plain")
+        for entity in [self.about, self.broader, self.status, self.root] + self.topics + self.docs:
+            self.plain.entities[entity.id] = entity
+        for topic in self.topics:
+            self.plain.add_statement(topic.id, self.broader.id, self.root.id)
+        for i, doc in enumerate(self.docs):
+            self.plain.add_statement(doc.id, self.about.id, self.topics[i % 6].id)
+            self.plain.add_statement(doc.id, self.status.id, "final" if i % 4 == 0 else "draft")
+
+    def tearDown(self):
+        self.sharded.close()
+
+    def test_matches_single_graph(self):
+        """Tests that scatter-gather queries give the single-graph results."""
+        starts = [d.id for d in self.docs]
+        queries = [
+            lambda graph: graph.query().starting_from(starts).follow(self.about.id),
+            lambda graph: graph.query().starting_from(starts).follow(self.about.id)
+                .follow(self.broader.id, 0, None),
+            lambda graph: graph.query().starting_from(starts).filter(has(self.status.id, "final"))
+                .filter(lambda e: e.id != self.docs[0].id),
+            lambda graph: graph.query().starting_from(self.root.id).follow_inverse(self.broader.id)
+                .follow_inverse(self.about.id),
+            lambda graph: graph.query().starting_from(starts).follow(self.about.id).return_values()
+                .order_by(lambda label: label).limit(3),
+        ]
+        for query in queries:
+            sharded, plain = query(self.sharded).execute(), query(self.plain).execute()
+            self.assertEqual(sharded.total_matches, plain.total_matches)
+            self.assertEqual(sorted(map(str, sharded.results)), sorted(map(str, plain.results)))
+        self.assertEqual(sharded.results, ["Topic 0", "Topic 1", "Topic 2"])
+
+        statements = self.sharded.query().starting_from(starts[:5]).return_statements().limit(4).execute()
+        self.assertEqual(len(statements.results), 4)
+        self.assertIn("ScatterExpand", str(queries[1](self.sharded).explain()))
+
+    def test_writes_and_merge(self):
+        """Tests labels, deletion, merging from a replica and per-shard placement."""
+        topic = self.topics[0].id
+        self.sharded.add_label(topic, "Renamed")
+        self.assertEqual(self.sharded.get_latest_label(topic), "Renamed")
+        with self.assertRaises(ValueError):
+            self.sharded.add_label(GraphLayer(node_id="x").create_entity().id, "missing")
+        self.sharded.delete_entity(self.docs[0].id)
+        self.assertTrue(self.sharded.get_entity(self.docs[0].id).tombstone)
+
+        replica = GraphLayer(node_id="replica")
+        extra = replica.create_entity()
+        replica.add_statement(extra.id, self.about.id, topic)
+        self.sharded.merge(replica)
+        self.sharded.merge(replica)
+        self.assertEqual(self.sharded.version_vector()["replica"], 2)
+        self.assertEqual(len(self.sharded.find_statements(extra.id)), 1)
+        matched = self.sharded.query().starting_from(extra.id).follow(self.about.id).execute()
+        self.assertEqual([e.id for e in matched.results], [topic])
+
+        self.assertEqual(self.sharded.sizes()["statements"], 127)
+        self.assertEqual(len(self.sharded.partition(d.id for d in self.docs)), 3)
+        with self.assertRaises(ValueError):
+            self.sharded.query().starting_from(extra.id).return_paths().execute()
+
+if __name__ == '__main__':
+    unittest.main()
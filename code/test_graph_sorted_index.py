@@ -0,0 +1,91 @@
+import random
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from graph_layer_core import GraphLayer, EntityType, Statement, Delta
+from graph_query_system import CREATED_AT, STATEMENT_TIMESTAMP, latest_label
+
+class TestSortedIndex(unittest.TestCase):
+    def setUp(self):
+        """Creates documents with distinct creation times and labels."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.tag_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.docs = []
+        base = datetime(2024, 1, 1)
+        for i in range(5):
+            doc = self.graph.create_entity()
+            doc.created_at = base + timedelta(days=i)
+            self.graph.add_label(doc.id, f"Document {4 - i}")
+            self.docs.append(doc)
+        self.tag_prop.created_at = base - timedelta(days=1)
+
+    def test_created_at_order(self):
+        """Tests that entities are indexed in creation order."""
+        index = self.graph.sorted_index(CREATED_AT)
+        self.assertIs(self.graph.sorted_index(CREATED_AT), index)
+        self.assertEqual(list(index.ascending()), [self.tag_prop.id] + [d.id for d in self.docs])
+        self.assertEqual(next(index.descending()), self.docs[-1].id)
+
+        newest = self.graph.create_entity()
+        self.assertEqual(next(index.descending()), newest.id)
+        self.assertEqual(len(index), 7)
+
+    def test_label_updates(self):
+        """Tests that relabelling an entity moves it within the label index."""
+        index = self.graph.sorted_index(latest_label())
+        self.assertEqual(list(index.ascending())[:2], [self.tag_prop.id, self.docs[4].id])
+
+        self.graph.add_label(self.docs[4].id, "Zebra")
+        self.graph.add_label(self.docs[0].id, "Document 9", language="de")
+        self.assertEqual(next(index.descending()), self.docs[4].id)
+        self.assertEqual(list(index.ascending())[-2], self.docs[0].id)
+        self.assertEqual(len(index), 6)
+
+    def test_statement_timestamps_from_sync(self):
+        """Tests that statements arriving from another replica are indexed."""
+        index = self.graph.sorted_index(STATEMENT_TIMESTAMP)
+        first = self.graph.add_statement(self.docs[0].id, self.tag_prop.id, "a")
+
+        other = GraphLayer(node_id="other_node")
+        other.sync_from(self.graph)
+        second = other.add_statement(self.docs[1].id, self.tag_prop.id, "b")
+        self.graph.sync_from(other)
+
+        self.assertEqual(list(index.ascending()), [first, second])
+
+    def test_chunked_compact_index(self):
+        """Tests that indexes stay ordered across chunk splits, keeping rows on compact graphs."""
+        graph = GraphLayer(node_id="test_node", compact=True)
+        prop = graph.create_entity(EntityType.PROPERTY)
+        doc = graph.create_entity()
+        index = graph.sorted_index(STATEMENT_TIMESTAMP)
+        labels = graph.sorted_index(latest_label())
+        base = datetime(2024, 1, 1)
+        shuffled = random.Random(7).sample(range(1500), 1500)
+        delta = Delta()
+        delta.operations["importer"] = (1, [
+            Statement(id=str(uuid.UUID(int=i + 1)), subject=doc.id, predicate=prop.id, object=f"v{i}",
+                      timestamp=base + timedelta(minutes=minute), node_id="importer")
+            for i, minute in enumerate(shuffled)
+        ])
+        graph.apply_delta(delta)
+
+        self.assertGreater(len(index.entries.keys), 1)
+        self.assertEqual(index.entries.items[0].typecode, 'q')
+        self.assertEqual([s.timestamp for s in index.ascending()],
+                         [base + timedelta(minutes=m) for m in range(1500)])
+        window = index.between(base + timedelta(minutes=100), base + timedelta(minutes=700))
+        self.assertEqual([s.object for s in window], [f"v{shuffled.index(m)}" for m in range(100, 700)])
+
+        people = [graph.create_entity() for _ in range(1200)]
+        for i, person in enumerate(people):
+            graph.add_label(person.id, f"Person {i:04d}")
+        for person in people[::3]:
+            graph.add_label(person.id, "Aardvark")
+        ordered = list(labels.ascending())
+        self.assertEqual(set(ordered[:2]), {prop.id, doc.id})  # Unlabelled
+        self.assertEqual(set(ordered[2:402]), {p.id for p in people[::3]})
+        self.assertEqual(ordered[402:], [p.id for i, p in enumerate(people) if i % 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import uuid
+from datetime import datetime
+from graph_layer_core import GraphLayer, EntityType, Statement
+from graph_storage import CompactStatementStore, to_microseconds, from_microseconds
+
+class TestCompactStorage(unittest.TestCase):
+    def setUp(self):
+        """Creates the same document graph on a compact and a regular backend."""
+        self.graph = GraphLayer(node_id="test_node", compact=True)
+        self.tag_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.name_prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.tag = self.graph.create_entity()
+        self.docs = [self.graph.create_entity() for _ in range(3)]
+        for doc in self.docs:
+            self.graph.add_statement(doc.id, self.tag_prop.id, self.tag.id)
+            self.graph.add_statement(doc.id, self.name_prop.id, "Shared Name")
+
+    def test_statement_views_round_trip(self):
+        """Tests that statements read back from the columns equal the ones added."""
+        statement = self.graph.add_statement(self.docs[0].id, self.name_prop.id, "Other", certainty=0.25)
+
+        self.assertIn(statement, self.graph.statements)
+        stored = list(self.graph.find_statements(self.docs[0].id, self.name_prop.id, "Other"))
+        self.assertEqual(stored, [statement])
+        self.assertIsInstance(stored[0], Statement)
+        self.assertEqual(stored[0].certainty, 0.25)
+        self.assertEqual(len(self.graph.statements), 7)
+
+    def test_values_are_interned(self):
+        """Tests that entities, nodes and literals are stored once each."""
+        store = self.graph.statements
+        self.assertIsInstance(store, CompactStatementStore)
+        self.assertEqual(len(store.literal_pool), 1)
+        self.assertEqual(len(store.node_codes), 1)
+        self.assertEqual(len(store.entity_codes), 6)
+        self.assertEqual(store.nbytes(), len(store) * (6 * 8 + 16))
+
+    def test_id_lookup_table(self):
+        """Tests that IDs stay findable as the array-backed lookup table grows."""
+        doc = self.docs[0].id
+        added = [self.graph.add_statement(doc, self.name_prop.id, f"Name {i}") for i in range(500)]
+        store = self.graph.statements
+        for statement in added[::7]:
+            self.assertEqual(store.statement(store.row_for_id(statement.id)), statement)
+        self.assertIsNone(store.row_for_id(str(uuid.uuid4())))
+        self.assertLessEqual(len(store._slots) * store._slots.itemsize, len(store) * 24)
+
+    def test_timestamps_are_exact(self):
+        """Tests that timestamps survive the integer encoding to the microsecond."""
+        timestamp = datetime(2024, 3, 1, 12, 30, 15, 123456)
+        self.assertEqual(from_microseconds(to_microseconds(timestamp)), timestamp)
+
+    def test_nonstandard_statement_ids(self):
+        """Tests that IDs that are not canonical UUIDs are preserved."""
+        statement = Statement(
+            id="import-42",
+            subject=self.docs[1].id,
+            predicate=self.name_prop.id,
+            object="Imported",
+            timestamp=datetime(2024, 1, 1),
+            node_id="importer"
+        )
+        self.assertTrue(self.graph._insert_statement(statement))
+        self.assertFalse(self.graph._insert_statement(statement))
+        self.assertEqual(list(self.graph.find_statements(object_="Imported")), [statement])
+
+    def test_queries_match_regular_backend(self):
+        """Tests that queries give the same answers on both backends."""
+        regular = GraphLayer(node_id="other_node")
+        regular.merge(self.graph)
+        self.assertEqual(set(regular.statements), set(self.graph.statements))
+
+        for graph in (self.graph, regular):
+            entities = graph.query()\
+                .starting_from([d.id for d in self.docs])\
+                .follow(self.tag_prop.id)\
+                .execute()
+            self.assertEqual([e.id for e in entities.results], [self.tag.id])
+
+            statements = graph.query().starting_from(self.docs[0].id).return_statements().execute()
+            self.assertEqual(len(statements.results), 2)
+
+        self.assertEqual(self.graph.predicate_stats(self.tag_prop.id),
+                         regular.predicate_stats(self.tag_prop.id))
+
+    def test_merge_into_compact_backend(self):
+        """Tests that merging regular statements into a compact graph deduplicates them."""
+        regular = GraphLayer(node_id="other_node")
+        doc = regular.create_entity()
+        statement = regular.add_statement(doc.id, self.tag_prop.id, self.tag.id)
+
+        self.graph.merge(regular)
+        self.graph.merge(regular)
+
+        self.assertIn(statement, self.graph.statements)
+        self.assertEqual(len(self.graph.statements), 7)
+        self.assertEqual(set(self.graph.find_statements(object_=self.tag.id)),
+                         set(self.graph.find_statements(predicate=self.tag_prop.id)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from graph_layer_core import GraphLayer, EntityType, EntityDeleted
+from graph_filters import has, label_matches, text_matches
+from graph_persistence import encode_operation, decode_operation, write_snapshot, load_snapshot
+from graph_query_planner import ExpandForward, ExpandReverse, IndexScan
+from graph_query_system import CREATED_AT
+
+def checkpoint() -> datetime:
+    """Returns a time strictly between the operations before and after the call."""
+    time.sleep(0.002)
+    moment = datetime.now()
+    time.sleep(0.002)
+    return moment
+
+class TestTemporalQueries(unittest.TestCase):
+    def setUp(self):
+        """Creates a person who moves from one city to another, which is later deleted."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.lives_in = self.graph.create_entity(EntityType.PROPERTY)
+        self.person = self.graph.create_entity()
+        self.old_city = self.graph.create_entity()
+        self.graph.add_label(self.old_city.id, "Oslo")
+        self.graph.add_statement(self.person.id, self.lives_in.id, self.old_city.id)
+        self.before_move = checkpoint()
+        self.new_city = self.graph.create_entity()
+        self.graph.add_label(self.new_city.id, "Bergen")
+        self.graph.add_statement(self.person.id, self.lives_in.id, self.new_city.id)
+        self.before_rename = checkpoint()
+        self.graph.add_label(self.new_city.id, "Bjørgvin")
+        self.before_delete = checkpoint()
+        self.graph.delete_entity(self.new_city.id)
+
+    def cities(self, query):
+        return {e.id for e in query.starting_from(self.person.id).follow(self.lives_in.id).execute().results}
+
+    def test_history_is_visible_by_default(self):
+        """Tests that plain queries still see everything ever added."""
+        self.assertEqual(self.cities(self.graph.query()), {self.old_city.id, self.new_city.id})
+
+    def test_as_of(self):
+        """Tests that as_of hides later statements and entities created or deleted by then."""
+        self.assertEqual(self.cities(self.graph.query().as_of(self.before_move)), {self.old_city.id})
+        self.assertEqual(self.cities(self.graph.query().as_of(self.before_delete)),
+                         {self.old_city.id, self.new_city.id})
+        self.assertEqual(self.cities(self.graph.query().as_of(datetime.now())), {self.old_city.id})
+        self.assertEqual(self.cities(self.graph.query().as_of(self.before_move).current()), {self.old_city.id})
+        self.assertEqual(self.cities(self.graph.query().as_of(self.before_delete).current()), {self.new_city.id})
+
+    def test_current_view(self):
+        """Tests that the current view follows only the latest statement and hides tombstones."""
+        self.assertEqual(self.cities(self.graph.query().current()), set())
+        self.graph.add_statement(self.person.id, self.lives_in.id, self.old_city.id)
+        self.assertEqual(self.cities(self.graph.query().current()), {self.old_city.id})
+
+        statements = self.graph.query().starting_from(self.person.id).current().return_statements().execute()
+        self.assertEqual(len(statements.results), 1)
+        self.assertEqual(self.graph.query().starting_from(self.new_city.id).current().execute().results, [])
+
+    def test_historical_values(self):
+        """Tests that values resolve to the label that was winning at the time."""
+        def value(moment):
+            return self.graph.query().starting_from(self.new_city.id).as_of(moment).return_values().execute().results
+        self.assertEqual(value(self.before_rename), ["Bergen"])
+        self.assertEqual(value(self.before_delete), ["Bjørgvin"])
+        self.assertEqual(value(self.before_move), [])
+
+    def test_filters_read_through_view(self):
+        """Tests that filter expressions see statements, labels and text as of the view."""
+        status = self.graph.create_entity(EntityType.PROPERTY)
+        doc = self.graph.create_entity()
+        self.graph.add_statement(doc.id, status.id, "draft")
+        drafted = checkpoint()
+        self.graph.add_statement(doc.id, status.id, "final")
+
+        def matched(query, expression):
+            return [e.id for e in query.starting_from(doc.id).filter(expression).execute().results]
+        self.assertEqual(matched(self.graph.query().as_of(drafted), has(status.id, "final")), [])
+        self.assertEqual(matched(self.graph.query().as_of(drafted), has(status.id, "draft")), [doc.id])
+        self.assertEqual(matched(self.graph.query().current(), has(status.id, "draft")), [])
+        self.assertEqual(matched(self.graph.query().current(), ~has(status.id, "draft")), [doc.id])
+        self.assertEqual(matched(self.graph.query().current(), text_matches("final")), [doc.id])
+        self.assertEqual(matched(self.graph.query(), has(status.id, "draft")), [doc.id])
+
+        city = lambda moment, expression: self.graph.query().starting_from(self.new_city.id)\
+            .as_of(moment).filter(expression).execute().results
+        self.assertEqual(len(city(self.before_rename, label_matches("^Bergen$"))), 1)
+        self.assertEqual(len(city(self.before_rename, text_matches("bergen"))), 1)
+        self.assertEqual(city(self.before_delete, text_matches("bergen")), [])
+
+    def test_temporal_plan(self):
+        """Tests that temporal queries expand forward through the temporal index."""
+        people = [self.graph.create_entity().id for _ in range(5)]
+        wide = self.graph.query().starting_from(people).follow(self.lives_in.id)
+        self.assertIsInstance(wide.plan().steps[1], ExpandReverse)
+        wide.current()
+        plan = wide.plan()
+        self.assertIsInstance(plan.steps[1], ExpandForward)
+        self.assertIn("temporal index", str(plan))
+
+        ordered = self.graph.query().starting_from(people).order_by(CREATED_AT).limit(1)
+        self.assertIn(IndexScan, [type(step) for step in ordered.plan().steps])
+        ordered.as_of(datetime.now())
+        self.assertNotIn(IndexScan, [type(step) for step in ordered.plan().steps])
+
+    def test_index_maintained_and_cached_queries_invalidated(self):
+        """Tests that the index follows new operations and deletions invalidate temporal results."""
+        self.graph.enable_query_cache()
+        query = lambda: self.graph.query().starting_from(self.person.id).follow(self.lives_in.id).current()
+        self.assertEqual(query().execute().results, [])
+        self.graph.add_statement(self.person.id, self.lives_in.id, self.old_city.id)
+        self.assertEqual([e.id for e in query().execute().results], [self.old_city.id])
+        self.graph.delete_entity(self.old_city.id)
+        self.assertEqual(query().execute().results, [])
+
+    def test_deletions_replicate_and_persist(self):
+        """Tests that deletions travel in deltas and through the log codec and snapshots."""
+        replica = GraphLayer(node_id="replica")
+        replica.sync_from(self.graph)
+        self.assertTrue(replica.entities[self.new_city.id].tombstone)
+        self.assertEqual(self.cities(replica.query().as_of(self.before_delete)),
+                         {self.old_city.id, self.new_city.id})
+
+        deletion = next(op for op in self.graph._op_log["test_node"] if isinstance(op, EntityDeleted))
+        self.assertEqual(decode_operation(encode_operation(deletion)), deletion)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "graph.ygs")
+            write_snapshot(self.graph, path)
+            loaded = load_snapshot(path)
+            self.assertEqual(self.cities(loaded.query().current()), set())
+            self.assertEqual(self.cities(loaded.query().as_of(self.before_delete).current()),
+                             {self.new_city.id})
+
+if __name__ == '__main__':
+    unittest.main()
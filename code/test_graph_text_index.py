@@ -0,0 +1,85 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_filters import text_matches, has
+from graph_query_planner import StartLookup
+
+class TestTextIndex(unittest.TestCase):
+    def setUp(self):
+        """Creates documents with labels, descriptions and literal notes."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.note = self.graph.create_entity(EntityType.PROPERTY)
+        self.status = self.graph.create_entity(EntityType.PROPERTY)
+        self.draft = self.graph.create_entity()
+        self.proposal = self.graph.create_entity()
+        self.graph.add_label(self.proposal.id, "Budget Proposal 2024")
+        self.graph.add_description(self.proposal.id, "Annual spending plan")
+        self.graph.add_statement(self.proposal.id, self.status.id, self.draft.id)
+        self.report = self.graph.create_entity()
+        self.graph.add_label(self.report.id, "Quarterly report")
+        self.graph.add_label(self.report.id, "Rapport trimestriel", language="fr")
+        self.graph.add_statement(self.report.id, self.note.id, "Mentions the proposed budget")
+        self.index = self.graph.text_index()
+
+    def test_token_and_prefix_lookup(self):
+        """Tests whole-token, multi-token and prefix searches."""
+        self.assertEqual(self.index.search("proposal"), {self.proposal.id})
+        self.assertEqual(self.index.search("BUDGET"), {self.proposal.id, self.report.id})
+        self.assertEqual(self.index.search("budget proposal"), {self.proposal.id})
+        self.assertEqual(self.index.search("propos", prefix=True), {self.proposal.id, self.report.id})
+        self.assertEqual(self.index.search("propos"), set())
+        self.assertEqual(self.index.search("trimestriel"), set())
+        self.assertEqual(self.index.search("trimestriel", language="fr"), {self.report.id})
+        self.assertEqual(self.index.search("budget", fields=["literals"]), {self.report.id})
+
+    def test_case_sensitive_lookup(self):
+        """Tests that case-sensitive searches check the original text."""
+        self.assertEqual(self.index.search("Budget", case_sensitive=True), {self.proposal.id})
+        self.assertEqual(self.index.search("budget", case_sensitive=True), {self.report.id})
+
+    def test_index_follows_new_labels(self):
+        """Tests that a newer label replaces the tokens of the one it supersedes."""
+        self.graph.add_label(self.proposal.id, "Spending plan")
+        self.assertEqual(self.index.search("proposal"), set())
+        self.assertEqual(self.index.search("spending", fields=["labels"]), {self.proposal.id})
+        self.assertEqual(self.index.tokens[("labels", "en")].count("proposal"), 0)
+
+        self.graph.add_statement(self.draft.id, self.note.id, "Proposal pending review")
+        self.assertEqual(self.index.search("pending"), {self.draft.id})
+
+    def test_starting_from_search(self):
+        """Tests search results as a query starting point."""
+        query = self.graph.query().starting_from_search("propos", prefix=True).follow(self.status.id)
+        self.assertIsInstance(query.plan().steps[0], StartLookup)
+        self.assertIn("via text index", str(query.plan()))
+        self.assertEqual([e.id for e in query.execute().results], [self.draft.id])
+
+        entities = self.graph.query().starting_from_search("quarterly").execute().results
+        self.assertEqual([e.id for e in entities], [self.report.id])
+
+    def test_indexed_filter(self):
+        """Tests text expressions as filters, alone and combined."""
+        everything = [self.draft.id, self.proposal.id, self.report.id]
+        results = self.graph.query().starting_from(everything)\
+            .filter(text_matches("budget") & has(self.status.id)).execute().results
+        self.assertEqual([e.id for e in results], [self.proposal.id])
+
+        streamed = self.graph.query().starting_from(everything)\
+            .filter(text_matches("quart", prefix=True)).iterate()
+        self.assertEqual([e.id for e in streamed], [self.report.id])
+
+    def test_cached_searches_are_invalidated(self):
+        """Tests that new labels and literals refresh cached search results."""
+        self.graph.enable_query_cache()
+        query = lambda: self.graph.query().starting_from_search("minutes")
+        self.assertEqual(query().execute().results, [])
+        self.graph.add_label(self.draft.id, "Meeting minutes")
+        self.assertEqual([e.id for e in query().execute().results], [self.draft.id])
+
+        filtered = lambda: self.graph.query().starting_from(self.proposal.id)\
+            .filter(text_matches("approved", fields=["literals"]))
+        self.assertEqual(filtered().execute().results, [])
+        self.graph.add_statement(self.proposal.id, self.note.id, "Approved by the board")
+        self.assertEqual(len(filtered().execute().results), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from graph_layer_core import GraphLayer, EntityType
+from graph_query_system import STATEMENT_TIMESTAMP
+
+class TestMaterializedViews(unittest.TestCase):
+    def setUp(self):
+        """Creates albums containing photos tagged with people."""
+        self.graph = GraphLayer(node_id="test_node")
+        self.contains = self.graph.create_entity(EntityType.PROPERTY)
+        self.shows = self.graph.create_entity(EntityType.PROPERTY)
+        self.part_of = self.graph.create_entity(EntityType.PROPERTY)
+        self.album = self.graph.create_entity()
+        self.people = []
+        for i in range(3):
+            person = self.graph.create_entity()
+            self.graph.add_label(person.id, f"Person {i}")
+            self.people.append(person)
+        self.photo = self.graph.create_entity()
+        self.graph.add_statement(self.album.id, self.contains.id, self.photo.id)
+        self.graph.add_statement(self.photo.id, self.shows.id, self.people[0].id)
+
+    def people_in_album(self):
+        return self.graph.query()\
+            .starting_from(self.album.id)\
+            .follow_chain([self.contains.id, self.shows.id])
+
+    def test_incremental_statements(self):
+        """Tests that statements added later extend the view without recomputing it."""
+        view = self.graph.register_view("people", self.people_in_album())
+        self.assertTrue(view.incremental)
+        self.assertEqual([e.id for e in view.results()], [self.people[0].id])
+
+        photo = self.graph.create_entity()
+        self.graph.add_statement(photo.id, self.shows.id, self.people[1].id)
+        self.assertEqual(len(view), 1)
+        self.graph.add_statement(self.album.id, self.contains.id, photo.id)
+        self.assertEqual({e.id for e in view.results()}, {self.people[0].id, self.people[1].id})
+        self.assertEqual({e.id for e in view.results()},
+                         {e.id for e in self.people_in_album().execute().results})
+
+    def test_merge_and_filters(self):
+        """Tests that merged statements and labels re-evaluate filters and ordering."""
+        query = self.people_in_album()\
+            .filter(lambda e: not self.graph.get_latest_label(e.id).startswith("Hidden"))\
+            .order_by(lambda e: self.graph.get_latest_label(e.id), descending=True)
+        names = lambda results: [self.graph.get_latest_label(e.id) for e in results]
+        view = self.graph.register_view("names", query)
+
+        other = GraphLayer(node_id="other_node")
+        other.sync_from(self.graph)
+        other.add_statement(self.photo.id, self.shows.id, self.people[2].id)
+        other.add_label(self.people[0].id, "Zed")
+        self.graph.merge(other)
+        self.assertEqual(names(view.results()), ["Zed", "Person 2"])
+
+        self.graph.add_label(self.people[2].id, "Hidden person")
+        self.graph.add_label(self.people[1].id, "Unrelated")
+        self.assertEqual(names(view.results()), ["Zed"])
+        self.assertEqual(view.results(), query.execute().results)
+
+    def test_transitive_view(self):
+        """Tests incremental maintenance of an unbounded repeated hop."""
+        places = [self.graph.create_entity() for _ in range(4)]
+        self.graph.add_statement(places[1].id, self.part_of.id, places[2].id)
+        query = self.graph.query().starting_from(places[0].id).follow(self.part_of.id, 1, None)
+        view = self.graph.register_view("within", query)
+        self.assertEqual(view.results(), [])
+
+        self.graph.add_statement(places[2].id, self.part_of.id, places[3].id)
+        self.graph.add_statement(places[0].id, self.part_of.id, places[1].id)
+        self.assertEqual({e.id for e in view.results()}, {p.id for p in places[1:]})
+
+    def test_recomputed_view(self):
+        """Tests that unsupported shapes are recomputed on read after a relevant change."""
+        query = self.graph.query().starting_from(self.album.id).follow(self.contains.id, 2, 3)
+        view = self.graph.register_view("nested", query)
+        self.assertFalse(view.incremental)
+        self.assertEqual(view.results(), [])
+
+        inner = self.graph.create_entity()
+        self.graph.add_statement(self.photo.id, self.contains.id, inner.id)
+        self.assertEqual([e.id for e in view.results()], [inner.id])
+
+    def test_path_views(self):
+        """Tests that path-search views go stale on statements along their `via` predicates, or any."""
+        person = self.people[0].id
+        via = self.graph.query().starting_from(self.album.id).ending_at(person)\
+            .shortest_paths(via=[self.contains.id, self.shows.id])
+        anywhere = self.graph.query().starting_from(self.album.id).ending_at(self.people[1].id)\
+            .shortest_paths()
+        via_view = self.graph.register_view("via", via)
+        any_view = self.graph.register_view("any", anywhere)
+        self.assertEqual(len(via_view.results()), 1)
+        self.assertEqual(any_view.results(), [])
+
+        self.graph.add_statement(self.album.id, self.shows.id, person)
+        self.graph.add_statement(self.people[0].id, self.part_of.id, self.people[1].id)
+        self.assertEqual([len(path.entities()) for path in via_view.results()], [2])
+        self.assertEqual(len(any_view.results()), 1)
+
+    def test_recomputed_statement_view(self):
+        """Tests that recomputed statement views see new statements about subjects they return."""
+        query = self.graph.query().starting_from(self.album.id).follow(self.contains.id)\
+            .return_statements().order_by(STATEMENT_TIMESTAMP).limit(5)
+        view = self.graph.register_view("photo statements", query)
+        self.assertFalse(view.incremental)
+        self.assertEqual(len(view.results()), 1)
+
+        statement = self.graph.add_statement(self.photo.id, self.part_of.id, self.album.id)
+        self.assertEqual(view.results()[-1], statement)
+        self.assertEqual(view.results(), query.execute().results)
+
+    def test_view_management(self):
+        """Tests registering, sizing, dropping and rebuilding views."""
+        view = self.graph.register_view("people", self.people_in_album())
+        with self.assertRaises(ValueError):
+            self.graph.register_view("people", self.people_in_album())
+        self.assertGreater(self.graph.views_nbytes()["people"], 0)
+
+        self.graph.drop_view("people")
+        self.graph.add_statement(self.photo.id, self.shows.id, self.people[1].id)
+        self.assertEqual(len(view), 1)
+        view.rebuild()
+        self.assertEqual(len(view), 2)
+        with self.assertRaises(ValueError):
+            self.graph.drop_view("people")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from graph_layer_core import GraphLayer, EntityType
+import graph_persistence
+from graph_persistence import write_snapshot, load_snapshot
+from graph_wire import WireWriter, write_graph, read_graph, read_into, read_deltas, zstandard
+
+class TestWireFormat(unittest.TestCase):
+    def setUp(self):
+        """Creates a graph with every kind of operation, partly from a second node."""
+        self.graph = GraphLayer(node_id="node_a")
+        self.prop = self.graph.create_entity(EntityType.PROPERTY)
+        self.people = [self.graph.create_entity() for _ in range(50)]
+        for i, person in enumerate(self.people):
+            self.graph.add_label(person.id, f"Person {i}")
+            self.graph.add_statement(person.id, self.prop.id, self.people[(i + 1) % 50].id)
+            self.graph.add_statement(person.id, self.prop.id, f"note {i}", certainty=0.5 + i / 100)
+        self.graph.add_description(self.people[0].id, "Première personne", language="fr")
+        self.graph.delete_entity(self.people[1].id)
+
+        other = GraphLayer(node_id="node_b")
+        other.sync_from(self.graph)
+        other.add_label(self.people[2].id, "Renamed")
+        self.graph.sync_from(other)
+
+    def assertSameGraph(self, copy: GraphLayer, original: GraphLayer):
+        self.assertEqual(set(copy.statements), set(original.statements))
+        self.assertEqual(copy.version_vector(), original.version_vector())
+        for entity_id, entity in original.entities.items():
+            copied = copy.entities[entity_id]
+            self.assertEqual((copied.created_at, copied.tombstone, copied.labels, copied.descriptions),
+                             (entity.created_at, entity.tombstone, entity.labels, entity.descriptions))
+
+    def round_trip(self, compression=None, block_operations=4096, compact=False) -> bytes:
+        stream = io.BytesIO()
+        written = write_graph(self.graph, stream, compression=compression,
+                              block_operations=block_operations)
+        data = stream.getvalue()
+        self.assertEqual(written, len(data))
+        self.assertSameGraph(read_graph(io.BytesIO(data), "copy", compact=compact), self.graph)
+        return data
+
+    def test_round_trip(self):
+        """Tests that every operation survives encoding, with and without compression."""
+        raw = self.round_trip("none")
+        compressed = self.round_trip("zlib")
+        self.assertLess(len(compressed), len(raw))
+        self.round_trip(compact=True)
+        self.assertLess(len(raw), len(pickle.dumps(self.graph)) / 3)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        """Tests zstd block compression."""
+        self.round_trip("zstd")
+
+    def test_streams_in_blocks(self):
+        """Tests that small blocks decode into bounded deltas that apply in order."""
+        stream = io.BytesIO()
+        write_graph(self.graph, stream, block_operations=16)
+        stream.seek(0)
+        deltas = list(read_deltas(stream))
+        self.assertGreater(len(deltas), 5)
+        self.assertTrue(all(len(delta) <= 16 for delta in deltas))
+        stream.seek(0)
+        self.assertSameGraph(read_graph(stream, "copy"), self.graph)
+
+    def test_incremental_since(self):
+        """Tests shipping only what a peer is missing."""
+        peer = GraphLayer(node_id="peer")
+        peer.sync_from(self.graph)
+        self.graph.add_statement(self.people[3].id, self.prop.id, "late")
+        stream = io.BytesIO()
+        write_graph(self.graph, stream, since=peer.version_vector())
+        stream.seek(0)
+        self.assertEqual(read_into(peer, stream), 1)
+        self.assertSameGraph(peer, self.graph)
+
+    def test_since_on_mapped_snapshot(self):
+        """Tests that shipping a tail from a snapshot-backed graph decodes only the tail."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "graph.ygs")
+        write_snapshot(self.graph, path)
+        loaded = load_snapshot(path)
+        since = {node: count - 2 for node, count in loaded.version_vector().items()}
+        stream = io.BytesIO()
+        with mock.patch.object(graph_persistence, "decode_operation",
+                               wraps=graph_persistence.decode_operation) as decode:
+            write_graph(loaded, stream, since=since)
+        self.assertLessEqual(decode.call_count, 2 * len(since))
+        stream.seek(0)
+        self.assertEqual(sum(len(delta) for delta in read_deltas(stream)), 2 * len(since))
+
+    def test_writer_accepts_deltas(self):
+        """Tests encoding a Delta directly."""
+        stream = io.BytesIO()
+        with WireWriter(stream, "zlib") as writer:
+            writer.write_delta(self.graph.delta_since({}))
+        stream.seek(0)
+        self.assertSameGraph(read_graph(stream, "copy"), self.graph)
+
+    def test_rejects_bad_streams(self):
+        """Tests that bad headers, corrupt blocks and truncation are detected."""
+        data = bytearray(self.round_trip("none"))
+        with self.assertRaises(ValueError):
+            list(read_deltas(io.BytesIO(b"NOTWIRE" + bytes(data[7:]))))
+        corrupt = bytearray(data)
+        corrupt[40] ^= 0xFF
+        with self.assertRaises(ValueError):
+            list(read_deltas(io.BytesIO(bytes(corrupt))))
+        with self.assertRaises(ValueError):
+            list(read_deltas(io.BytesIO(bytes(data[:-12]))))
+        with self.assertRaises(ValueError):
+            write_graph(self.graph, io.BytesIO(), compression="lz4")
+
+if __name__ == '__main__':
+    unittest.main()